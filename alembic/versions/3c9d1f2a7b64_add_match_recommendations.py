@@ -0,0 +1,68 @@
+"""add match recommendations
+
+Revision ID: 3c9d1f2a7b64
+Revises: 8748f7fcc78f
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3c9d1f2a7b64"
+down_revision = "8748f7fcc78f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Precomputed discover feed rankings
+    op.create_table(
+        "match_recommendations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("candidate_id", sa.Integer(), nullable=False),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["candidate_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_match_recommendations_id"), "match_recommendations", ["id"]
+    )
+    op.create_index(
+        "ix_match_recommendations_user_id_rank",
+        "match_recommendations",
+        ["user_id", "rank"],
+    )
+
+    # Job runs, used to select users for incremental recomputation
+    op.create_table(
+        "match_recommendation_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("incremental", sa.Boolean(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("users_computed", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_match_recommendation_runs_id"), "match_recommendation_runs", ["id"]
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_match_recommendation_runs_id"), table_name="match_recommendation_runs"
+    )
+    op.drop_table("match_recommendation_runs")
+    op.drop_index(
+        "ix_match_recommendations_user_id_rank", table_name="match_recommendations"
+    )
+    op.drop_index(
+        op.f("ix_match_recommendations_id"), table_name="match_recommendations"
+    )
+    op.drop_table("match_recommendations")
@@ -0,0 +1,81 @@
+"""add profile tag tables
+
+Revision ID: 5e2a8c4d9f13
+Revises: 3c9d1f2a7b64
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5e2a8c4d9f13"
+down_revision = "3c9d1f2a7b64"
+branch_labels = None
+depends_on = None
+
+
+def _tags(value):
+    """Same normalization as app.models.profile.normalize_tags"""
+    if not value:
+        return set()
+    return set(tag.strip().lower() for tag in value.split(","))
+
+
+def upgrade():
+    profile_cuisines = op.create_table(
+        "profile_cuisines",
+        sa.Column("profile_id", sa.Integer(), nullable=False),
+        sa.Column("cuisine", sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(["profile_id"], ["profiles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("profile_id", "cuisine"),
+    )
+    op.create_index(
+        "ix_profile_cuisines_cuisine_profile_id",
+        "profile_cuisines",
+        ["cuisine", "profile_id"],
+    )
+
+    profile_dietary = op.create_table(
+        "profile_dietary",
+        sa.Column("profile_id", sa.Integer(), nullable=False),
+        sa.Column("restriction", sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(["profile_id"], ["profiles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("profile_id", "restriction"),
+    )
+    op.create_index(
+        "ix_profile_dietary_restriction_profile_id",
+        "profile_dietary",
+        ["restriction", "profile_id"],
+    )
+
+    # Backfill tags from the existing comma separated strings
+    profiles = op.get_bind().execute(
+        sa.text("SELECT id, cuisine_preferences, dietary_restrictions FROM profiles")
+    )
+    cuisine_rows, dietary_rows = [], []
+    for profile_id, cuisine_preferences, dietary_restrictions in profiles:
+        cuisine_rows.extend(
+            {"profile_id": profile_id, "cuisine": cuisine}
+            for cuisine in _tags(cuisine_preferences)
+        )
+        dietary_rows.extend(
+            {"profile_id": profile_id, "restriction": restriction}
+            for restriction in _tags(dietary_restrictions)
+        )
+    if cuisine_rows:
+        op.bulk_insert(profile_cuisines, cuisine_rows)
+    if dietary_rows:
+        op.bulk_insert(profile_dietary, dietary_rows)
+
+
+def downgrade():
+    op.drop_index(
+        "ix_profile_dietary_restriction_profile_id", table_name="profile_dietary"
+    )
+    op.drop_table("profile_dietary")
+    op.drop_index(
+        "ix_profile_cuisines_cuisine_profile_id", table_name="profile_cuisines"
+    )
+    op.drop_table("profile_cuisines")
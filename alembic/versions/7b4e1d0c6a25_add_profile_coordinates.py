@@ -0,0 +1,60 @@
+"""add profile coordinates
+
+Revision ID: 7b4e1d0c6a25
+Revises: 5e2a8c4d9f13
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.geo import geocode, grid_cell
+
+# revision identifiers, used by Alembic.
+revision = "7b4e1d0c6a25"
+down_revision = "5e2a8c4d9f13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("profiles", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("profiles", sa.Column("longitude", sa.Float(), nullable=True))
+    op.add_column(
+        "profiles", sa.Column("geo_cell", sa.String(length=32), nullable=True)
+    )
+    op.create_index(op.f("ix_profiles_geo_cell"), "profiles", ["geo_cell"])
+
+    # Backfill coordinates of known locations from the gazetteer
+    bind = op.get_bind()
+    profiles = bind.execute(
+        sa.text("SELECT id, location FROM profiles WHERE location IS NOT NULL")
+    )
+    rows = []
+    for profile_id, location in profiles:
+        point = geocode(location)
+        if point:
+            rows.append(
+                {
+                    "id": profile_id,
+                    "latitude": point[0],
+                    "longitude": point[1],
+                    "geo_cell": grid_cell(*point),
+                }
+            )
+    if rows:
+        bind.execute(
+            sa.text(
+                "UPDATE profiles SET latitude = :latitude, longitude = :longitude, "
+                "geo_cell = :geo_cell WHERE id = :id"
+            ),
+            rows,
+        )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_profiles_geo_cell"), table_name="profiles")
+    op.drop_column("profiles", "geo_cell")
+    op.drop_column("profiles", "longitude")
+    op.drop_column("profiles", "latitude")
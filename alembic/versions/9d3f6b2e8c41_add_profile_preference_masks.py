@@ -0,0 +1,65 @@
+"""add profile preference masks
+
+Revision ID: 9d3f6b2e8c41
+Revises: 7b4e1d0c6a25
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.profile import normalize_tags
+from app.services.preference_bits import DIETARY_BITS, cuisine_bits, encode_mask
+
+# revision identifiers, used by Alembic.
+revision = "9d3f6b2e8c41"
+down_revision = "7b4e1d0c6a25"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for name, column_type in [
+        ("cuisine_mask", sa.BigInteger()),
+        ("cuisine_count", sa.Integer()),
+        ("dietary_mask", sa.BigInteger()),
+    ]:
+        op.add_column(
+            "profiles",
+            sa.Column(name, column_type, nullable=False, server_default="0"),
+        )
+
+    # Backfill the masks from the existing preference strings
+    bind = op.get_bind()
+    profiles = bind.execute(
+        sa.text("SELECT id, cuisine_preferences, dietary_restrictions FROM profiles")
+    )
+    rows = []
+    for profile_id, cuisine_preferences, dietary_restrictions in profiles:
+        cuisine_mask, cuisine_count = cuisine_bits(normalize_tags(cuisine_preferences))
+        rows.append(
+            {
+                "id": profile_id,
+                "cuisine_mask": cuisine_mask,
+                "cuisine_count": cuisine_count,
+                "dietary_mask": encode_mask(
+                    normalize_tags(dietary_restrictions), DIETARY_BITS
+                ),
+            }
+        )
+    if rows:
+        bind.execute(
+            sa.text(
+                "UPDATE profiles SET cuisine_mask = :cuisine_mask, "
+                "cuisine_count = :cuisine_count, dietary_mask = :dietary_mask "
+                "WHERE id = :id"
+            ),
+            rows,
+        )
+
+
+def downgrade():
+    op.drop_column("profiles", "dietary_mask")
+    op.drop_column("profiles", "cuisine_count")
+    op.drop_column("profiles", "cuisine_mask")
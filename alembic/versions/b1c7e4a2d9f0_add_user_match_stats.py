@@ -0,0 +1,60 @@
+"""add user match stats
+
+Revision ID: b1c7e4a2d9f0
+Revises: 9d3f6b2e8c41
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b1c7e4a2d9f0"
+down_revision = "9d3f6b2e8c41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_match_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("sent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("received", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pending", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("accepted", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rejected", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+    # Backfill the counters from the existing matches
+    op.execute("""
+        INSERT INTO user_match_stats
+            (user_id, sent, received, pending, accepted, rejected, updated_at)
+        SELECT
+            user_id,
+            SUM(sent),
+            SUM(received),
+            SUM(CASE WHEN status = 'pending' THEN counted ELSE 0 END),
+            SUM(CASE WHEN status = 'accepted' THEN counted ELSE 0 END),
+            SUM(CASE WHEN status = 'rejected' THEN counted ELSE 0 END),
+            CURRENT_TIMESTAMP
+        FROM (
+            SELECT sender_id AS user_id, 1 AS sent, 0 AS received,
+                   1 AS counted, status
+            FROM matches
+            UNION ALL
+            SELECT receiver_id, 0, 1,
+                   CASE WHEN receiver_id = sender_id THEN 0 ELSE 1 END, status
+            FROM matches
+        ) AS participants
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        """)
+
+
+def downgrade():
+    op.drop_table("user_match_stats")
@@ -0,0 +1,28 @@
+"""add match status indexes
+
+Revision ID: b9e3f7c2a5d4
+Revises: a6c2e9f4d1b8
+Create Date: 2026-10-18 02:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b9e3f7c2a5d4"
+down_revision = "a6c2e9f4d1b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sent and received match lists, and their status filters
+    op.create_index("ix_matches_sender_id_status", "matches", ["sender_id", "status"])
+    op.create_index(
+        "ix_matches_receiver_id_status", "matches", ["receiver_id", "status"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_matches_receiver_id_status", table_name="matches")
+    op.drop_index("ix_matches_sender_id_status", table_name="matches")
@@ -0,0 +1,33 @@
+"""add refresh token version
+
+Revision ID: c2d7e5a9f3b1
+Revises: b9e3f7c2a5d4
+Create Date: 2026-10-18 03:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c2d7e5a9f3b1"
+down_revision = "b9e3f7c2a5d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "refresh_tokens",
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+    # Existing tokens stay valid: they belong to the user's current version
+    op.execute(
+        "UPDATE refresh_tokens SET token_version = ("
+        "SELECT users.token_version FROM users "
+        "WHERE users.id = refresh_tokens.user_id)"
+    )
+
+
+def downgrade():
+    op.drop_column("refresh_tokens", "token_version")
@@ -0,0 +1,30 @@
+"""add match pair indexes
+
+Revision ID: c4a8f1e6b3d2
+Revises: b1c7e4a2d9f0
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4a8f1e6b3d2"
+down_revision = "b1c7e4a2d9f0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Back the matched-user NOT EXISTS probes in both directions
+    op.create_index(
+        "ix_matches_sender_id_receiver_id", "matches", ["sender_id", "receiver_id"]
+    )
+    op.create_index(
+        "ix_matches_receiver_id_sender_id", "matches", ["receiver_id", "sender_id"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_matches_receiver_id_sender_id", table_name="matches")
+    op.drop_index("ix_matches_sender_id_receiver_id", table_name="matches")
@@ -0,0 +1,27 @@
+"""add recommendation scoring model
+
+Revision ID: d8f2b5a1c7e9
+Revises: c4a8f1e6b3d2
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "d8f2b5a1c7e9"
+down_revision = "c4a8f1e6b3d2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rankings have no model and are recomputed on the next run
+    op.add_column(
+        "match_recommendations", sa.Column("model", sa.String(64), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("match_recommendations", "model")
@@ -0,0 +1,27 @@
+"""add recommendation depth
+
+Revision ID: e5b1a7d3c9f2
+Revises: c2d7e5a9f3b1
+Create Date: 2026-10-18 05:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e5b1a7d3c9f2"
+down_revision = "c2d7e5a9f3b1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rankings have no depth and are recomputed on the next run
+    op.add_column(
+        "match_recommendations", sa.Column("top_n", sa.Integer(), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column("match_recommendations", "top_n")
@@ -0,0 +1,27 @@
+"""add user token version
+
+Revision ID: f1b6d3a8e2c4
+Revises: d8f2b5a1c7e9
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "f1b6d3a8e2c4"
+down_revision = "d8f2b5a1c7e9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_column("users", "token_version")
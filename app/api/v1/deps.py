@@ -1,60 +1,222 @@
 from fastapi import Depends, HTTPException, status, Request
 from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import logging
-from app.core.database import get_db
+import os
+from datetime import datetime, timezone
+from typing import Optional
+from app.core.database import get_async_db, get_db
+from app.core.replicas import bind_user
 from app.core.security import oauth2_scheme, SECRET_KEY, ALGORITHM
 from app.models.user import User
+from app.services.token_revocation import revoked_tokens, token_revocations
+from app.services.user_cache import user_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Comma-separated emails of users allowed to call admin endpoints
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
 
-async def get_current_user(
-    request: Request = None,
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme),
-) -> User:
-    """
-    Validate JWT token and return the current authenticated user.
-    This dependency is used to protect API endpoints.
-    """
-    credentials_exception = HTTPException(
+
+class TokenClaims:
+    """Identity asserted by a verified access token"""
+
+    def __init__(
+        self,
+        user_id: int,
+        email: str,
+        is_active: bool,
+        token_version: int,
+        jti: Optional[str] = None,
+        expires_at: Optional[datetime] = None,
+    ):
+        self.user_id = user_id
+        self.email = email
+        self.is_active = is_active
+        self.token_version = token_version
+        self.jti = jti
+        self.expires_at = expires_at
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Get client info for logging
-    client_host = request.client.host if request else "unknown"
 
+def _inactive_user_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Inactive user account",
+    )
+
+
+def _load_user(db: Session, subject: str, **filters) -> Optional[User]:
+    """Get a user from the cache, falling back to the database"""
+    user = user_cache.get(db, subject)
+    if user is None:
+        if "id" in filters:
+            user = db.get(User, filters["id"])
+        else:
+            user = db.query(User).filter_by(**filters).first()
+        if user is not None:
+            user_cache.set(subject, user)
+    return user
+
+
+def _resolve_claims(db: Session, token: str, client_host: str) -> TokenClaims:
+    """Validate a token and return its claims; see get_token_claims"""
     try:
         # Decode JWT token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             logger.warning(f"Token missing 'sub' claim from {client_host}")
-            raise credentials_exception
+            raise _credentials_exception()
 
         # Log token validation
         logger.debug(f"Validated token for {email} from {client_host}")
 
     except JWTError as e:
         logger.warning(f"JWT validation error from {client_host}: {str(e)}")
-        raise credentials_exception
+        raise _credentials_exception()
 
-    # Get user from database
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        logger.warning(f"User not found for validated token: {email}")
-        raise credentials_exception
+    # Before the first query, so that a recent writer reads from the primary
+    if "uid" in payload:
+        bind_user(db, payload["uid"])
+
+    jti = payload.get("jti")
+    if jti and revoked_tokens.is_revoked(db, jti):
+        logger.warning(f"Revoked token used for {email} from {client_host}")
+        raise _credentials_exception()
+    # Naive UTC, like the timestamps stored in the database
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc).replace(
+        tzinfo=None
+    )
+
+    if "uid" in payload:
+        claims = TokenClaims(
+            payload["uid"],
+            email,
+            bool(payload.get("act")),
+            payload.get("ver", 0),
+            jti,
+            expires_at,
+        )
+    else:
+        # Tokens issued before identity claims: take them from the user row
+        user = _load_user(db, email, email=email)
+        if user is None:
+            logger.warning(f"User not found for validated token: {email}")
+            raise _credentials_exception()
+        bind_user(db, user.id)
+        claims = TokenClaims(
+            user.id, email, user.is_active, user.token_version, jti, expires_at
+        )
+
+    if token_revocations.is_revoked(db, claims.user_id, claims.token_version):
+        logger.warning(f"Revoked token used for {email} from {client_host}")
+        raise _credentials_exception()
 
     # Check if user is active
-    if not user.is_active:
+    if not claims.is_active:
         logger.warning(f"Inactive user attempted access: {email}")
+        raise _inactive_user_exception()
+
+    return claims
+
+
+def _resolve_user(db: Session, token: str, client_host: str) -> User:
+    """Validate a token and return its user; see get_current_user"""
+    claims = _resolve_claims(db, token, client_host)
+
+    # Primary key lookup, served from the cache when possible
+    user = _load_user(db, str(claims.user_id), id=claims.user_id)
+    if user is None or user.token_version > claims.token_version:
+        logger.warning(f"User not found or token revoked: {claims.email}")
+        raise _credentials_exception()
+
+    # Check if user is active
+    if not user.is_active:
+        logger.warning(f"Inactive user attempted access: {claims.email}")
+        raise _inactive_user_exception()
+
+    return user
+
+
+async def get_token_claims(
+    request: Request = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> TokenClaims:
+    """
+    Validate a JWT token and return its identity claims without loading the
+    user. Enough for endpoints that only need the caller's id; revoked
+    token versions and inactive users are rejected.
+    """
+    # Get client info for logging
+    client_host = request.client.host if request else "unknown"
+    return _resolve_claims(db, token, client_host)
+
+
+async def get_current_user(
+    request: Request = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """
+    Validate JWT token and return the current authenticated user.
+    This dependency is used to protect API endpoints.
+    """
+    client_host = request.client.host if request else "unknown"
+    return _resolve_user(db, token, client_host)
+
+
+async def get_async_token_claims(
+    request: Request = None,
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme),
+) -> TokenClaims:
+    """get_token_claims for async endpoints"""
+    client_host = request.client.host if request else "unknown"
+    # The checks rarely query; when they do, run_sync awaits the driver
+    return await db.run_sync(_resolve_claims, token, client_host)
+
+
+async def get_async_current_user(
+    request: Request = None,
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme),
+) -> User:
+    """
+    get_current_user for async endpoints. The user belongs to the request's
+    AsyncSession: load relationships eagerly or inside db.run_sync.
+    """
+    client_host = request.client.host if request else "unknown"
+    return await db.run_sync(_resolve_user, token, client_host)
+
+
+def is_admin(user: User) -> bool:
+    """Whether the user is listed in ADMIN_EMAILS"""
+    return bool(user.email) and user.email.lower() in ADMIN_EMAILS
+
+
+async def get_current_admin_user(
+    current_user: User = Depends(get_current_user),
+) -> User:
+    """Return the current user if they are an admin, otherwise 403"""
+    if not is_admin(current_user):
+        logger.warning(f"Non-admin user attempted admin access: {current_user.email}")
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Inactive user account",
+            detail="Admin privileges required",
         )
-
-    return user
+    return current_user
@@ -1,51 +1,121 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import logging
 
-from app.core.database import get_db
+from app.core.database import RunDb, get_async_db, get_db, sync_runner
 from app.core.security import (
-    verify_password,
-    create_access_token,
-    get_password_hash,
+    create_user_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
 from app.models.user import User
-from app.schemas.auth import UserCreate, Token, LoginResponse, User as UserSchema
-from app.api.v1.deps import get_current_user
+from app.schemas.auth import (
+    UserCreate,
+    Token,
+    LoginResponse,
+    LogoutRequest,
+    RefreshRequest,
+    User as UserSchema,
+)
+from app.api.v1.deps import TokenClaims, get_current_user, get_token_claims
+from app.services.password_hashing import (
+    PASSWORD_HASH_RETRY_AFTER_SECONDS,
+    PasswordHashingBusy,
+    password_hasher,
+)
+from app.services.rate_limiter import RateLimitExceeded, auth_rate_limiter
+from app.services.refresh_tokens import (
+    RefreshTokenError,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
+from app.services.token_revocation import revoke_access_token, revoked_tokens
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["auth"])
+# Routes served with an async session when ASYNC_DB_ENABLED is set
+async_router = APIRouter(tags=["auth"])
 
+HASHING_BUSY = "Too many authentication requests, please retry shortly"
+RATE_LIMITED = "Too many attempts, please retry later"
+INVALID_REFRESH_TOKEN = "Invalid or expired refresh token"
 
-@router.post("/register", response_model=LoginResponse)
-def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
-    """Register a new user and return login response."""
+
+def _hashing_busy() -> HTTPException:
+    """503 telling the client when to retry while the hashing pool is full"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=HASHING_BUSY,
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+def _check_rate_limits(client_host: str, login: Optional[str] = None) -> None:
+    """
+    Reject over-limit attempts with 429 before any database or bcrypt work,
+    counting them per client IP and per login identifier.
+    """
     try:
-        # Check if user exists by email
-        existing_user = db.query(User).filter(User.email == user_in.email).first()
-        if existing_user:
-            logger.warning(f"User already exists: {user_in.email}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this email already exists",
-            )
+        auth_rate_limiter.check("auth_ip", client_host)
+        if login:
+            auth_rate_limiter.check("auth_login", login.strip().lower())
+    except RateLimitExceeded as e:
+        logger.warning(f"Rate limit '{e.rule}' exceeded from {client_host}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=RATE_LIMITED,
+            headers={"Retry-After": e.retry_after_header},
+        )
 
-        # Check if username exists
-        existing_username = (
-            db.query(User).filter(User.username == user_in.username).first()
+
+def _check_new_user(db: Session, user_in: UserCreate) -> None:
+    """Reject registrations whose email or username is taken"""
+    # Check if user exists by email
+    existing_user = db.query(User).filter(User.email == user_in.email).first()
+    if existing_user:
+        logger.warning(f"User already exists: {user_in.email}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email already exists",
         )
-        if existing_username:
-            logger.warning(f"Username already exists: {user_in.username}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User with this username already exists",
-            )
+
+    # Check if username exists
+    existing_username = db.query(User).filter(User.username == user_in.username).first()
+    if existing_username:
+        logger.warning(f"Username already exists: {user_in.username}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this username already exists",
+        )
+
+
+def _create_user(db: Session, new_user: User) -> str:
+    """Save a new user and return its first refresh token"""
+    try:
+        # Use a single transaction
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+        refresh_token = issue_refresh_token(db, new_user)
+        db.commit()
+        return refresh_token
+    except Exception:
+        db.rollback()
+        raise
+
+
+async def _register(user_in: UserCreate, run_db: RunDb, request: Request) -> Any:
+    """Registration flow shared by the sync and async session endpoints"""
+    _check_rate_limits(request.client.host if request else "unknown")
+    try:
+        await run_db(_check_new_user, user_in)
 
         # Password validation
         if len(user_in.password) < 6:
@@ -57,7 +127,11 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
 
         # Create new user with enhanced fields
         logger.info(f"Creating new user: {user_in.email}")
-        hashed_password = get_password_hash(user_in.password)
+        try:
+            hashed_password = await password_hasher.hash(user_in.password)
+        except PasswordHashingBusy:
+            logger.warning(f"Password hashing saturated, rejecting: {user_in.email}")
+            raise _hashing_busy()
 
         # Create user with all provided fields
         new_user = User(
@@ -74,57 +148,132 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
             interests=user_in.cuisine_preferences or [],
             is_profile_complete=False,
         )
-
-        # Use a single transaction
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        refresh_token = await run_db(_create_user, new_user)
 
         # Generate access token for immediate login
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": new_user.email}, expires_delta=access_token_expires
+        access_token = create_user_access_token(
+            new_user, expires_delta=access_token_expires
         )
 
         logger.info(f"Successfully created user: {new_user.email}")
         return LoginResponse(
             access_token=access_token,
             token_type="bearer",
+            refresh_token=refresh_token,
             user=new_user
         )
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error creating user: {str(e)}")
-        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating user account: {str(e)}",
         )
 
 
-@router.post("/login", response_model=LoginResponse)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+@router.post("/register", response_model=LoginResponse)
+async def register(
+    user_in: UserCreate, db: Session = Depends(get_db), request: Request = None
+) -> Any:
+    """Register a new user and return login response."""
+    return await _register(user_in, sync_runner(db), request)
+
+
+@async_router.post("/register", response_model=LoginResponse)
+async def register_async(
+    user_in: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
 ) -> Any:
+    """Register a new user and return login response."""
+    return await _register(user_in, db.run_sync, request)
+
+
+def _find_login_user(db: Session, login: str) -> Optional[User]:
+    """The user whose email or username is `login`"""
+    # First try to find user by email
+    # (since the login field is used for both)
+    user = db.query(User).filter(User.email == login).first()
+
+    # If not found by email, try username
+    if not user:
+        user = db.query(User).filter(User.username == login).first()
+    return user
+
+
+def _rehash_password(db: Session, user: User, new_hash: str) -> None:
+    """Upgrade a stored hash, e.g. after raising BCRYPT_ROUNDS"""
+    try:
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info(f"Rehashed password for user: {user.email}")
+    except Exception as e:
+        logger.warning(f"Could not rehash password for {user.email}: {str(e)}")
+        db.rollback()
+
+
+async def _authenticate(login: str, password: str, run_db: RunDb) -> Optional[User]:
+    user = await run_db(_find_login_user, login)
+    if not user:
+        return None
+
+    valid, new_hash = await password_hasher.verify_and_update(
+        password, user.hashed_password
+    )
+    if not valid:
+        return None
+    if new_hash:
+        await run_db(_rehash_password, user, new_hash)
+    return user
+
+
+async def authenticate_user(db: Session, login: str, password: str) -> Optional[User]:
     """
-    OAuth2 compatible token login.
-    Get an access token and user data for future requests.
+    Return the user matching an email or username and password, or None.
+    Hashes made with outdated parameters are replaced by a fresh hash.
+    Raises PasswordHashingBusy when the hashing pool is saturated.
     """
+    return await _authenticate(login, password, sync_runner(db))
+
+
+async def authenticate_user_async(
+    db: AsyncSession, login: str, password: str
+) -> Optional[User]:
+    """authenticate_user on an async session"""
+    return await _authenticate(login, password, db.run_sync)
+
+
+def _issue_login_refresh_token(db: Session, user: User) -> str:
+    try:
+        refresh_token = issue_refresh_token(db, user)
+        db.commit()
+        return refresh_token
+    except Exception as e:
+        logger.error(f"Database error while issuing refresh token: {str(e)}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Authentication service temporarily unavailable",
+        )
+
+
+async def _login(
+    form_data: OAuth2PasswordRequestForm, run_db: RunDb, request: Request
+) -> Any:
+    """Login flow shared by the sync and async session endpoints"""
     # Log login attempt (without password)
     client_host = request.client.host if request else "unknown"
     logger.info(f"Login attempt for user: {form_data.username} from {client_host}")
+    _check_rate_limits(client_host, form_data.username)
 
-    # First try to find user by email
-    # (since form_data.username field is used for both)
+    # Verify credentials off the event loop
     try:
-        user = db.query(User).filter(User.email == form_data.username).first()
-
-        # If not found by email, try username
-        if not user:
-            user = db.query(User).filter(User.username == form_data.username).first()
+        user = await _authenticate(form_data.username, form_data.password, run_db)
+    except PasswordHashingBusy:
+        logger.warning(f"Password hashing saturated, rejecting: {form_data.username}")
+        raise _hashing_busy()
     except Exception as e:
         logger.error(f"Database error during user lookup: {str(e)}")
         raise HTTPException(
@@ -132,8 +281,7 @@ def login(
             detail="Authentication service temporarily unavailable",
         )
 
-    # Verify credentials
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         logger.warning(f"Failed login attempt for: {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -151,18 +299,90 @@ def login(
 
     # Generate access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
+    refresh_token = await run_db(_issue_login_refresh_token, user)
 
     logger.info(f"Successful login for user: {user.email}")
     return LoginResponse(
         access_token=access_token,
         token_type="bearer",
+        refresh_token=refresh_token,
         user=user
     )
 
 
+@router.post("/login", response_model=LoginResponse)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+    request: Request = None,
+) -> Any:
+    """
+    OAuth2 compatible token login.
+    Get an access token and user data for future requests.
+    """
+    return await _login(form_data, sync_runner(db), request)
+
+
+@async_router.post("/login", response_model=LoginResponse)
+async def login_async(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    request: Request = None,
+) -> Any:
+    """
+    OAuth2 compatible token login.
+    Get an access token and user data for future requests.
+    """
+    return await _login(form_data, db.run_sync, request)
+
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(
+    refresh_in: RefreshRequest,
+    db: Session = Depends(get_db),
+    request: Request = None,
+) -> Any:
+    """Exchange a refresh token for a new access token and refresh token."""
+    client_host = request.client.host if request else "unknown"
+    _check_rate_limits(client_host)
+    try:
+        user, refresh_token = rotate_refresh_token(db, refresh_in.refresh_token)
+    except RefreshTokenError as e:
+        logger.warning(f"Refresh rejected from {client_host}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=INVALID_REFRESH_TOKEN,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=refresh_token,
+    )
+
+
+@router.post("/logout")
+def logout(
+    logout_in: Optional[LogoutRequest] = None,
+    db: Session = Depends(get_db),
+    claims: TokenClaims = Depends(get_token_claims),
+) -> Any:
+    """Revoke the current access token and, if given, its refresh token."""
+    if claims.jti:
+        revoke_access_token(db, claims.jti, claims.expires_at)
+    if logout_in and logout_in.refresh_token:
+        revoke_refresh_token(db, logout_in.refresh_token)
+    db.commit()
+    if claims.jti:
+        revoked_tokens.add(claims.jti)
+    logger.info(f"User logged out: {claims.email}")
+    return {"message": "Logged out"}
+
+
 @router.get("/me", response_model=UserSchema)
 def get_current_user_info(current_user: User = Depends(get_current_user)) -> Any:
     """Get current user information."""
@@ -171,6 +391,8 @@ def get_current_user_info(current_user: User = Depends(get_current_user)) -> Any
 
 @router.options("/login")
 @router.options("/register")
+@router.options("/refresh")
+@router.options("/logout")
 async def handle_auth_options():
     """Handle OPTIONS requests for authentication endpoints"""
     return {"message": "OK"}
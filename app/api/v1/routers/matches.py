@@ -1,13 +1,21 @@
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.models.match import Match, MatchStatus
 from app.models.user import User
 from app.schemas.match import MatchCreate, MatchUpdate, Match as MatchSchema
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import (
+    TokenClaims,
+    get_async_token_claims,
+    get_current_user,
+    get_token_claims,
+)
+from app.services.recommendation_cache import recommendation_cache
 
 # Error messages
 MATCH_NOT_FOUND = "Match not found"
@@ -18,16 +26,13 @@ NOT_AUTHORIZED = "Only the match recipient can update the status"
 INVALID_UPDATE = "Can only update pending matches"
 
 router = APIRouter(prefix="/matches", tags=["matches"])
+# Routes served with an async session when ASYNC_DB_ENABLED is set
+async_router = APIRouter(prefix="/matches", tags=["matches"])
 
 
-@router.post("", response_model=MatchSchema)
-def create_match(
-    match_in: MatchCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-) -> Any:
-    """Create a new dinner match request."""
-    if match_in.recipient_id == current_user.id:
+def _create_match(db: Session, sender_id: int, match_in: MatchCreate) -> Match:
+    """Create a pending match request from `sender_id`"""
+    if match_in.recipient_id == sender_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_MATCH
         )
@@ -41,7 +46,7 @@ def create_match(
     existing_match = (
         db.query(Match)
         .filter(
-            Match.sender_id == current_user.id,
+            Match.sender_id == sender_id,
             Match.receiver_id == match_in.recipient_id,
             Match.status == MatchStatus.PENDING,
         )
@@ -54,7 +59,7 @@ def create_match(
         )
 
     match = Match(
-        sender_id=current_user.id,
+        sender_id=sender_id,
         receiver_id=match_in.recipient_id,
         restaurant_preference=match_in.restaurant_preference,
         proposed_date=match_in.proposed_date,
@@ -63,23 +68,63 @@ def create_match(
     db.add(match)
     db.commit()
     db.refresh(match)
+    recommendation_cache.invalidate(match.sender_id, match.receiver_id)
+    return match
+
+
+def _update_match(
+    db: Session, match_id: int, receiver_id: int, match_in: MatchUpdate
+) -> Match:
+    """Update a pending match received by `receiver_id`"""
+    match = db.query(Match).filter(Match.id == match_id).first()
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=MATCH_NOT_FOUND
+        )
+
+    if match.receiver_id != receiver_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=NOT_AUTHORIZED
+        )
+
+    if match.status != MatchStatus.PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_UPDATE
+        )
+
+    for field, value in match_in.dict(exclude_unset=True).items():
+        setattr(match, field, value)
+
+    db.commit()
+    db.refresh(match)
+    recommendation_cache.invalidate(match.sender_id, match.receiver_id)
     return match
 
 
+@router.post("", response_model=MatchSchema)
+def create_match(
+    match_in: MatchCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """Create a new dinner match request."""
+    return _create_match(db, current_user.id, match_in)
+
+
 @router.get("/sent", response_model=List[MatchSchema])
 def get_sent_matches(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_db), claims: TokenClaims = Depends(get_token_claims)
 ) -> Any:
     """Get all matches sent by the current user."""
-    return db.query(Match).filter(Match.sender_id == current_user.id).all()
+    return db.query(Match).filter(Match.sender_id == claims.user_id).all()
 
 
 @router.get("/received", response_model=List[MatchSchema])
 def get_received_matches(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_db), claims: TokenClaims = Depends(get_token_claims)
 ) -> Any:
     """Get all matches received by the current user."""
-    return db.query(Match).filter(Match.receiver_id == current_user.id).all()
+    return db.query(Match).filter(Match.receiver_id == claims.user_id).all()
 
 
 @router.put("/{match_id}", response_model=MatchSchema)
@@ -90,25 +135,45 @@ def update_match(
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """Update a match (accept/reject and update details)."""
-    match = db.query(Match).filter(Match.id == match_id).first()
-    if not match:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail=MATCH_NOT_FOUND
-        )
+    return _update_match(db, match_id, current_user.id, match_in)
 
-    if match.receiver_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail=NOT_AUTHORIZED
-        )
 
-    if match.status != MatchStatus.PENDING:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail=INVALID_UPDATE
-        )
+@async_router.post("", response_model=MatchSchema)
+async def create_match_async(
+    match_in: MatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenClaims = Depends(get_async_token_claims),
+) -> Any:
+    """Create a new dinner match request."""
+    return await db.run_sync(_create_match, claims.user_id, match_in)
 
-    for field, value in match_in.dict(exclude_unset=True).items():
-        setattr(match, field, value)
 
-    db.commit()
-    db.refresh(match)
-    return match
+@async_router.get("/sent", response_model=List[MatchSchema])
+async def get_sent_matches_async(
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenClaims = Depends(get_async_token_claims),
+) -> Any:
+    """Get all matches sent by the current user."""
+    matches = await db.scalars(select(Match).where(Match.sender_id == claims.user_id))
+    return matches.all()
+
+
+@async_router.get("/received", response_model=List[MatchSchema])
+async def get_received_matches_async(
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenClaims = Depends(get_async_token_claims),
+) -> Any:
+    """Get all matches received by the current user."""
+    matches = await db.scalars(select(Match).where(Match.receiver_id == claims.user_id))
+    return matches.all()
+
+
+@async_router.put("/{match_id}", response_model=MatchSchema)
+async def update_match_async(
+    match_id: int,
+    match_in: MatchUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    claims: TokenClaims = Depends(get_async_token_claims),
+) -> Any:
+    """Update a match (accept/reject and update details)."""
+    return await db.run_sync(_update_match, match_id, claims.user_id, match_in)
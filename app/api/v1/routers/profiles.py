@@ -13,9 +13,11 @@ from app.schemas.profile import (
     ProfilePhoto,
     VerificationRequest,
 )
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import TokenClaims, get_current_user, get_token_claims
 from app.models.user import User
 from app.services.storage import upload_file, delete_file
+from app.services.candidate_index import candidate_index
+from app.services.recommendation_cache import recommendation_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -58,6 +60,13 @@ def create_profile(
         db.add(profile)
         db.commit()
         db.refresh(profile)
+        candidate_index.update(
+            profile.user_id,
+            profile.cuisine_preferences,
+            profile.location,
+            profile.geo_cell,
+        )
+        recommendation_cache.invalidate(profile.user_id)
         logger.info(f"Created profile for user: {current_user.id}")
         return profile
     except Exception as e:
@@ -72,14 +81,15 @@ def create_profile(
 @router.get("/", response_model=ProfileSchema)
 @router.get("/me", response_model=ProfileSchema)
 def get_my_profile(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_db), claims: TokenClaims = Depends(get_token_claims)
 ) -> Any:
     """Get current user's profile."""
-    if not current_user.profile:
+    profile = db.query(Profile).filter(Profile.user_id == claims.user_id).first()
+    if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=PROFILE_NOT_FOUND
         )
-    return current_user.profile
+    return profile
 
 
 @router.put("/", response_model=ProfileSchema)
@@ -100,6 +110,13 @@ def update_my_profile(
 
     db.commit()
     db.refresh(current_user.profile)
+    candidate_index.update(
+        current_user.id,
+        current_user.profile.cuisine_preferences,
+        current_user.profile.location,
+        current_user.profile.geo_cell,
+    )
+    recommendation_cache.invalidate(current_user.id)
     return current_user.profile
 
 
@@ -1,20 +1,39 @@
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 import os
 import uuid
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy import and_, not_, or_
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Response,
+    status,
+    UploadFile,
+    File,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.models.user import User
-from app.models.profile import Profile
-from app.models.match import Match, MatchStatus  # Added MatchStatus import
 from app.schemas.auth import User as UserSchema, UserProfileUpdate
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import (
+    get_async_current_user,
+    get_current_admin_user,
+    get_current_user,
+)
+from app.services.matching import (
+    decode_cursor,
+    encode_cursor,
+    explain_potential_matches,
+    rank_scored_matches,
+)
+from app.services.scoring_model import scoring_models
 
 router = APIRouter(prefix="/users", tags=["users"])
+# Routes served with an async session when ASYNC_DB_ENABLED is set
+async_router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me", response_model=UserSchema)
@@ -23,6 +42,14 @@ def get_current_user_info(current_user: User = Depends(get_current_user)) -> Any
     return current_user
 
 
+@async_router.get("/me", response_model=UserSchema)
+async def get_current_user_info_async(
+    current_user: User = Depends(get_async_current_user),
+) -> Any:
+    """Get current user information."""
+    return current_user
+
+
 @router.put("/me", response_model=UserSchema)
 def update_current_user_profile(
     profile_update: UserProfileUpdate,
@@ -141,76 +168,14 @@ async def upload_profile_picture(
         )
 
 
-def _calculate_cuisine_score(user_preferences: str, match_preferences: str) -> float:
-    """Calculate cuisine preference compatibility score"""
-    if not user_preferences or not match_preferences:
-        return 0
-
-    user_cuisines = set(c.strip().lower() for c in user_preferences.split(","))
-    match_cuisines = set(c.strip().lower() for c in match_preferences.split(","))
-    common_cuisines = user_cuisines.intersection(match_cuisines)
-    denominator = max(len(user_cuisines), len(match_cuisines))
-    score = (len(common_cuisines) / denominator) * 30
-    return score
-
-
-def _calculate_location_score(user_location: str, match_location: str) -> float:
-    """Calculate location compatibility score"""
-    if not user_location or not match_location:
-        return 0
-    return 25 if user_location.lower() == match_location.lower() else 0
-
-
-def _calculate_dietary_score(user_restrictions: str, match_restrictions: str) -> float:
-    """Calculate dietary restrictions compatibility score"""
-    if not user_restrictions or not match_restrictions:
-        return 0
-    return 25 if user_restrictions.lower() == match_restrictions.lower() else 0
-
-
-def _calculate_success_rate_score(db: Session, user_id: int) -> float:
-    """Calculate match success rate score"""
-    user_matches = (
-        db.query(Match)
-        .filter(
-            or_(Match.sender_id == user_id, Match.receiver_id == user_id),
-            Match.status == MatchStatus.ACCEPTED,
-        )
-        .count()
-    )
-    total_matches = (
-        db.query(Match)
-        .filter(or_(Match.sender_id == user_id, Match.receiver_id == user_id))
-        .count()
-    )
-    return (user_matches / total_matches) * 20 if total_matches > 0 else 0
-
-
-def _get_matched_user_ids(db: Session, current_user_id: int) -> set:
-    """Get set of user IDs that are already matched"""
-    matched_users = (
-        db.query(Match)
-        .filter(
-            or_(
-                Match.sender_id == current_user_id, Match.receiver_id == current_user_id
-            )
-        )
-        .all()
-    )
-
-    matched_ids = {current_user_id}
-    for match in matched_users:
-        matched_ids.add(match.sender_id)
-        matched_ids.add(match.receiver_id)
-    return matched_ids
-
-
 @router.get("/potential-matches", response_model=List[UserSchema])
 def get_potential_matches(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = None,
+    response: Response = None,
 ) -> Any:
     """
     Get potential dinner matches for the current user.
@@ -223,44 +188,97 @@ def get_potential_matches(
         - Location proximity (25%)
         - Dietary restrictions compatibility (25%)
         - Match history success rate (20%)
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one.
     """
-    if not current_user.profile:
-        return []
+    after = _decode_cursor_param(cursor)
+    ranked = _rank_potential_matches(db, current_user, skip, limit, after)
+    return _potential_matches_page(ranked, limit, response)
 
-    matched_user_ids = _get_matched_user_ids(db, current_user.id)
 
-    # Query for potential matches with their profiles
-    potential_matches = (
-        db.query(User, Profile)
-        .join(Profile)
-        .filter(and_(User.is_active.is_(True), not_(User.id.in_(matched_user_ids))))
-        .all()
+@async_router.get("/potential-matches", response_model=List[UserSchema])
+async def get_potential_matches_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_async_current_user),
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    response: Response = None,
+) -> Any:
+    """
+    Get potential dinner matches for the current user.
+    See get_potential_matches; ranking runs on the async session.
+    """
+    after = _decode_cursor_param(cursor)
+    ranked = await db.run_sync(
+        _rank_potential_matches, current_user, skip, limit, after
     )
+    return _potential_matches_page(ranked, limit, response)
+
 
-    # Calculate compatibility scores
-    scored_matches = []
-    for user, profile in potential_matches:
-        score = sum(
-            [
-                _calculate_cuisine_score(
-                    current_user.profile.cuisine_preferences,
-                    profile.cuisine_preferences,
-                ),
-                _calculate_location_score(
-                    current_user.profile.location, profile.location
-                ),
-                _calculate_dietary_score(
-                    current_user.profile.dietary_restrictions,
-                    profile.dietary_restrictions,
-                ),
-                _calculate_success_rate_score(db, user.id),
-            ]
+def _decode_cursor_param(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
         )
-        scored_matches.append((user, score))
 
-    # Sort by compatibility score and paginate
-    scored_matches.sort(key=lambda x: x[1], reverse=True)
-    return [match[0] for match in scored_matches[skip : skip + limit]]
+
+def _rank_potential_matches(db: Session, current_user: User, skip, limit, after):
+    if not current_user.profile:
+        return []
+    return rank_scored_matches(db, current_user, skip=skip, limit=limit, after=after)
+
+
+def _potential_matches_page(ranked, limit: int, response: Optional[Response]):
+    """The ranked users, with the next page cursor set on the response"""
+    if response is not None and ranked and len(ranked) == limit:
+        last_user, last_score = ranked[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last_score, last_user.id)
+    return [user for user, _ in ranked]
+
+
+@router.get("/potential-matches/explain", response_model=Dict[str, Any])
+def explain_matches(
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user),
+    user_id: Optional[int] = None,
+    limit: int = 10,
+    model: Optional[str] = None,
+) -> Any:
+    """
+    Explain the match ranking of a user (default: the caller). Admin only.
+    Returns the per-component scores of the top candidates, the time spent
+    building the exclusion set, fetching candidates, scoring, sorting and
+    serializing, and the number of SQL statements issued.
+    Pass `model` to score with another configured scoring model than the
+    one the user is assigned to.
+    """
+    scoring_model = None
+    if model is not None:
+        try:
+            scoring_model = scoring_models.get(model)
+        except KeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown scoring model: {model}",
+            )
+
+    user = admin_user
+    if user_id is not None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+            )
+    if not user.profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User has no profile to match on",
+        )
+    return explain_potential_matches(db, user, limit=limit, model=scoring_model)
 
 
 @router.get("/{user_id}", response_model=UserSchema)
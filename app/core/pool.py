@@ -0,0 +1,79 @@
+import time
+import logging
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.services.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def pool_label(pool: Pool) -> str:
+    """Metrics label of a pool: its engine's pool_logging_name"""
+    return pool._orig_logging_name or "primary"
+
+
+class _InstrumentedPool:
+    """
+    Times every checkout, including waiting for a free connection, and
+    counts checkouts that gave up after pool_timeout
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.inc("db_pool_timeouts_total", database=pool_label(self))
+            raise
+        finally:
+            metrics.observe(
+                "db_pool_checkout_wait_seconds",
+                time.perf_counter() - start,
+                database=pool_label(self),
+            )
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    """QueuePool with checkout wait and timeout metrics"""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout wait and timeout metrics"""
+
+
+def count_new_connections(engine: Engine) -> None:
+    """
+    Count the DBAPI connections an engine's pool opens, from pool events; a
+    steady rate means connections are churning (recycled or invalidated)
+    """
+    label = pool_label(engine.pool)
+
+    def on_connect(dbapi_connection, connection_record):
+        metrics.inc("db_pool_connections_opened_total", database=label)
+
+    event.listen(engine, "connect", on_connect)
+
+
+def warm_up_pool(engine: Engine, connections: int) -> int:
+    """
+    Open up to `connections` connections at once and return them to the
+    pool, so the first requests after a deploy do not pay for connecting.
+    Returns the number opened.
+    """
+    opened = []
+    start = time.perf_counter()
+    try:
+        for _ in range(connections):
+            opened.append(engine.raw_connection())
+    finally:
+        for connection in opened:
+            connection.close()
+    logger.info(
+        f"Opened {len(opened)} connections to {pool_label(engine.pool)} in "
+        f"{(time.perf_counter() - start) * 1000:.0f}ms"
+    )
+    return len(opened)
@@ -0,0 +1,251 @@
+import math
+import time
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.services.metrics import MetricsRegistry, metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# HTTP methods whose requests may read from a replica
+READ_METHODS = ("GET", "HEAD")
+
+# session.info keys
+_READ_ONLY = "replicas_read_only"
+_PINNED = "replicas_pinned"
+_WROTE = "replicas_wrote"
+_USER_ID = "replicas_user_id"
+_REPLICA = "replicas_engine"
+
+# Recent writers kept before expired entries are swept
+_SWEEP_THRESHOLD = 10000
+
+# Cookie holding the end (unix time) of the staleness window a client's
+# writes opened. The router only tracks writers in its own worker process;
+# the cookie keeps the client's reads on the primary whichever worker
+# serves them. Clients that drop cookies only get the per-process window.
+STALENESS_COOKIE = "db_primary_until"
+
+
+def _is_read(clause) -> bool:
+    """A plain SELECT; SELECT .. FOR UPDATE must lock rows on the primary"""
+    return (
+        getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+    )
+
+
+def pool_stats(engine: Engine) -> Dict[str, int]:
+    """Size and usage of an engine's connection pool, where the pool tracks it"""
+    stats = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(engine.pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+
+class ReplicaRouter:
+    """
+    Read replicas of the primary database, and the users whose own recent
+    writes the replicas may not show yet. Writers are tracked per worker
+    process for `staleness_seconds`, which should exceed the replication lag;
+    across workers the STALENESS_COOKIE carries the window.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: List[Engine],
+        staleness_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.staleness_seconds = staleness_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # user id -> end of their staleness window
+        self._recent_writes: Dict[int, float] = {}
+        self._next = itertools.count()
+
+    def choose_replica(self) -> Tuple[str, Engine]:
+        """Name and engine of the next replica, round robin"""
+        index = next(self._next) % len(self.replicas)
+        return f"replica{index}", self.replicas[index]
+
+    def record_write(self, user_id: int) -> None:
+        """Open (or extend) a user's staleness window"""
+        if not self.replicas:
+            return
+        with self._lock:
+            now = self._clock()
+            if len(self._recent_writes) >= _SWEEP_THRESHOLD:
+                self._recent_writes = {
+                    uid: until
+                    for uid, until in self._recent_writes.items()
+                    if until > now
+                }
+            self._recent_writes[user_id] = now + self.staleness_seconds
+
+    def wrote_recently(self, user_id: int) -> bool:
+        """Whether a user's staleness window is open"""
+        with self._lock:
+            until = self._recent_writes.get(user_id)
+            if until is None:
+                return False
+            if until <= self._clock():
+                del self._recent_writes[user_id]
+                return False
+            return True
+
+    def clear(self) -> None:
+        """Forget recent writers"""
+        with self._lock:
+            self._recent_writes.clear()
+
+    def engines(self) -> Iterator[Tuple[str, Engine]]:
+        """Every engine with its metrics label"""
+        yield "primary", self.primary
+        for index, replica in enumerate(self.replicas):
+            yield f"replica{index}", replica
+
+    def collect_metrics(self, registry: MetricsRegistry) -> None:
+        """Publish pool gauges per database"""
+        for name, engine in self.engines():
+            for stat, value in pool_stats(engine).items():
+                registry.set_gauge(f"db_pool_{stat}", value, database=name)
+        registry.set_gauge("db_replica_recent_writers", len(self._recent_writes))
+
+
+class RoutingSession(Session):
+    """
+    Session that serves the reads of read-only requests from a replica,
+    one per session so a request sees a single snapshot. Writes, locking
+    reads, and every read once the session wrote or its user is inside
+    their staleness window go to the primary (the session's bind).
+    """
+
+    def __init__(self, *args, router: Optional[ReplicaRouter] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self.info[_WROTE] = True
+        elif (
+            clause is not None
+            and self.router is not None
+            and self.router.replicas
+            and self.info.get(_READ_ONLY)
+            and not self.info.get(_WROTE)
+            and not self.info.get(_PINNED)
+        ):
+            if _REPLICA not in self.info:
+                name, replica = self.router.choose_replica()
+                self.info[_REPLICA] = replica
+                metrics.inc("db_replica_sessions_total", database=name)
+            return self.info[_REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+class WriteWindow:
+    """End of the staleness window opened by one request's writes"""
+
+    def __init__(self):
+        self.until: Optional[float] = None
+
+
+_current_window: ContextVar[Optional[WriteWindow]] = ContextVar(
+    "replicas_write_window", default=None
+)
+
+
+@contextmanager
+def track_writes() -> Iterator[WriteWindow]:
+    """
+    Collect the staleness window opened by writes committed in this context,
+    including threadpool calls made from it
+    """
+    window = WriteWindow()
+    token = _current_window.set(window)
+    try:
+        yield window
+    finally:
+        _current_window.reset(token)
+
+
+def set_staleness_cookie(response, window: WriteWindow) -> None:
+    """Hand the client the staleness window its request's writes opened"""
+    if window.until is None:
+        return
+    response.set_cookie(
+        STALENESS_COOKIE,
+        f"{window.until:.3f}",
+        max_age=max(1, math.ceil(window.until - time.time())),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_committed_write(session):
+    """Keep the session and its user on the primary after a write"""
+    if session.info.pop(_WROTE, False):
+        session.info[_PINNED] = True
+        router = session.router
+        if router is None or not router.replicas:
+            return
+        user_id = session.info.get(_USER_ID)
+        if user_id is not None:
+            router.record_write(user_id)
+        window = _current_window.get()
+        if window is not None:
+            window.until = time.time() + router.staleness_seconds
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_rolled_back_write(session):
+    session.info.pop(_WROTE, None)
+
+
+def route_request(
+    db: Session, method: str, primary_until: Optional[str] = None
+) -> None:
+    """
+    Let the session of a read-only request read from a replica, unless
+    `primary_until` (the client's STALENESS_COOKIE) says its own write may
+    not have replicated yet
+    """
+    if method in READ_METHODS:
+        db.info[_READ_ONLY] = True
+    router = getattr(db, "router", None)
+    if primary_until and router is not None:
+        try:
+            remaining = float(primary_until) - time.time()
+        except ValueError:
+            return
+        # Values beyond the window cannot come from this app
+        if 0 < remaining <= router.staleness_seconds:
+            db.info[_PINNED] = True
+
+
+def bind_user(db: Session, user_id: int) -> None:
+    """
+    Tie a session to the user making the request: their writes open a
+    staleness window, and inside it their sessions read from the primary.
+    Call before the session's first read for the user.
+    """
+    db.info[_USER_ID] = user_id
+    router = getattr(db, "router", None)
+    if router is not None and router.wrote_recently(user_id):
+        db.info[_PINNED] = True
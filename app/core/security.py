@@ -5,6 +5,7 @@ from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
 import os
+import uuid
 import logging
 
 # Configure logging
@@ -22,15 +23,19 @@ if SECRET_KEY == "your-secret-key-for-jwt":
     )
 
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
-# Default to 24 hours
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+# Short-lived: clients renew access tokens through /auth/refresh
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
 
-# Create password context for hashing with optimized rounds
+# bcrypt cost factor: every increment doubles the hashing time.
+# Lower it for development only (e.g. BCRYPT_ROUNDS=4); hashes made with
+# another cost are upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Create password context for hashing
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    # Reduced from default 12 for faster hashing in development
-    bcrypt__rounds=4,
+    bcrypt__rounds=BCRYPT_ROUNDS,
 )
 
 # OAuth2 scheme for token authentication
@@ -46,11 +51,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.now(timezone.utc) + timedelta(
             minutes=ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode.update({"exp": expire})
+    # Token id, so that a single token can be revoked on logout
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def create_user_access_token(user, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create an access token carrying the identity claims: the user id, the
+    active flag and the token version, next to the email subject.
+    """
+    return create_access_token(
+        {
+            "sub": user.email,
+            "uid": user.id,
+            "act": bool(user.is_active),
+            "ver": user.token_version or 0,
+        },
+        expires_delta=expires_delta,
+    )
+
+
 def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
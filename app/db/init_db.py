@@ -1,9 +1,47 @@
+import random
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
-from typing import List
 
 from app.core.security import get_password_hash
+from app.models.match import Match, MatchStatus
 from app.models.user import User
-from app.models.profile import Profile
+from app.models.profile import (
+    Profile,
+    ProfileCuisine,
+    ProfileDietary,
+    normalize_tags,
+)
+from app.services.geo import geocode, grid_cell
+from app.services.match_stats import rebuild_match_stats
+from app.services.preference_bits import (
+    CUISINE_VOCABULARY,
+    DIETARY_BITS,
+    cuisine_bits,
+    encode_mask,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Synthetic population: (value, relative weight)
+SYNTHETIC_LOCATIONS = [
+    ("New York", 12), ("Brooklyn", 5), ("Queens", 3), ("Jersey City", 2),
+    ("Boston", 5), ("Cambridge", 2), ("Chicago", 8), ("San Francisco", 6),
+    ("Oakland", 2), ("Los Angeles", 10), ("Santa Monica", 2), ("Seattle", 5),
+    ("Austin", 4), ("Denver", 3), ("Miami", 4), ("Atlanta", 4),
+    ("Smallville", 1), (None, 2),
+]  # fmt: skip
+SYNTHETIC_DIETARY = [
+    ("None", 55), ("Vegetarian", 15), ("Vegan", 6), ("Pescatarian", 5),
+    ("Halal", 5), ("Kosher", 3), ("Gluten-free", 6), (None, 5),
+]  # fmt: skip
+# Cuisines without a bit in the preference vocabulary
+SYNTHETIC_RARE_CUISINES = ["Szechuan", "Basque", "Uzbek", "Georgian"]
+SYNTHETIC_PASSWORD = "password123"
 
 
 def create_test_users(db: Session) -> List[User]:
@@ -59,21 +97,186 @@ def create_test_users(db: Session) -> List[User]:
                 is_active=True,
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            db.flush()
 
             # Create profile
-            profile = Profile(user_id=user.id, **user_data["profile"])
-            db.add(profile)
-            db.commit()
-            db.refresh(profile)
-
+            db.add(Profile(user_id=user.id, **user_data["profile"]))
             created_users.append(user)
 
+    db.commit()
     return created_users
 
 
-def init_db(db: Session) -> None:
+def _weighted(rnd: random.Random, choices: list):
+    """Pick a value from (value, weight) pairs"""
+    values, weights = zip(*choices)
+    return rnd.choices(values, weights)[0]
+
+
+def _synthetic_profile(rnd: random.Random, user_id: int) -> Dict:
+    """Profile row with the columns the ORM events would derive"""
+    # Popular cuisines are drawn more often than the tail of the vocabulary
+    cuisines = set()
+    for _ in range(rnd.randint(1, 5)):
+        if rnd.random() < 0.05:
+            cuisines.add(rnd.choice(SYNTHETIC_RARE_CUISINES))
+        else:
+            index = int(len(CUISINE_VOCABULARY) * rnd.random() ** 2)
+            cuisines.add(CUISINE_VOCABULARY[index].title())
+    cuisine_preferences = ", ".join(sorted(cuisines))
+    dietary_restrictions = _weighted(rnd, SYNTHETIC_DIETARY)
+    location = _weighted(rnd, SYNTHETIC_LOCATIONS)
+
+    latitude = longitude = geo_cell = None
+    point = geocode(location)
+    if point:
+        # Spread users over the metro area
+        latitude = point[0] + rnd.uniform(-0.15, 0.15)
+        longitude = point[1] + rnd.uniform(-0.15, 0.15)
+        geo_cell = grid_cell(latitude, longitude)
+
+    cuisine_mask, cuisine_count = cuisine_bits(normalize_tags(cuisine_preferences))
+    return {
+        "user_id": user_id,
+        "full_name": f"Synthetic User {user_id}",
+        "cuisine_preferences": cuisine_preferences,
+        "dietary_restrictions": dietary_restrictions,
+        "location": location,
+        "latitude": latitude,
+        "longitude": longitude,
+        "geo_cell": geo_cell,
+        "cuisine_mask": cuisine_mask,
+        "cuisine_count": cuisine_count,
+        "dietary_mask": encode_mask(normalize_tags(dietary_restrictions), DIETARY_BITS),
+        "profile_photos": [],
+    }
+
+
+def _synthetic_matches(
+    rnd: random.Random, users: List[tuple], matches_per_user: float
+) -> List[Dict]:
+    """
+    Match rows for (user id, location) pairs. Senders mostly pick users in
+    their own city, receivers are skewed towards a popular minority, and
+    each pair of users is matched at most once.
+    """
+    all_ids = [user_id for user_id, _ in users]
+    by_location: Dict = {}
+    for user_id, location in users:
+        by_location.setdefault(location, []).append(user_id)
+
+    now = datetime.utcnow()
+    statuses = [
+        (MatchStatus.PENDING.value, 5),
+        (MatchStatus.ACCEPTED.value, 3),
+        (MatchStatus.REJECTED.value, 2),
+    ]
+    seen = set()
+    rows = []
+    for sender_id, location in users:
+        for _ in range(rnd.randint(0, int(2 * matches_per_user))):
+            pool = by_location[location] if rnd.random() < 0.7 else all_ids
+            receiver_id = pool[int(len(pool) * rnd.random() ** 2)]
+            pair = (min(sender_id, receiver_id), max(sender_id, receiver_id))
+            if sender_id == receiver_id or pair in seen:
+                continue
+            seen.add(pair)
+            created_at = now - timedelta(minutes=rnd.randint(0, 60 * 24 * 90))
+            rows.append(
+                {
+                    "sender_id": sender_id,
+                    "receiver_id": receiver_id,
+                    "status": _weighted(rnd, statuses),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            )
+    return rows
+
+
+def generate_population(
+    db: Session,
+    n_users: int,
+    seed: int = 0,
+    matches_per_user: float = 3.0,
+    batch_size: int = 5000,
+) -> Dict[str, int]:
+    """
+    Bulk insert a reproducible synthetic population: users, profiles with
+    their tags, masks and coordinates, and a match graph between them.
+    Works on SQLite and PostgreSQL; rows are inserted with executemany in
+    batches of `batch_size` and committed per batch.
+    """
+    rnd = random.Random(seed)
+    # One bcrypt hash for everyone; hashing per user would dominate the run
+    hashed_password = get_password_hash(SYNTHETIC_PASSWORD)
+    # Above every existing suffix, which is below its user's id, even after
+    # users were deleted
+    offset = db.query(func.max(User.id)).scalar() or 0
+    users = []
+
+    for start in range(0, n_users, batch_size):
+        count = min(batch_size, n_users - start)
+        user_rows = [
+            {
+                "email": f"synthetic{offset + start + i}@example.com",
+                "username": f"synthetic{offset + start + i}",
+                "hashed_password": hashed_password,
+                "is_active": rnd.random() > 0.02,
+            }
+            for i in range(count)
+        ]
+        user_ids = (
+            db.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                user_rows,
+            )
+            .scalars()
+            .all()
+        )
+        profile_rows = [_synthetic_profile(rnd, user_id) for user_id in user_ids]
+        profile_ids = (
+            db.execute(
+                insert(Profile).returning(Profile.id, sort_by_parameter_order=True),
+                profile_rows,
+            )
+            .scalars()
+            .all()
+        )
+
+        cuisine_rows, dietary_rows = [], []
+        for profile_id, profile in zip(profile_ids, profile_rows):
+            cuisine_rows.extend(
+                {"profile_id": profile_id, "cuisine": cuisine}
+                for cuisine in normalize_tags(profile["cuisine_preferences"])
+            )
+            dietary_rows.extend(
+                {"profile_id": profile_id, "restriction": restriction}
+                for restriction in normalize_tags(profile["dietary_restrictions"])
+            )
+            users.append((profile["user_id"], profile["location"]))
+        if cuisine_rows:
+            db.execute(insert(ProfileCuisine), cuisine_rows)
+        if dietary_rows:
+            db.execute(insert(ProfileDietary), dietary_rows)
+        db.commit()
+
+    match_rows = _synthetic_matches(rnd, users, matches_per_user)
+    for start in range(0, len(match_rows), batch_size):
+        db.execute(insert(Match), match_rows[start : start + batch_size])
+        db.commit()
+    # Bulk inserts bypass the per-match counter updates
+    rebuild_match_stats(db)
+
+    logger.info(f"Generated {len(users)} synthetic users and {len(match_rows)} matches")
+    return {"users": len(users), "matches": len(match_rows)}
+
+
+def init_db(db: Session, synthetic_users: int = 0, seed: int = 0) -> None:
     """Initialize the database with test data"""
     # Create test users with profiles
     create_test_users(db)
+
+    # Optionally add a synthetic population for load testing
+    if synthetic_users:
+        generate_population(db, synthetic_users, seed=seed)
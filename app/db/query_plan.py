@@ -0,0 +1,99 @@
+import json
+import logging
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def capture_statements(db: Session, fn: Callable[[], Any]) -> Tuple[Any, List]:
+    """
+    Call `fn` and return its result with the (statement, parameters) pairs
+    it sent to the database, as the driver received them.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if not many:
+            statements.append((statement, parameters))
+
+    connection = db.connection()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        return fn(), statements
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
+def _postgresql_scans(node: dict):
+    if "Relation Name" in node:
+        yield node["Relation Name"], node["Node Type"] == "Seq Scan"
+    for child in node.get("Plans", ()):
+        yield from _postgresql_scans(child)
+
+
+def explain_scans(db: Session, statement: str, parameters=None) -> List[Tuple]:
+    """
+    (table, full_scan) for every table access in the plan of a driver-level
+    statement. On PostgreSQL sequential scans are disabled while planning,
+    so a Seq Scan in the plan means no index can serve the query at all,
+    not merely that the planner found the table small. On SQLite every SCAN
+    step is a full scan; SEARCH steps count when they use a real index.
+    """
+    connection = db.connection()
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        try:
+            plan = connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            ).scalar()
+        finally:
+            connection.exec_driver_sql("RESET enable_seqscan")
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return list(_postgresql_scans(plan[0]["Plan"]))
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        ).fetchall()
+        scans = []
+        for row in rows:
+            # "SCAN matches", "SEARCH matches USING INDEX ..."; before
+            # SQLite 3.36 the name is preceded by TABLE. An automatic index
+            # is built per query from a full scan.
+            detail = row[-1]
+            words = detail.replace(" TABLE ", " ", 1).split(" ")
+            if words[0] in ("SCAN", "SEARCH") and len(words) > 1:
+                full_scan = (
+                    words[0] == "SCAN"
+                    or " USING " not in detail
+                    or " AUTOMATIC " in detail
+                )
+                scans.append((words[1], full_scan))
+        return scans
+    raise NotImplementedError(f"No query plan support for {dialect}")
+
+
+def find_sequential_scans(
+    db: Session, fn: Callable[[], Any], tables: Optional[Iterable[str]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Run `fn`, explain every SELECT it issued and return (table, statement)
+    for each full scan, limited to `tables` when given. Meant for tests
+    over a seeded dataset, to catch queries that lose their index.
+    """
+    tables = set(tables) if tables is not None else None
+    _, statements = capture_statements(db, fn)
+    found = []
+    for statement, parameters in statements:
+        if not statement.lstrip().upper().startswith("SELECT"):
+            continue
+        for table, full_scan in explain_scans(db, statement, parameters):
+            if full_scan and (tables is None or table in tables):
+                logger.warning(f"Sequential scan on {table}: {statement}")
+                found.append((table, statement))
+    return found
@@ -1,6 +1,8 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import os
@@ -9,8 +11,19 @@ from pathlib import Path
 from pydantic import ValidationError
 
 from app.api.v1.routers import auth, matches, profiles, users
-from app.core.database import create_tables
+from app.core.database import (
+    ASYNC_DB_ENABLED,
+    DB_POOL_SIZE,
+    DB_POOL_WARM_UP,
+    SessionLocal,
+    create_tables,
+    replica_router,
+)
+from app.core.pool import warm_up_pool
 from app.middleware.middleware import log_requests_middleware
+from app.services.metrics import metrics
+from app.services.scoring_model import scoring_models
+from app.services.token_revocation import revoked_tokens
 from app.utils.error_handler import validation_error_handler
 
 # Configure logging
@@ -20,11 +33,28 @@ logger = logging.getLogger(__name__)
 # Load environment variables first
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Pre-open pool connections in each worker process, so that the first
+    requests after a deploy do not pay for connecting
+    """
+    if DB_POOL_WARM_UP:
+        for name, pooled_engine in replica_router.engines():
+            try:
+                warm_up_pool(pooled_engine, DB_POOL_SIZE)
+            except Exception as e:
+                logger.error(f"Error warming up the {name} connection pool: {str(e)}")
+    yield
+
+
 # Create FastAPI application
 app = FastAPI(
     title="Dinner App API",
     description="API for matching dinner companions",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS - updated for Angular frontend
@@ -55,7 +85,8 @@ app.add_middleware(
         "Authorization",
         "X-Requested-With",
     ],
-    expose_headers=["*"],
+    # "*" is not honoured for credentialed requests, so list custom headers
+    expose_headers=["*", "X-Next-Cursor", "Server-Timing"],
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
@@ -66,6 +97,16 @@ try:
 except Exception as e:
     logger.error(f"Error creating database tables: {str(e)}")
 
+# Validate and compile the scoring models; an invalid file stops startup
+scoring_models.load()
+
+# Load revoked token ids; otherwise the first authenticated request does
+try:
+    with SessionLocal() as db:
+        revoked_tokens.rebuild(db)
+except Exception as e:
+    logger.error(f"Error loading revoked tokens: {str(e)}")
+
 # Create API routers for v1
 v1_app = FastAPI(
     title="Dinner App API",
@@ -76,6 +117,14 @@ v1_app = FastAPI(
     openapi_url="/openapi.json",
 )
 
+# Async session versions of the hot routes; included first, they take
+# precedence over the sync routes on the same paths
+if ASYNC_DB_ENABLED:
+    v1_app.include_router(auth.async_router, prefix="/auth", tags=["auth"])
+    v1_app.include_router(users.async_router, prefix="/users", tags=["users"])
+    v1_app.include_router(matches.async_router, prefix="/matches", tags=["matches"])
+    logger.info("Serving hot routes with the async database engine")
+
 # Include routers in v1_app
 v1_app.include_router(auth.router, prefix="/auth", tags=["auth"])
 v1_app.include_router(users.router, prefix="/users", tags=["users"])
@@ -135,3 +184,11 @@ async def health_check():
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
         return {"status": "unhealthy", "error": str(e)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Application metrics in the Prometheus text format
+    """
+    return metrics.render()
@@ -5,6 +5,9 @@ from typing import Callable
 import json
 import uuid
 
+from app.core.replicas import set_staleness_cookie, track_writes
+from app.services.query_stats import report_request, track_queries
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,12 +50,19 @@ async def log_requests_middleware(request: Request, call_next: Callable):
         headers["authorization"] = "Bearer [REDACTED]"
     logger.info(f"Request {request_id} headers: {json.dumps(headers)}")
 
-    # Process the request
+    # Process the request, collecting the statements it runs
     try:
-        response = await call_next(request)
+        with track_queries() as query_stats, track_writes() as writes:
+            response = await call_next(request)
+        # Keeps the client's next reads on the primary in every worker
+        set_staleness_cookie(response, writes)
 
         # Calculate processing time
         process_time = time.time() - start_time
+        report_request(request_id, query_stats)
+        response.headers["Server-Timing"] = (
+            f"{query_stats.server_timing()}, app;dur={process_time * 1000:.1f}"
+        )
 
         # Log response status
         log_message = (
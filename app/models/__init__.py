@@ -1,7 +1,21 @@
 # Import models in the correct order to avoid circular imports
 from app.models.user import User
-from app.models.profile import Profile
-from app.models.match import Match, MatchStatus
+from app.models.profile import Profile, ProfileCuisine, ProfileDietary
+from app.models.match import Match, MatchStatus, UserMatchStats
+from app.models.recommendation import MatchRecommendation, RecommendationRun
+from app.models.token import RefreshToken, RevokedToken
 
 # Make all models available when importing from app.models
-__all__ = ["User", "Profile", "Match", "MatchStatus"]
+__all__ = [
+    "User",
+    "Profile",
+    "ProfileCuisine",
+    "ProfileDietary",
+    "Match",
+    "MatchStatus",
+    "UserMatchStats",
+    "MatchRecommendation",
+    "RecommendationRun",
+    "RefreshToken",
+    "RevokedToken",
+]
@@ -1,6 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Index,
+    event,
+    inspect,
+    insert,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
+from typing import Dict, Optional
 import enum
 from app.core.database import Base
 
@@ -17,7 +30,10 @@ class Match(Base):
     id = Column(Integer, primary_key=True, index=True)
     sender_id = Column(Integer, ForeignKey("users.id"))
     receiver_id = Column(Integer, ForeignKey("users.id"))
-    status = Column(String, default=MatchStatus.PENDING)
+    # Old status is loaded on change so the counters can be moved
+    status = column_property(
+        Column(String, default=MatchStatus.PENDING), active_history=True
+    )
     restaurant_preference = Column(String, nullable=True)
     proposed_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -30,3 +46,128 @@ class Match(Base):
     receiver = relationship(
         "User", foreign_keys=[receiver_id], back_populates="received_matches"
     )
+
+    # Pair lookups in either direction, e.g. the matched-user anti-join, and
+    # a user's sent or received matches, optionally by status
+    __table_args__ = (
+        Index("ix_matches_sender_id_receiver_id", "sender_id", "receiver_id"),
+        Index("ix_matches_receiver_id_sender_id", "receiver_id", "sender_id"),
+        Index("ix_matches_sender_id_status", "sender_id", "status"),
+        Index("ix_matches_receiver_id_status", "receiver_id", "status"),
+    )
+
+
+class UserMatchStats(Base):
+    """Per-user match counters, maintained on every match write"""
+
+    __tablename__ = "user_match_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sent = Column(Integer, nullable=False, default=0, server_default="0")
+    received = Column(Integer, nullable=False, default=0, server_default="0")
+    # Matches the user takes part in, by status
+    pending = Column(Integer, nullable=False, default=0, server_default="0")
+    accepted = Column(Integer, nullable=False, default=0, server_default="0")
+    rejected = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+STATUS_COUNTERS = {
+    MatchStatus.PENDING.value: "pending",
+    MatchStatus.ACCEPTED.value: "accepted",
+    MatchStatus.REJECTED.value: "rejected",
+}
+
+
+def _status_counter(status) -> Optional[str]:
+    """Counter column for a match status"""
+    if status is None:
+        return None
+    return STATUS_COUNTERS.get(getattr(status, "value", status))
+
+
+def increment_match_stats(connection, user_id: int, deltas: Dict[str, int]) -> None:
+    """
+    Atomically add `deltas` to a user's counters, creating the row if needed.
+    Uses INSERT .. ON CONFLICT DO UPDATE where supported, so concurrent
+    writers never lose an increment.
+    """
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if user_id is None or not deltas:
+        return
+    table = UserMatchStats.__table__
+    now = datetime.utcnow()
+    dialects = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+    if connection.dialect.name in dialects:
+        stmt = dialects[connection.dialect.name](table).values(
+            user_id=user_id, updated_at=now, **deltas
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                "updated_at": now,
+                **{name: table.c[name] + stmt.excluded[name] for name in deltas},
+            },
+        )
+        connection.execute(stmt)
+        return
+
+    result = connection.execute(
+        update(table)
+        .where(table.c.user_id == user_id)
+        .values(
+            updated_at=now, **{name: table.c[name] + d for name, d in deltas.items()}
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(
+            insert(table).values(user_id=user_id, updated_at=now, **deltas)
+        )
+
+
+def _apply_match_deltas(connection, match: Match, sign: int, status) -> None:
+    """Count (sign=1) or uncount (sign=-1) a match with `status`"""
+    per_user: Dict[int, Dict[str, int]] = {}
+    counter = _status_counter(status)
+    for user_id, direction in (
+        (match.sender_id, "sent"),
+        (match.receiver_id, "received"),
+    ):
+        deltas = per_user.setdefault(user_id, {})
+        deltas[direction] = deltas.get(direction, 0) + sign
+        # A match counts once per participant, also if both are the same user
+        if counter:
+            deltas[counter] = sign
+    for user_id, deltas in per_user.items():
+        increment_match_stats(connection, user_id, deltas)
+
+
+@event.listens_for(Match, "after_insert")
+def _count_new_match(mapper, connection, target):
+    """Count a new match in the same transaction"""
+    _apply_match_deltas(connection, target, 1, target.status)
+
+
+@event.listens_for(Match, "after_update")
+def _count_status_change(mapper, connection, target):
+    """Move a match between status counters when its status changes"""
+    history = inspect(target).attrs.status.history
+    if not history.has_changes() or not history.deleted:
+        return
+    old, new = _status_counter(history.deleted[0]), _status_counter(target.status)
+    if old == new:
+        return
+    for user_id in {target.sender_id, target.receiver_id}:
+        deltas = {}
+        if old:
+            deltas[old] = -1
+        if new:
+            deltas[new] = 1
+        increment_match_stats(connection, user_id, deltas)
+
+
+@event.listens_for(Match, "after_delete")
+def _uncount_deleted_match(mapper, connection, target):
+    """Remove a deleted match from the counters"""
+    _apply_match_deltas(connection, target, -1, target.status)
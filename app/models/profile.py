@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    BigInteger,
     Column,
     Integer,
     String,
@@ -7,11 +8,25 @@ from sqlalchemy import (
     Boolean,
     JSON,
     Enum,
+    Float,
+    Index,
+    event,
+    inspect,
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional, Set
 import enum
 from app.core.database import Base
+from app.services.geo import Point, geocode, grid_cell
+from app.services.preference_bits import DIETARY_BITS, cuisine_bits, encode_mask
+
+
+def normalize_tags(value: Optional[str]) -> Set[str]:
+    """Split a comma separated preference string into lowercase tags"""
+    if not value:
+        return set()
+    return set(tag.strip().lower() for tag in value.split(","))
 
 
 class VerificationStatus(str, enum.Enum):
@@ -29,7 +44,17 @@ class Profile(Base):
     bio = Column(String(500), nullable=True)
     cuisine_preferences = Column(String(255), nullable=True)
     dietary_restrictions = Column(String(255), nullable=True)
+    # Bitmasks over the preference_bits vocabularies, kept in step with the
+    # strings above; cuisine_count also counts tags outside the vocabulary
+    cuisine_mask = Column(BigInteger, nullable=False, default=0, server_default="0")
+    cuisine_count = Column(Integer, nullable=False, default=0, server_default="0")
+    dietary_mask = Column(BigInteger, nullable=False, default=0, server_default="0")
     location = Column(String(100), nullable=True)
+    # Coordinates of location, from the client or the gazetteer
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    # Spatial grid cell of (latitude, longitude) for proximity lookups
+    geo_cell = Column(String(32), nullable=True, index=True)
     avatar_url = Column(String(255), nullable=True)
 
     # Changed from String to JSON type for proper data storage
@@ -62,3 +87,91 @@ class Profile(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="profile")
+
+    # Indexed tags parsed from cuisine_preferences / dietary_restrictions
+    cuisine_tags = relationship(
+        "ProfileCuisine", cascade="all, delete-orphan", back_populates="profile"
+    )
+    dietary_tags = relationship(
+        "ProfileDietary", cascade="all, delete-orphan", back_populates="profile"
+    )
+
+    @property
+    def point(self) -> Optional[Point]:
+        """(latitude, longitude) if the profile is geocoded"""
+        if self.latitude is None or self.longitude is None:
+            return None
+        return (self.latitude, self.longitude)
+
+
+class ProfileCuisine(Base):
+    __tablename__ = "profile_cuisines"
+
+    profile_id = Column(
+        Integer, ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True
+    )
+    cuisine = Column(String(255), primary_key=True)
+
+    profile = relationship("Profile", back_populates="cuisine_tags")
+
+    __table_args__ = (
+        Index("ix_profile_cuisines_cuisine_profile_id", "cuisine", "profile_id"),
+    )
+
+
+class ProfileDietary(Base):
+    __tablename__ = "profile_dietary"
+
+    profile_id = Column(
+        Integer, ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True
+    )
+    restriction = Column(String(255), primary_key=True)
+
+    profile = relationship("Profile", back_populates="dietary_tags")
+
+    __table_args__ = (
+        Index("ix_profile_dietary_restriction_profile_id", "restriction", "profile_id"),
+    )
+
+
+@event.listens_for(Profile.cuisine_preferences, "set")
+def _sync_cuisine_tags(target, value, oldvalue, initiator):
+    """Keep profile_cuisines and the cuisine bitmask in step with cuisine_preferences"""
+    tags = normalize_tags(value)
+    existing = {tag.cuisine: tag for tag in target.cuisine_tags}
+    target.cuisine_tags = [
+        existing.get(cuisine) or ProfileCuisine(cuisine=cuisine)
+        for cuisine in sorted(tags)
+    ]
+    target.cuisine_mask, target.cuisine_count = cuisine_bits(tags)
+
+
+@event.listens_for(Profile.dietary_restrictions, "set")
+def _sync_dietary_tags(target, value, oldvalue, initiator):
+    """Keep profile_dietary and the dietary bitmask in step with dietary_restrictions"""
+    tags = normalize_tags(value)
+    existing = {tag.restriction: tag for tag in target.dietary_tags}
+    target.dietary_tags = [
+        existing.get(restriction) or ProfileDietary(restriction=restriction)
+        for restriction in sorted(tags)
+    ]
+    target.dietary_mask = encode_mask(tags, DIETARY_BITS)
+
+
+@event.listens_for(Profile, "before_insert")
+@event.listens_for(Profile, "before_update")
+def _geocode_location(mapper, connection, target):
+    """
+    Geocode a changed location unless coordinates were supplied with it,
+    and keep geo_cell in step with the coordinates.
+    """
+    state = inspect(target)
+    coordinates_supplied = target.point is not None and (
+        state.attrs.latitude.history.has_changes()
+        or state.attrs.longitude.history.has_changes()
+    )
+    if state.attrs.location.history.has_changes() and not coordinates_supplied:
+        target.latitude, target.longitude = geocode(target.location) or (None, None)
+
+    point = target.point
+    target.geo_cell = grid_cell(*point) if point else None
@@ -0,0 +1,45 @@
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+from datetime import datetime
+from app.core.database import Base
+
+
+class MatchRecommendation(Base):
+    """A precomputed candidate in a user's ranked discover feed"""
+
+    __tablename__ = "match_recommendations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    candidate_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    # Key of the scoring model the ranking was computed with
+    model = Column(String(64), nullable=True)
+    # Depth the run ranked to; pages past a ranking this deep are ranked live
+    top_n = Column(Integer, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_match_recommendations_user_id_rank", "user_id", "rank"),
+    )
+
+
+class RecommendationRun(Base):
+    """A run of the offline recommendation job"""
+
+    __tablename__ = "match_recommendation_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    incremental = Column(Boolean, default=False, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    users_computed = Column(Integer, default=0, nullable=False)
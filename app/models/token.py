@@ -0,0 +1,37 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class RefreshToken(Base):
+    """
+    A refresh token, stored as the SHA-256 of its value. Every use rotates
+    it: the token is revoked and a successor in the same family issued.
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    # Shared by a token and its successors; reusing a rotated token
+    # revokes the whole family
+    family_id = Column(String(32), nullable=False, index=True)
+    # users.token_version at issue; revoking the user's tokens retires it
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+
+
+class RevokedToken(Base):
+    """An access token id (jti) revoked before it expires, e.g. on logout"""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_revoked_tokens_revoked_at", "revoked_at"),)
@@ -13,6 +13,8 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
+    # Bumped to revoke every token issued before; carried in the "ver" claim
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Additional profile fields for frontend compatibility
     first_name = Column(String, nullable=True)
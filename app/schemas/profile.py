@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl, validator
+from pydantic import BaseModel, Field, HttpUrl, validator
 from typing import Optional, List, Union
 from enum import Enum
 from datetime import datetime
@@ -18,6 +18,9 @@ class ProfileBase(BaseModel):
     full_name: Optional[str] = None
     bio: Optional[str] = None
     location: Optional[str] = None
+    # Looked up from location when omitted
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
     # Photo fields - make URLs more flexible by accepting strings
     avatar_url: Optional[Union[HttpUrl, str]] = None
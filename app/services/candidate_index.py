@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.models.profile import Profile, normalize_tags
+from app.services.geo import Point, nearby_cells
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Profiles written by other worker processes become visible after a rebuild
+CANDIDATE_INDEX_TTL_SECONDS = int(os.getenv("CANDIDATE_INDEX_TTL_SECONDS", "60"))
+
+
+def cuisine_tokens(cuisine_preferences: Optional[str]) -> Set[str]:
+    """Normalize cuisine preferences to the tokens used for scoring"""
+    return normalize_tags(cuisine_preferences)
+
+
+def location_key(location: Optional[str]) -> Optional[str]:
+    """Normalize a location to the key used for scoring"""
+    return location.lower() if location else None
+
+
+class CandidateIndex:
+    """
+    Inverted index from cuisine tokens, locations and grid cells to user
+    ids. Candidates sharing no cuisine or location with the requester and
+    outside the neighbouring cells can score at most the dietary and
+    success-rate components, so the matcher only needs to scan the
+    overlap unless the page cannot be filled from it.
+    """
+
+    def __init__(self, ttl_seconds: int = CANDIDATE_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None
+        self._by_cuisine = defaultdict(set)
+        self._by_location = defaultdict(set)
+        self._by_cell = defaultdict(set)
+        self._entries = {}
+
+    def _add(
+        self, user_id: int, cuisine_preferences, location, cell: Optional[str]
+    ) -> None:
+        tokens = cuisine_tokens(cuisine_preferences)
+        key = location_key(location)
+        for token in tokens:
+            self._by_cuisine[token].add(user_id)
+        if key:
+            self._by_location[key].add(user_id)
+        if cell:
+            self._by_cell[cell].add(user_id)
+        self._entries[user_id] = (tokens, key, cell)
+
+    def _discard(self, user_id: int) -> None:
+        tokens, key, cell = self._entries.pop(user_id, (set(), None, None))
+        for token in tokens:
+            self._by_cuisine[token].discard(user_id)
+            if not self._by_cuisine[token]:
+                del self._by_cuisine[token]
+        if key:
+            self._by_location[key].discard(user_id)
+            if not self._by_location[key]:
+                del self._by_location[key]
+        if cell:
+            self._by_cell[cell].discard(user_id)
+            if not self._by_cell[cell]:
+                del self._by_cell[cell]
+
+    def update(
+        self,
+        user_id: int,
+        cuisine_preferences,
+        location,
+        geo_cell: Optional[str] = None,
+    ) -> None:
+        """Re-index a profile after its preferences or location changed"""
+        with self._lock:
+            self._discard(user_id)
+            self._add(user_id, cuisine_preferences, location, geo_cell)
+
+    def remove(self, user_id: int) -> None:
+        """Drop a user from the index"""
+        with self._lock:
+            self._discard(user_id)
+
+    def reset(self) -> None:
+        """Forget all entries; the next lookup rebuilds from the database"""
+        with self._lock:
+            self._built_at = None
+            self._by_cuisine.clear()
+            self._by_location.clear()
+            self._by_cell.clear()
+            self._entries.clear()
+
+    def rebuild(self, db: Session) -> None:
+        """Rebuild the index from all profiles"""
+        rows = db.query(
+            Profile.user_id,
+            Profile.cuisine_preferences,
+            Profile.location,
+            Profile.geo_cell,
+        ).all()
+        with self._lock:
+            self._by_cuisine.clear()
+            self._by_location.clear()
+            self._by_cell.clear()
+            self._entries.clear()
+            for user_id, cuisine_preferences, location, geo_cell in rows:
+                self._add(user_id, cuisine_preferences, location, geo_cell)
+            self._built_at = time.monotonic()
+        logger.info(f"Rebuilt candidate index with {len(rows)} profiles")
+
+    def ensure_fresh(self, db: Session) -> None:
+        """Rebuild the index if it was never built or is older than the TTL"""
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.ttl_seconds:
+            self.rebuild(db)
+
+    def candidates(
+        self, cuisine_preferences, location, point: Optional[Point] = None
+    ) -> Set[int]:
+        """
+        User ids sharing at least one cuisine token or the location, or
+        located in a grid cell within matching distance of `point`
+        """
+        with self._lock:
+            user_ids = set()
+            for token in cuisine_tokens(cuisine_preferences):
+                user_ids |= self._by_cuisine.get(token, set())
+            key = location_key(location)
+            if key:
+                user_ids |= self._by_location.get(key, set())
+            if point:
+                for cell in nearby_cells(point):
+                    user_ids |= self._by_cell.get(cell, set())
+            return user_ids
+
+
+candidate_index = CandidateIndex()
@@ -0,0 +1,115 @@
+import os
+import csv
+import math
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# (latitude, longitude) in degrees
+Point = Tuple[float, float]
+
+# Offline mapping from location strings to coordinates
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "gazetteer.csv"),
+)
+# Candidates further away than this get no location points
+GEO_MATCH_RADIUS_KM = float(os.getenv("GEO_MATCH_RADIUS_KM", "50"))
+# Size of the grid cells stored in profiles.geo_cell
+GEO_CELL_DEGREES = float(os.getenv("GEO_CELL_DEGREES", "0.5"))
+
+LOCATION_POINTS = 25
+KM_PER_DEGREE = math.pi / 180 * 6371.0
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer(path: str = GAZETTEER_PATH) -> Dict[str, Point]:
+    """Load the gazetteer CSV (name, latitude, longitude) keyed by lowercase name"""
+    try:
+        with open(path, newline="") as f:
+            gazetteer = {}
+            for row in csv.DictReader(f):
+                point = (float(row["latitude"]), float(row["longitude"]))
+                gazetteer[row["name"].strip().lower()] = point
+            return gazetteer
+    except OSError as e:
+        logger.warning(f"Gazetteer not available at {path}: {str(e)}")
+        return {}
+
+
+def geocode(location: Optional[str]) -> Optional[Point]:
+    """Coordinates of a location string, or None if it is not in the gazetteer"""
+    if not location:
+        return None
+    return load_gazetteer().get(location.strip().lower())
+
+
+def grid_cell(latitude: float, longitude: float) -> str:
+    """Grid cell containing a point, as stored in profiles.geo_cell"""
+    row = math.floor(latitude / GEO_CELL_DEGREES)
+    col = math.floor(longitude / GEO_CELL_DEGREES)
+    return f"{row}:{col}"
+
+
+def longitude_km(latitude: float) -> float:
+    """Length of one degree of longitude at `latitude`"""
+    return KM_PER_DEGREE * math.cos(math.radians(latitude))
+
+
+def nearby_cells(point: Point, radius_km: float = GEO_MATCH_RADIUS_KM) -> List[str]:
+    """Grid cells that can hold points within `radius_km` of `point`"""
+    latitude, longitude = point
+    row = math.floor(latitude / GEO_CELL_DEGREES)
+    col = math.floor(longitude / GEO_CELL_DEGREES)
+    rows = math.ceil(radius_km / (KM_PER_DEGREE * GEO_CELL_DEGREES))
+    cols = math.ceil(radius_km / (max(longitude_km(latitude), 0.01) * GEO_CELL_DEGREES))
+    return [
+        f"{r}:{c}"
+        for r in range(row - rows, row + rows + 1)
+        for c in range(col - cols, col + cols + 1)
+    ]
+
+
+def proximity_score(
+    user_point: Point, point: Point, points: float = LOCATION_POINTS
+) -> float:
+    """
+    Location points decaying with the squared distance, from `points` at the
+    same spot to 0 at GEO_MATCH_RADIUS_KM. Distances use the
+    equirectangular approximation around the requester, which is accurate
+    at matching distances and cheap enough to evaluate in SQL as well.
+    """
+    dy = (point[0] - user_point[0]) * KM_PER_DEGREE
+    dx = (point[1] - user_point[1]) * longitude_km(user_point[0])
+    squared = dx * dx + dy * dy
+    radius_squared = GEO_MATCH_RADIUS_KM**2
+    if squared >= radius_squared:
+        return 0
+    return points * (1 - squared / radius_squared)
+
+
+def proximity_scores(
+    user_point: Point,
+    latitudes: Sequence[Optional[float]],
+    longitudes: Sequence[Optional[float]],
+    points: float = LOCATION_POINTS,
+) -> np.ndarray:
+    """Vectorized proximity_score; NaN where a candidate has no coordinates"""
+    dy = (np.array(latitudes, dtype=np.float64) - user_point[0]) * KM_PER_DEGREE
+    dx = (np.array(longitudes, dtype=np.float64) - user_point[1]) * longitude_km(
+        user_point[0]
+    )
+    squared = dx * dx + dy * dy
+    radius_squared = GEO_MATCH_RADIUS_KM**2
+    scores = np.where(
+        squared < radius_squared,
+        points * (1 - squared / radius_squared),
+        0.0,
+    )
+    scores[np.isnan(squared)] = np.nan
+    return scores
@@ -0,0 +1,68 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.match import STATUS_COUNTERS, Match, UserMatchStats
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def match_counts_query():
+    """
+    Aggregate the user_match_stats counters from the matches table.
+    Every match counts for its sender and its receiver; a match a user sent
+    to themselves is counted once in the status counters.
+    """
+    participants = union_all(
+        select(
+            Match.sender_id.label("user_id"),
+            literal(1).label("sent"),
+            literal(0).label("received"),
+            literal(1).label("counted"),
+            Match.status,
+        ),
+        select(
+            Match.receiver_id.label("user_id"),
+            literal(0).label("sent"),
+            literal(1).label("received"),
+            case((Match.receiver_id == Match.sender_id, 0), else_=1).label("counted"),
+            Match.status,
+        ),
+    ).subquery()
+
+    status_counts = [
+        func.sum(
+            case((participants.c.status == status, participants.c.counted), else_=0)
+        ).label(counter)
+        for status, counter in STATUS_COUNTERS.items()
+    ]
+    return (
+        select(
+            participants.c.user_id,
+            func.sum(participants.c.sent).label("sent"),
+            func.sum(participants.c.received).label("received"),
+            *status_counts,
+        )
+        .where(participants.c.user_id.isnot(None))
+        .group_by(participants.c.user_id)
+    )
+
+
+def rebuild_match_stats(db: Session) -> int:
+    """Recompute every user's counters from the matches table"""
+    counts = match_counts_query().subquery()
+    columns = ["user_id", "sent", "received", *STATUS_COUNTERS.values()]
+
+    db.query(UserMatchStats).delete(synchronize_session=False)
+    result = db.execute(
+        insert(UserMatchStats).from_select(
+            columns + ["updated_at"],
+            select(*[counts.c[name] for name in columns], literal(datetime.utcnow())),
+        )
+    )
+    db.commit()
+    logger.info(f"Rebuilt match stats for {result.rowcount} users")
+    return result.rowcount
@@ -0,0 +1,752 @@
+import os
+import json
+import base64
+import bisect
+import heapq
+import binascii
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import Float, and_, case, cast, exists, func, literal, not_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.match import Match, UserMatchStats
+from app.models.profile import Profile, ProfileCuisine, normalize_tags
+from app.models.recommendation import MatchRecommendation
+from app.models.user import User
+from app.services.candidate_index import candidate_index
+from app.services.geo import (
+    GEO_MATCH_RADIUS_KM,
+    KM_PER_DEGREE,
+    LOCATION_POINTS,
+    Point,
+    longitude_km,
+    proximity_score,
+)
+from app.services.metrics import count_statements, metrics, timed
+from app.services.preference_bits import cuisine_bits, is_fully_encoded
+from app.services.recommendation_cache import recommendation_cache
+from app.services.scoring_model import ScoringModel, scoring_models
+from app.services.vector_scoring import rank_batch
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Keyset pagination position: (score, user id) of the last returned candidate
+Cursor = Tuple[float, int]
+
+# Scoring engines
+ENGINE_PYTHON = "python"
+ENGINE_SQL = "sql"
+ENGINE_NUMPY = "numpy"
+
+# "python" scores every candidate in the application, "sql" lets the
+# database compute the scores and return only the requested page,
+# "numpy" scores the whole candidate batch with vectorized operations
+MATCHING_ENGINE = os.getenv("MATCHING_ENGINE", ENGINE_PYTHON)
+
+# Use the inverted cuisine/location index to rank overlapping candidates first
+MATCHING_CANDIDATE_INDEX = (
+    os.getenv("MATCHING_CANDIDATE_INDEX", "true").lower() == "true"
+)
+
+# Serve repeated feed requests from the per-user ranking cache
+MATCHING_RECOMMENDATION_CACHE = (
+    os.getenv("MATCHING_RECOMMENDATION_CACHE", "true").lower() == "true"
+)
+
+# Serve rankings stored by the offline job (precompute_matches.py) while fresh
+MATCHING_PRECOMPUTED = os.getenv("MATCHING_PRECOMPUTED", "true").lower() == "true"
+MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS = int(
+    os.getenv("MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS", "3600")
+)
+# Number of candidates the offline job stores per user
+MATCH_RECOMMENDATIONS_TOP_N = int(os.getenv("MATCH_RECOMMENDATIONS_TOP_N", "100"))
+
+# Histogram of the time spent in each stage of live ranking, in seconds
+MATCHING_STAGE_METRIC = "matching_stage_seconds"
+
+# Live rankings served per scoring model
+MATCHING_MODEL_METRIC = "matching_model_requests_total"
+
+
+def calculate_cuisine_score(user_preferences: str, match_preferences: str) -> float:
+    """Calculate cuisine preference compatibility score"""
+    if not user_preferences or not match_preferences:
+        return 0
+
+    user_cuisines = normalize_tags(user_preferences)
+    match_cuisines = normalize_tags(match_preferences)
+    common_cuisines = user_cuisines.intersection(match_cuisines)
+    denominator = max(len(user_cuisines), len(match_cuisines))
+    score = (len(common_cuisines) / denominator) * 30
+    return score
+
+
+def calculate_location_score(
+    user_location: str,
+    match_location: str,
+    user_point: Optional[Point] = None,
+    match_point: Optional[Point] = None,
+) -> float:
+    """
+    Calculate location compatibility score.
+    Decays with distance when both profiles are geocoded, otherwise
+    requires the same location string.
+    """
+    if user_point and match_point:
+        return proximity_score(user_point, match_point)
+    if not user_location or not match_location:
+        return 0
+    return 25 if user_location.lower() == match_location.lower() else 0
+
+
+def calculate_dietary_score(user_restrictions: str, match_restrictions: str) -> float:
+    """Calculate dietary restrictions compatibility score"""
+    if not user_restrictions or not match_restrictions:
+        return 0
+    return 25 if user_restrictions.lower() == match_restrictions.lower() else 0
+
+
+def calculate_success_rate_score(accepted_matches: int, total_matches: int) -> float:
+    """Calculate match success rate score"""
+    if not total_matches:
+        return 0
+    return (accepted_matches / total_matches) * 20
+
+
+def match_stats_subquery():
+    """
+    Accepted/total match counts per user from the user_match_stats
+    counters, so joining it against candidates is a primary key lookup
+    instead of an aggregate over the matches table.
+    """
+    return select(
+        UserMatchStats.user_id,
+        UserMatchStats.accepted,
+        (
+            UserMatchStats.pending + UserMatchStats.accepted + UserMatchStats.rejected
+        ).label("total"),
+    ).subquery()
+
+
+def matched_with(user_id: int):
+    """
+    Condition true for users who already have a match with `user_id`, in
+    either direction. Two correlated NOT EXISTS probes on the
+    (sender_id, receiver_id) and (receiver_id, sender_id) indexes keep the
+    statement the same size however long the user's history is.
+    """
+    return or_(
+        exists().where(Match.sender_id == user_id, Match.receiver_id == User.id),
+        exists().where(Match.receiver_id == user_id, Match.sender_id == User.id),
+    )
+
+
+def cuisine_overlap_subquery(user_cuisines: Set[str]):
+    """
+    Shared and total cuisine tags per profile sharing at least one of
+    `user_cuisines`. Both counts come from the indexed profile_cuisines
+    table instead of pattern matching on the raw preference strings.
+    """
+    sharing = select(ProfileCuisine.profile_id).where(
+        ProfileCuisine.cuisine.in_(user_cuisines)
+    )
+    return (
+        select(
+            ProfileCuisine.profile_id,
+            func.sum(
+                case((ProfileCuisine.cuisine.in_(user_cuisines), 1), else_=0)
+            ).label("common"),
+            func.count().label("total"),
+        )
+        .where(ProfileCuisine.profile_id.in_(sharing))
+        .group_by(ProfileCuisine.profile_id)
+        .subquery()
+    )
+
+
+def _sql_cuisine_mask_score(user_mask: int, user_count: int, weight: float = 30):
+    """SQL expression equivalent of cuisine_mask_score"""
+    if not user_count:
+        return literal(0)
+    common = sum(
+        case((Profile.cuisine_mask.bitwise_and(1 << bit) != 0, 1), else_=0)
+        for bit in range(user_mask.bit_length())
+        if user_mask >> bit & 1
+    )
+    denominator = case(
+        (Profile.cuisine_count > user_count, Profile.cuisine_count),
+        else_=user_count,
+    )
+    return case(
+        (
+            Profile.cuisine_count > 0,
+            cast(common, Float) / cast(denominator, Float) * weight,
+        ),
+        else_=0,
+    )
+
+
+def _sql_cuisine_score(user_cuisines: Set[str], overlap, weight: float = 30):
+    """SQL expression equivalent of calculate_cuisine_score"""
+    if overlap is None:
+        return literal(0)
+    denominator = case(
+        (overlap.c.total > len(user_cuisines), overlap.c.total),
+        else_=len(user_cuisines),
+    )
+    return case(
+        (
+            overlap.c.common > 0,
+            cast(overlap.c.common, Float) / cast(denominator, Float) * weight,
+        ),
+        else_=0,
+    )
+
+
+def _sql_equality_score(user_value: str, column, points: int):
+    """SQL expression for the case-insensitive location/dietary scores"""
+    if not user_value:
+        return literal(0)
+    return case((func.lower(column) == user_value.lower(), points), else_=0)
+
+
+def _sql_location_score(user_profile: Profile, weight: float = LOCATION_POINTS):
+    """SQL expression equivalent of calculate_location_score"""
+    equality = _sql_equality_score(user_profile.location, Profile.location, weight)
+    user_point = user_profile.point
+    if user_point is None:
+        return equality
+
+    dy = (Profile.latitude - user_point[0]) * KM_PER_DEGREE
+    dx = (Profile.longitude - user_point[1]) * longitude_km(user_point[0])
+    squared = dx * dx + dy * dy
+    radius_squared = GEO_MATCH_RADIUS_KM**2
+    return case(
+        (or_(Profile.latitude.is_(None), Profile.longitude.is_(None)), equality),
+        (squared < radius_squared, weight * (1 - squared / radius_squared)),
+        else_=0,
+    )
+
+
+def _sql_success_rate_score(match_stats, weight: float = 20):
+    """SQL expression equivalent of calculate_success_rate_score"""
+    total = func.coalesce(match_stats.c.total, 0)
+    return case(
+        (
+            total > 0,
+            cast(match_stats.c.accepted, Float) / cast(total, Float) * weight,
+        ),
+        else_=0,
+    )
+
+
+def _sql_score(model: ScoringModel, user_profile: Profile, match_stats):
+    """
+    Compile `model` for one requester into a single SQL score expression.
+    Returns the expression and the cuisine overlap subquery it needs
+    joined, if any.
+    """
+    weights = model.weights
+    components = []
+    overlap = None
+    if "cuisine" in weights:
+        user_cuisines = normalize_tags(user_profile.cuisine_preferences)
+        user_mask, user_count = cuisine_bits(user_cuisines)
+        if is_fully_encoded(user_mask, user_count):
+            components.append(
+                _sql_cuisine_mask_score(user_mask, user_count, weights["cuisine"])
+            )
+        else:
+            # Tags outside the bit vocabulary: count shared tags with a join
+            overlap = cuisine_overlap_subquery(user_cuisines)
+            components.append(
+                _sql_cuisine_score(user_cuisines, overlap, weights["cuisine"])
+            )
+    if "location" in weights:
+        components.append(_sql_location_score(user_profile, weights["location"]))
+    if "dietary" in weights:
+        components.append(
+            _sql_equality_score(
+                user_profile.dietary_restrictions,
+                Profile.dietary_restrictions,
+                weights["dietary"],
+            )
+        )
+    if "success_rate" in weights:
+        components.append(_sql_success_rate_score(match_stats, weights["success_rate"]))
+
+    # Sum in the same order as the other engines so scores are identical
+    score = components[0]
+    for component in components[1:]:
+        score = score + component
+    if model.divisor is not None:
+        score = score / literal(model.divisor)
+    return score, overlap
+
+
+def _candidate_query(
+    db: Session,
+    query,
+    current_user: User,
+    match_stats,
+    candidate_ids: Optional[Set[int]] = None,
+):
+    """Restrict a query to active, not yet matched users with profiles"""
+    query = (
+        query.join(Profile, Profile.user_id == User.id)
+        .outerjoin(match_stats, match_stats.c.user_id == User.id)
+        .filter(
+            User.is_active.is_(True),
+            User.id != current_user.id,
+            not_(matched_with(current_user.id)),
+        )
+    )
+    if candidate_ids is not None:
+        query = query.filter(User.id.in_(candidate_ids))
+    return query
+
+
+def _stage(stage: str, engine: str):
+    """Time a stage of the live ranking into MATCHING_STAGE_METRIC"""
+    return timed(MATCHING_STAGE_METRIC, stage=stage, engine=engine)
+
+
+def _is_after(score: float, user_id: int, after: Optional[Cursor]) -> bool:
+    """Whether a candidate sorts after the cursor position"""
+    if after is None:
+        return True
+    return (-score, user_id) > (-after[0], after[1])
+
+
+def rank_candidates_python(
+    db: Session,
+    current_user: User,
+    skip: int = 0,
+    limit: int = 10,
+    candidate_ids: Optional[Set[int]] = None,
+    after: Optional[Cursor] = None,
+    model: Optional[ScoringModel] = None,
+) -> List[Tuple[User, float]]:
+    """Score every candidate in Python and return the requested page"""
+    model = model or scoring_models.get()
+    match_stats = match_stats_subquery()
+    score = model.bind(current_user.profile)
+
+    # Query for potential matches with their profiles and match counts
+    with _stage("candidate_fetch", ENGINE_PYTHON):
+        query = db.query(User, Profile, match_stats.c.accepted, match_stats.c.total)
+        potential_matches = _candidate_query(
+            db, query, current_user, match_stats, candidate_ids
+        ).all()
+
+    # Calculate compatibility scores
+    with _stage("scoring", ENGINE_PYTHON):
+        scored_matches = []
+        for user, profile, accepted_matches, total_matches in potential_matches:
+            user_score = score(profile, accepted_matches, total_matches)
+            if _is_after(user_score, user.id, after):
+                scored_matches.append((user, user_score))
+
+    # Select the page by compatibility score (ties by user id)
+    with _stage("sort", ENGINE_PYTHON):
+        page = heapq.nsmallest(
+            skip + limit, scored_matches, key=lambda x: (-x[1], x[0].id)
+        )
+    return page[skip:]
+
+
+def rank_candidates_numpy(
+    db: Session,
+    current_user: User,
+    skip: int = 0,
+    limit: int = 10,
+    candidate_ids: Optional[Set[int]] = None,
+    after: Optional[Cursor] = None,
+    model: Optional[ScoringModel] = None,
+) -> List[Tuple[User, float]]:
+    """Score the candidate batch with NumPy and select the page with top-k"""
+    model = model or scoring_models.get()
+    match_stats = match_stats_subquery()
+    with _stage("candidate_fetch", ENGINE_NUMPY):
+        query = db.query(User, Profile, match_stats.c.accepted, match_stats.c.total)
+        potential_matches = _candidate_query(
+            db, query, current_user, match_stats, candidate_ids
+        ).all()
+    # Scoring and top-k selection run in one vectorized pass
+    with _stage("scoring", ENGINE_NUMPY):
+        return rank_batch(
+            current_user.profile,
+            potential_matches,
+            skip=skip,
+            limit=limit,
+            after=after,
+            model=model,
+        )
+
+
+def rank_candidates_sql(
+    db: Session,
+    current_user: User,
+    skip: int = 0,
+    limit: int = 10,
+    candidate_ids: Optional[Set[int]] = None,
+    after: Optional[Cursor] = None,
+    model: Optional[ScoringModel] = None,
+) -> List[Tuple[User, float]]:
+    """Let the database score candidates and return only the requested page"""
+    model = model or scoring_models.get()
+    match_stats = match_stats_subquery()
+    score, overlap = _sql_score(model, current_user.profile, match_stats)
+
+    query = _candidate_query(
+        db,
+        db.query(User, score.label("score")),
+        current_user,
+        match_stats,
+        candidate_ids,
+    )
+    if overlap is not None:
+        query = query.outerjoin(overlap, overlap.c.profile_id == Profile.id)
+    if after is not None:
+        # Keyset condition: resume right after the cursor's (score, id)
+        last_score, last_id = after
+        query = query.filter(
+            or_(score < last_score, and_(score == last_score, User.id > last_id))
+        )
+    # Exclusion, scoring and sorting all happen in the database
+    with _stage("candidate_fetch", ENGINE_SQL):
+        rows = query.order_by(score.desc(), User.id).offset(skip).limit(limit).all()
+    return [(user, user_score) for user, user_score in rows]
+
+
+ENGINE_RANKERS = {
+    ENGINE_PYTHON: rank_candidates_python,
+    ENGINE_SQL: rank_candidates_sql,
+    ENGINE_NUMPY: rank_candidates_numpy,
+}
+
+
+def encode_cursor(score: float, user_id: int) -> str:
+    """Encode the last (score, user id) of a page as an opaque cursor"""
+    payload = json.dumps({"s": score, "id": user_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor created by encode_cursor; raises ValueError if invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload["s"]), int(payload["id"])
+    except (TypeError, KeyError, binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+
+
+def _rank_live(
+    db: Session,
+    current_user: User,
+    skip: int,
+    limit: int,
+    after: Optional[Cursor],
+    engine: Optional[str],
+    use_index: Optional[bool],
+    model: ScoringModel,
+) -> List[Tuple[User, float]]:
+    """Run the selected engine, using the candidate index when enabled"""
+    engine = engine or MATCHING_ENGINE
+    if engine not in ENGINE_RANKERS:
+        logger.warning(f"Unknown matching engine '{engine}', using python")
+        engine = ENGINE_PYTHON
+    rank = ENGINE_RANKERS[engine]
+    if use_index is None:
+        use_index = MATCHING_CANDIDATE_INDEX
+
+    if use_index:
+        candidate_index.ensure_fresh(db)
+        overlap = candidate_index.candidates(
+            current_user.profile.cuisine_preferences,
+            current_user.profile.location,
+            current_user.profile.point,
+        )
+        if overlap:
+            # Rank the overlap first; anyone outside it scores at most
+            # the model's non-overlap bound, so a page beating it is final
+            ranked = rank(
+                db,
+                current_user,
+                0,
+                skip + limit,
+                candidate_ids=overlap,
+                after=after,
+                model=model,
+            )
+            if (
+                len(ranked) == skip + limit
+                and ranked[-1][1] > model.non_overlap_max_score
+            ):
+                return ranked[skip:]
+
+    return rank(db, current_user, skip, limit, after=after, model=model)
+
+
+def _rank_precomputed(
+    db: Session,
+    current_user: User,
+    skip: int,
+    limit: int,
+    after: Optional[Cursor],
+    model: ScoringModel,
+) -> Optional[List[Tuple[User, float]]]:
+    """
+    Serve the page from match_recommendations, or None when the stored
+    ranking is missing, expired, computed with another scoring model or
+    before rows recorded their depth, older than the user's latest profile
+    or match change, or too short to cover the page.
+    """
+    rows = (
+        db.query(MatchRecommendation, User)
+        .join(User, User.id == MatchRecommendation.candidate_id)
+        .filter(MatchRecommendation.user_id == current_user.id)
+        .order_by(MatchRecommendation.rank)
+        .all()
+    )
+    if not rows or rows[0][0].model != model.key or rows[0][0].top_n is None:
+        return None
+
+    computed_at = rows[0][0].computed_at
+    max_age = timedelta(seconds=MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS)
+    if computed_at < datetime.utcnow() - max_age:
+        return None
+    profile_updated_at = current_user.profile.updated_at
+    if profile_updated_at and profile_updated_at > computed_at:
+        return None
+    last_match_change = (
+        db.query(func.max(Match.updated_at))
+        .filter(
+            or_(
+                Match.sender_id == current_user.id, Match.receiver_id == current_user.id
+            )
+        )
+        .scalar()
+    )
+    if last_match_change and last_match_change > computed_at:
+        return None
+
+    ranked = [
+        (candidate.id, recommendation.score)
+        for recommendation, candidate in rows
+        if candidate.is_active
+    ]
+    page = _page_from_ranking(ranked, skip, limit, after, rows[0][0].top_n, len(rows))
+    if page is None:
+        return None
+    candidates = {candidate.id: candidate for _, candidate in rows}
+    return [(candidates[candidate_id], score) for candidate_id, score in page]
+
+
+def _rank_uncached(
+    db: Session,
+    current_user: User,
+    skip: int,
+    limit: int,
+    after: Optional[Cursor],
+    engine: Optional[str],
+    use_index: Optional[bool],
+    use_precomputed: Optional[bool],
+    model: ScoringModel,
+) -> List[Tuple[User, float]]:
+    """Serve from precomputed rankings when fresh, otherwise rank live"""
+    if use_precomputed is None:
+        use_precomputed = MATCHING_PRECOMPUTED
+    if use_precomputed:
+        ranked = _rank_precomputed(db, current_user, skip, limit, after, model)
+        if ranked is not None:
+            return ranked
+    return _rank_live(db, current_user, skip, limit, after, engine, use_index, model)
+
+
+def _load_users(db: Session, user_ids: List[int]) -> List[User]:
+    """Load users by primary key, keeping the order of `user_ids`"""
+    if not user_ids:
+        return []
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids))}
+    return [users[user_id] for user_id in user_ids if user_id in users]
+
+
+def _page_from_ranking(
+    ranked: List[Tuple[int, float]],
+    skip: int,
+    limit: int,
+    after: Optional[Cursor],
+    depth: int,
+    stored: Optional[int] = None,
+) -> Optional[List[Tuple[int, float]]]:
+    """
+    Slice a stored ranking truncated at `depth` entries, or return None if
+    the page reaches past the end of a truncated ranking. `stored` is the
+    number of entries before any filtering (defaults to len(ranked)).
+    """
+    start = 0
+    if after is not None:
+        keys = [(-score, candidate_id) for candidate_id, score in ranked]
+        start = bisect.bisect_right(keys, (-after[0], after[1]))
+    page = ranked[start + skip : start + skip + limit]
+    stored = len(ranked) if stored is None else stored
+    if len(page) < limit and stored >= depth:
+        return None
+    return page
+
+
+def rank_scored_matches(
+    db: Session,
+    current_user: User,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Cursor] = None,
+    engine: Optional[str] = None,
+    use_index: Optional[bool] = None,
+    use_cache: Optional[bool] = None,
+    use_precomputed: Optional[bool] = None,
+    model: Optional[ScoringModel] = None,
+) -> List[Tuple[User, float]]:
+    """
+    Rank potential dinner matches for a user with a profile and return
+    (user, score) pairs for the page after `after`, skipping `skip` rows.
+    All engines produce the same ordering; `engine`, `use_index`,
+    `use_cache` and `use_precomputed` override the MATCHING_ENGINE,
+    MATCHING_CANDIDATE_INDEX, MATCHING_RECOMMENDATION_CACHE and
+    MATCHING_PRECOMPUTED settings. `model` defaults to the scoring model
+    the user is assigned to.
+    """
+    model = model or scoring_models.select(current_user.id)
+    metrics.inc(MATCHING_MODEL_METRIC, model=model.name)
+    options = (engine, use_index, use_precomputed, model)
+    if use_cache is None:
+        use_cache = MATCHING_RECOMMENDATION_CACHE
+    if not use_cache:
+        return _rank_uncached(db, current_user, skip, limit, after, *options)
+
+    ranked = recommendation_cache.get(current_user.id, model.key)
+    if ranked is None:
+        depth = recommendation_cache.depth
+        ranked = [
+            (user.id, score)
+            for user, score in _rank_uncached(
+                db, current_user, 0, depth, None, *options
+            )
+        ]
+        recommendation_cache.set(current_user.id, ranked, model.key)
+
+    page = _page_from_ranking(ranked, skip, limit, after, recommendation_cache.depth)
+    if page is None:
+        return _rank_uncached(db, current_user, skip, limit, after, *options)
+    users = _load_users(db, [candidate_id for candidate_id, _ in page])
+    scores = dict(page)
+    return [(user, scores[user.id]) for user in users]
+
+
+def rank_potential_matches(
+    db: Session,
+    current_user: User,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Cursor] = None,
+    engine: Optional[str] = None,
+    use_index: Optional[bool] = None,
+    use_cache: Optional[bool] = None,
+    use_precomputed: Optional[bool] = None,
+    model: Optional[ScoringModel] = None,
+) -> List[User]:
+    """Rank potential dinner matches and return only the users"""
+    ranked = rank_scored_matches(
+        db,
+        current_user,
+        skip=skip,
+        limit=limit,
+        after=after,
+        engine=engine,
+        use_index=use_index,
+        use_cache=use_cache,
+        use_precomputed=use_precomputed,
+        model=model,
+    )
+    return [user for user, _ in ranked]
+
+
+def explain_potential_matches(
+    db: Session,
+    current_user: User,
+    limit: int = 10,
+    model: Optional[ScoringModel] = None,
+) -> Dict[str, Any]:
+    """
+    Rank a user's candidates live with the Python scorer and report the
+    per-component scores of the top `limit`, the time spent in each stage
+    and the number of SQL statements issued. Bypasses the ranking cache,
+    precomputed rankings and the candidate index. `model` defaults to the
+    scoring model the user is assigned to.
+    """
+    model = model or scoring_models.select(current_user.id)
+    timings = {}
+    with timed() as total, count_statements(db) as statements:
+        # The feed excludes matched users with an anti-join inside the
+        # candidate query; count them separately to show its selectivity
+        with timed() as timer:
+            excluded_users = (
+                db.query(func.count(User.id))
+                .filter(User.id != current_user.id, matched_with(current_user.id))
+                .scalar()
+            )
+        timings["exclusion"] = timer.ms
+
+        with timed() as timer:
+            match_stats = match_stats_subquery()
+            query = db.query(User, Profile, match_stats.c.accepted, match_stats.c.total)
+            potential_matches = _candidate_query(
+                db, query, current_user, match_stats
+            ).all()
+        timings["candidate_fetch"] = timer.ms
+
+        with timed() as timer:
+            scorers = model.bind_components(current_user.profile)
+            scored_matches = []
+            for user, profile, accepted_matches, total_matches in potential_matches:
+                components = {
+                    component: scorer(profile, accepted_matches, total_matches)
+                    for component, scorer in scorers
+                }
+                score = model.normalize(sum(list(components.values())))
+                scored_matches.append((user, score, components))
+        timings["scoring"] = timer.ms
+
+        with timed() as timer:
+            top = heapq.nsmallest(limit, scored_matches, key=lambda x: (-x[1], x[0].id))
+        timings["sort"] = timer.ms
+
+        with timed() as timer:
+            candidates = [
+                {
+                    "user_id": user.id,
+                    "username": user.username,
+                    "score": score,
+                    "components": components,
+                }
+                for user, score, components in top
+            ]
+        timings["serialization"] = timer.ms
+    timings["total"] = total.ms
+
+    return {
+        "user_id": current_user.id,
+        "model": model.key,
+        "weights": model.weights,
+        "normalization": model.normalization,
+        "excluded_users": excluded_users,
+        "candidates_considered": len(potential_matches),
+        "candidates": candidates,
+        "timings_ms": timings,
+        "sql_statements": statements.count,
+    }
@@ -0,0 +1,124 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.core.security import pwd_context
+from app.services.metrics import MetricsRegistry, metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Threads running bcrypt; it releases the GIL, so threads use every core
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1))
+)
+# Hash operations allowed to run or wait at once; further ones are
+# rejected instead of queueing without bound
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+# Suggested client back-off when the pool is saturated
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(
+    os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1")
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Every password hashing slot is taken"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a bounded thread pool so that
+    a login burst neither blocks the event loop nor queues without bound.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def submit(self, operation: str, fn: Callable, *args) -> Future:
+        """Run `fn` in the pool, or raise PasswordHashingBusy when saturated"""
+        if not self._slots.acquire(blocking=False):
+            metrics.inc("password_hash_rejected_total")
+            raise PasswordHashingBusy()
+        with self._lock:
+            self.pending += 1
+        submitted_at = time.perf_counter()
+
+        def run():
+            started_at = time.perf_counter()
+            metrics.observe(
+                "password_hash_queue_seconds",
+                started_at - submitted_at,
+                operation=operation,
+            )
+            try:
+                return fn(*args)
+            finally:
+                metrics.observe(
+                    "password_hash_seconds",
+                    time.perf_counter() - started_at,
+                    operation=operation,
+                )
+                # Free the slot before the caller sees the result
+                self._release()
+
+        try:
+            return self._executor.submit(run)
+        except Exception:
+            self._release()
+            raise
+
+    def _release(self) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured cost"""
+        return await asyncio.wrap_future(
+            self.submit("hash", self.context.hash, password)
+        )
+
+    async def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Verify a password, with a new hash if the stored one is outdated"""
+        return await asyncio.wrap_future(
+            self.submit(
+                "verify", self.context.verify_and_update, password, hashed_password
+            )
+        )
+
+    def shutdown(self) -> None:
+        """Wait for running operations and stop the worker threads"""
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher()
+
+
+def _collect_password_hash_metrics(registry: MetricsRegistry) -> None:
+    registry.set_gauge("password_hash_pending", password_hasher.pending)
+    registry.set_gauge("password_hash_workers", password_hasher.workers)
+    registry.set_gauge("password_hash_max_pending", password_hasher.max_pending)
+
+
+metrics.add_collector(_collect_password_hash_metrics)
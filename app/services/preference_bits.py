@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+# Bit positions are persisted in profiles.cuisine_mask / dietary_mask:
+# only ever append to these vocabularies (at most 63 entries each)
+CUISINE_VOCABULARY = (
+    "italian", "japanese", "thai", "mexican", "indian", "french", "korean",
+    "chinese", "greek", "spanish", "vietnamese", "lebanese", "ethiopian",
+    "turkish", "peruvian", "mediterranean", "american", "brazilian",
+    "middle eastern", "caribbean", "german", "british", "irish", "moroccan",
+    "filipino", "indonesian", "malaysian", "russian", "polish", "portuguese",
+    "cuban", "argentinian", "persian", "israeli", "nepalese", "pakistani",
+    "taiwanese", "hawaiian", "cajun", "southern", "soul food", "tex-mex",
+    "bbq", "seafood", "sushi", "ramen", "dim sum", "tapas", "pizza",
+    "vegetarian", "vegan", "fusion",
+)  # fmt: skip
+DIETARY_VOCABULARY = (
+    "none", "vegetarian", "vegan", "pescatarian", "halal", "kosher",
+    "gluten-free", "dairy-free", "nut-free", "lactose-free", "keto", "paleo",
+    "low-carb",
+)  # fmt: skip
+
+CUISINE_BITS: Dict[str, int] = {tag: 1 << i for i, tag in enumerate(CUISINE_VOCABULARY)}
+DIETARY_BITS: Dict[str, int] = {tag: 1 << i for i, tag in enumerate(DIETARY_VOCABULARY)}
+
+
+def encode_mask(tags: Iterable[str], bits: Dict[str, int]) -> int:
+    """OR together the bits of the known tags; unknown tags are ignored"""
+    mask = 0
+    for tag in tags:
+        mask |= bits.get(tag, 0)
+    return mask
+
+
+def popcount(value: int) -> int:
+    """Number of set bits"""
+    return bin(value).count("1")
+
+
+def cuisine_bits(tags: Iterable[str]) -> Tuple[int, int]:
+    """
+    (mask, count) for a set of cuisine tags. count includes tags outside
+    the vocabulary, so it stays the exact denominator of the overlap score.
+    """
+    tags = set(tags)
+    return encode_mask(tags, CUISINE_BITS), len(tags)
+
+
+def is_fully_encoded(mask: int, count: int) -> bool:
+    """Whether every tag behind a (mask, count) pair has a bit"""
+    return popcount(mask) == count
+
+
+def cuisine_mask_score(
+    user_mask: int,
+    user_count: int,
+    mask: Optional[int],
+    count: Optional[int],
+    weight: float = 30,
+) -> float:
+    """
+    calculate_cuisine_score on bitmasks: popcount(a & b) / max(|a|, |b|).
+    Exact when the requester's tags are fully encoded, since tags without
+    a bit cannot be shared with them.
+    """
+    if not user_count or not count:
+        return 0
+    return (popcount(user_mask & mask) / max(user_count, count)) * weight
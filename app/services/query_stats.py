@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Dev/test: flag requests that run one parameterized statement more than this
+# many times, the usual sign of an N+1 query; 0 disables the check
+REPEATED_STATEMENT_LIMIT = int(os.getenv("SQL_REPEATED_STATEMENT_LIMIT", "0"))
+
+# Statement text kept in logs and failure messages
+_STATEMENT_PREVIEW = 200
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > _STATEMENT_PREVIEW:
+        return statement[:_STATEMENT_PREVIEW] + "..."
+    return statement
+
+
+class QueryStats:
+    """Statements run on behalf of one request: count, time and repeats"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        # Parameterized statement -> times run
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, limit: int) -> List[Tuple[str, int]]:
+        """Statements run more than `limit` times, most repeated first"""
+        return sorted(
+            (
+                (statement, count)
+                for statement, count in self.statements.items()
+                if count > limit
+            ),
+            key=lambda item: -item[1],
+        )
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        return (
+            f'db;desc="{self.count} queries";dur={self.seconds * 1000:.1f}, '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.1f}"
+        )
+
+    def summary(self) -> str:
+        """Count, time and the most repeated statements, for logs and failures"""
+        lines = [f"{self.count} statements in {self.seconds * 1000:.1f}ms"]
+        for statement, count in self.repeated(1)[:5]:
+            lines.append(f"  {count}x {_preview(statement)}")
+        return "\n".join(lines)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - context._query_stats_start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on `engine` into the current request's stats"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Collect the statements run in this context, including threadpool calls
+    made from it (sync endpoints and dependencies)
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def record_queries(engine: Engine) -> Iterator[QueryStats]:
+    """
+    Collect every statement run on `engine` in the block, from any thread;
+    for tests, where the app runs outside the caller's context
+    """
+    instrument_engine(engine)
+    stats = QueryStats()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        stats.record(statement, time.perf_counter() - context._query_stats_start)
+
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield stats
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def report_request(request_id: str, stats: QueryStats) -> None:
+    """Log a request's statement stats and flag repeated statements"""
+    if stats.count:
+        logger.info(
+            f"Request {request_id} ran {stats.count} queries in "
+            f"{stats.seconds * 1000:.1f}ms, slowest "
+            f"{stats.slowest_seconds * 1000:.1f}ms: "
+            f"{_preview(stats.slowest_statement)}"
+        )
+    if REPEATED_STATEMENT_LIMIT:
+        for statement, count in stats.repeated(REPEATED_STATEMENT_LIMIT):
+            logger.warning(
+                f"Request {request_id} ran the same statement {count} times, "
+                f"possible N+1 query: {_preview(statement)}"
+            )
+            metrics.inc("sql_repeated_statements_total")
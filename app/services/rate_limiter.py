@@ -0,0 +1,188 @@
+import os
+import math
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from app.services.metrics import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Limits as "<requests>/<seconds>"; an empty value disables the rule
+AUTH_RATE_LIMIT_PER_IP = os.getenv("AUTH_RATE_LIMIT_PER_IP", "30/60")
+AUTH_RATE_LIMIT_PER_LOGIN = os.getenv("AUTH_RATE_LIMIT_PER_LOGIN", "10/60")
+# Keys tracked by the in-process backend before the least recent is dropped
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class RateLimitExceeded(Exception):
+    """A request is over a rate limit"""
+
+    def __init__(self, rule: str, retry_after: float):
+        super().__init__(f"Rate limit '{rule}' exceeded")
+        self.rule = rule
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Whole seconds for the Retry-After header, at least 1"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def parse_rate(rate: str) -> Optional[Tuple[int, float]]:
+    """Parse "<requests>/<seconds>" into (limit, window); empty disables"""
+    if not rate or not rate.strip():
+        return None
+    try:
+        limit, window = rate.split("/")
+        limit, window = int(limit), float(window)
+    except ValueError:
+        raise ValueError(
+            f"Invalid rate limit '{rate}', expected '<requests>/<seconds>'"
+        )
+    if limit < 1 or window <= 0:
+        raise ValueError(f"Invalid rate limit '{rate}', both parts must be positive")
+    return limit, window
+
+
+class RateLimitBackend(ABC):
+    """Storage of rate limit state; one call per request and rule"""
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        """
+        Record a request for `key` if it is within `limit` requests per
+        `window_seconds`. Returns 0 when allowed, otherwise the seconds
+        until the next request would be allowed; rejected requests are
+        not recorded.
+        """
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Forget every key"""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window log per key in this process, LRU-bounded in the number
+    of keys. Each worker process limits independently.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._hits: "OrderedDict[str, deque]" = OrderedDict()
+
+    def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        now = self.clock()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window_seconds:
+                hits.popleft()
+            if len(hits) >= limit:
+                return hits[-limit] + window_seconds - now
+            hits.append(now)
+            return 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hits.clear()
+
+
+class CounterStore(ABC):
+    """
+    Shared counters with expiry, e.g. Redis INCR plus EXPIRE, so that
+    every worker process sees the same limits.
+    """
+
+    @abstractmethod
+    def incr(self, key: str, ttl_seconds: float) -> int:
+        """Increment a counter, creating it with the given expiry"""
+
+    @abstractmethod
+    def get(self, key: str) -> int:
+        """Current value of a counter, 0 if missing or expired"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every counter"""
+
+
+class CounterStoreRateLimitBackend(RateLimitBackend):
+    """
+    Sliding-window counter on a CounterStore: the previous fixed window's
+    count is weighted by how much of it still overlaps the sliding window.
+    Reads and the increment are separate calls, so concurrent workers can
+    overshoot a limit slightly.
+    """
+
+    def __init__(self, store: CounterStore, prefix: str = "rate", clock=time.time):
+        self.store = store
+        self.prefix = prefix
+        self.clock = clock
+
+    def hit(self, key: str, limit: int, window_seconds: float) -> float:
+        now = self.clock()
+        window = int(now // window_seconds)
+        elapsed = now - window * window_seconds
+        current_key = f"{self.prefix}:{key}:{window}"
+        previous = self.store.get(f"{self.prefix}:{key}:{window - 1}")
+        current = self.store.get(current_key)
+        overlap = 1 - elapsed / window_seconds
+        if previous * overlap + current >= limit:
+            # Wait until enough of the older window has slid out
+            if current >= limit:
+                excess = (current - limit + 1) / current
+                return window_seconds - elapsed + excess * window_seconds
+            excess = (previous * overlap + current - limit + 1) / previous
+            return excess * window_seconds
+        self.store.incr(current_key, 2 * window_seconds)
+        return 0.0
+
+    def reset(self) -> None:
+        self.store.clear()
+
+
+class RateLimiter:
+    """Named rules of (limit, window) checked against a backend"""
+
+    def __init__(
+        self,
+        rules: Dict[str, Optional[Tuple[int, float]]],
+        backend: Optional[RateLimitBackend] = None,
+    ):
+        self.rules = {name: rule for name, rule in rules.items() if rule}
+        self.backend = backend or InMemoryRateLimitBackend()
+
+    def check(self, rule: str, key: str) -> None:
+        """Count a request under a rule, or raise RateLimitExceeded"""
+        if rule not in self.rules or not key:
+            return
+        limit, window_seconds = self.rules[rule]
+        retry_after = self.backend.hit(f"{rule}:{key}", limit, window_seconds)
+        if retry_after > 0:
+            metrics.inc("rate_limited_total", rule=rule)
+            raise RateLimitExceeded(rule, retry_after)
+
+    def reset(self) -> None:
+        """Forget every key"""
+        self.backend.reset()
+
+
+auth_rate_limiter = RateLimiter(
+    {
+        "auth_ip": parse_rate(AUTH_RATE_LIMIT_PER_IP),
+        "auth_login": parse_rate(AUTH_RATE_LIMIT_PER_LOGIN),
+    }
+)
@@ -0,0 +1,168 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models.user import User
+from app.services.metrics import MetricsRegistry, metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_CACHE_TTL_SECONDS = int(
+    os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300")
+)
+RECOMMENDATION_CACHE_MAX_USERS = int(
+    os.getenv("RECOMMENDATION_CACHE_MAX_USERS", "10000")
+)
+# Number of ranked candidates kept per user; deeper pages bypass the cache
+RECOMMENDATION_CACHE_DEPTH = int(os.getenv("RECOMMENDATION_CACHE_DEPTH", "100"))
+
+# Session.info key of users deactivated in the current transaction
+_DEACTIVATED_USERS_KEY = "recommendation_cache_deactivated_users"
+
+
+class RecommendationCache:
+    """
+    Per-user cache of ranked (candidate id, score) pairs with TTL and LRU
+    bounds. Each entry remembers the scoring model key it was ranked with.
+    Entries are dropped when the ranking changes: the user's own profile
+    edits, a match involving the user, or a cached candidate deactivating.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = RECOMMENDATION_CACHE_TTL_SECONDS,
+        max_users: int = RECOMMENDATION_CACHE_MAX_USERS,
+        depth: int = RECOMMENDATION_CACHE_DEPTH,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.depth = depth
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+        self, user_id: int, model: Optional[str] = None
+    ) -> Optional[List[Tuple[int, float]]]:
+        """
+        Return the cached ranking for a user, or None on a miss or when it
+        was ranked with another scoring model
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, ranked, _, ranked_model = entry
+            if time.monotonic() >= expires_at or ranked_model != model:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return ranked
+
+    def set(
+        self, user_id: int, ranked: List[Tuple[int, float]], model: Optional[str] = None
+    ) -> None:
+        """Store a user's ranking, evicting the least recently used entries"""
+        ranked = list(ranked[: self.depth])
+        with self._lock:
+            self._entries[user_id] = (
+                time.monotonic() + self.ttl_seconds,
+                ranked,
+                frozenset(candidate_id for candidate_id, _ in ranked),
+                model,
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Drop the cached rankings of the given users"""
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_candidate(self, candidate_id: int) -> None:
+        """Drop every cached ranking that contains the candidate"""
+        with self._lock:
+            stale = [
+                user_id
+                for user_id, (_, _, members, _) in self._entries.items()
+                if candidate_id in members
+            ]
+            for user_id in stale:
+                del self._entries[user_id]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Cache counters for monitoring"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+recommendation_cache = RecommendationCache()
+
+
+def _collect_recommendation_cache_metrics(registry: MetricsRegistry) -> None:
+    for name, value in recommendation_cache.stats().items():
+        registry.set_gauge(f"recommendation_cache_{name}", value)
+
+
+metrics.add_collector(_collect_recommendation_cache_metrics)
+
+
+def _invalidate_user(user_id: int) -> None:
+    recommendation_cache.invalidate(user_id)
+    recommendation_cache.invalidate_candidate(user_id)
+
+
+@event.listens_for(User.is_active, "set")
+def _record_deactivated_user(target, value, oldvalue, initiator):
+    """
+    Remove users from cached rankings once their deactivation commits; a
+    rolled back deactivation keeps the entries
+    """
+    if value or target.id is None:
+        return
+    session = object_session(target)
+    if session is None:
+        _invalidate_user(target.id)
+    else:
+        session.info.setdefault(_DEACTIVATED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_deactivated_users(session):
+    for user_id in session.info.pop(_DEACTIVATED_USERS_KEY, ()):
+        _invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_deactivations(session):
+    session.info.pop(_DEACTIVATED_USERS_KEY, None)
@@ -0,0 +1,175 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.match import Match
+from app.models.profile import Profile
+from app.models.recommendation import MatchRecommendation, RecommendationRun
+from app.models.user import User
+from app.services.matching import (
+    MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS,
+    MATCH_RECOMMENDATIONS_TOP_N,
+    rank_scored_matches,
+)
+from app.services.scoring_model import scoring_models
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def users_to_refresh(
+    db: Session, since: Optional[datetime] = None, now: Optional[datetime] = None
+) -> List[int]:
+    """
+    Active users with a profile whose ranking inputs changed since `since`:
+    their profile, their account, any match they sent or received, or the
+    definition of the scoring model their stored ranking was computed with,
+    or a stored ranking that predates rows recording their depth.
+    Also users with no stored ranking, or one older than the serving max age
+    at `now`, which the feed would otherwise never serve again.
+    All active users with a profile when `since` is None.
+    """
+    query = (
+        db.query(User.id)
+        .join(Profile, Profile.user_id == User.id)
+        .filter(User.is_active.is_(True))
+    )
+    if since is None:
+        return [user_id for (user_id,) in query.order_by(User.id)]
+
+    changed_matches = db.query(Match).filter(
+        Match.updated_at > since,
+        or_(Match.sender_id == User.id, Match.receiver_id == User.id),
+    )
+    outdated_model = db.query(MatchRecommendation).filter(
+        MatchRecommendation.user_id == User.id,
+        or_(
+            MatchRecommendation.model.is_(None),
+            MatchRecommendation.model.notin_(scoring_models.keys),
+            MatchRecommendation.top_n.is_(None),
+        ),
+    )
+    # Rows of one run share computed_at, so this also finds users with none
+    fresh_cutoff = (now or datetime.utcnow()) - timedelta(
+        seconds=MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS
+    )
+    fresh = db.query(MatchRecommendation).filter(
+        MatchRecommendation.user_id == User.id,
+        MatchRecommendation.computed_at >= fresh_cutoff,
+    )
+    query = query.filter(
+        or_(
+            Profile.updated_at > since,
+            User.updated_at > since,
+            changed_matches.exists(),
+            outdated_model.exists(),
+            ~fresh.exists(),
+        )
+    )
+    return [user_id for (user_id,) in query.order_by(User.id)]
+
+
+def compute_recommendations(
+    db: Session, user_ids: List[int], top_n: int = MATCH_RECOMMENDATIONS_TOP_N
+) -> List[Dict]:
+    """Rank the top candidates of each user with the live matching engine"""
+    computed_at = datetime.utcnow()
+    rows = []
+    for user in db.query(User).filter(User.id.in_(user_ids)):
+        if not user.profile:
+            continue
+        model = scoring_models.select(user.id)
+        ranked = rank_scored_matches(
+            db, user, limit=top_n, use_cache=False, use_precomputed=False, model=model
+        )
+        rows.extend(
+            {
+                "user_id": user.id,
+                "candidate_id": candidate.id,
+                "rank": rank,
+                "score": score,
+                "model": model.key,
+                "top_n": top_n,
+                "computed_at": computed_at,
+            }
+            for rank, (candidate, score) in enumerate(ranked)
+        )
+    return rows
+
+
+def _compute_chunk(user_ids: List[int], top_n: int) -> List[Dict]:
+    """Worker entry point: compute a chunk of users in a fresh session"""
+    db = SessionLocal()
+    try:
+        return compute_recommendations(db, user_ids, top_n)
+    finally:
+        db.close()
+
+
+def write_recommendations(db: Session, user_ids: List[int], rows: List[Dict]) -> None:
+    """Replace the stored recommendations of `user_ids` with `rows`"""
+    db.query(MatchRecommendation).filter(
+        MatchRecommendation.user_id.in_(user_ids)
+    ).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(MatchRecommendation), rows)
+    db.commit()
+
+
+def run_precompute(
+    db: Session,
+    top_n: int = MATCH_RECOMMENDATIONS_TOP_N,
+    workers: int = 0,
+    chunk_size: int = 200,
+    incremental: bool = True,
+) -> RecommendationRun:
+    """
+    Precompute rankings for every active user, or in incremental mode only
+    for users whose inputs changed since the last finished run.
+    With `workers` > 0 chunks are ranked in a process pool and written by
+    this process as they complete; otherwise everything runs inline.
+    """
+    since = None
+    if incremental:
+        last_run = (
+            db.query(RecommendationRun)
+            .filter(RecommendationRun.finished_at.isnot(None))
+            .order_by(RecommendationRun.started_at.desc())
+            .first()
+        )
+        since = last_run.started_at if last_run else None
+
+    run = RecommendationRun(incremental=since is not None, users_computed=0)
+    db.add(run)
+    db.commit()
+
+    user_ids = users_to_refresh(db, since)
+    chunks = [user_ids[i : i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    logger.info(
+        f"Precomputing recommendations for {len(user_ids)} users "
+        f"in {len(chunks)} chunks ({'incremental' if since else 'full'})"
+    )
+
+    if workers > 0:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(_compute_chunk, chunk, top_n): chunk for chunk in chunks
+            }
+            for future in as_completed(futures):
+                write_recommendations(db, futures[future], future.result())
+    else:
+        for chunk in chunks:
+            write_recommendations(db, chunk, compute_recommendations(db, chunk, top_n))
+
+    run.users_computed = len(user_ids)
+    run.finished_at = datetime.utcnow()
+    db.commit()
+    logger.info(f"Precomputed recommendations for {len(user_ids)} users")
+    return run
@@ -0,0 +1,94 @@
+import os
+import uuid
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.token import RefreshToken
+from app.models.user import User
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+
+
+class RefreshTokenError(Exception):
+    """A refresh token is unknown, expired, revoked or reused"""
+
+
+def hash_refresh_token(token: str) -> str:
+    """Refresh tokens are random, so a plain SHA-256 is enough to store them"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: Session, user: User, family_id: str = None) -> str:
+    """Create a refresh token for a user; the caller commits"""
+    token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshToken(
+            user_id=user.id,
+            token_hash=hash_refresh_token(token),
+            family_id=family_id or uuid.uuid4().hex,
+            token_version=user.token_version or 0,
+            expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+def _revoke_family(db: Session, family_id: str) -> None:
+    db.query(RefreshToken).filter(
+        RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None)
+    ).update({RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False)
+
+
+def rotate_refresh_token(db: Session, token: str) -> Tuple[User, str]:
+    """
+    Exchange a refresh token for its successor and return the user with it.
+    Presenting an already rotated token means it leaked: its whole family
+    is revoked.
+    """
+    # Lock the row so concurrent refreshes cannot both rotate it
+    stored = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.token_hash == hash_refresh_token(token))
+        .with_for_update()
+        .first()
+    )
+    if stored is None:
+        raise RefreshTokenError("Unknown refresh token")
+    if stored.revoked_at is not None:
+        logger.warning(f"Reused refresh token for user {stored.user_id}")
+        _revoke_family(db, stored.family_id)
+        db.commit()
+        raise RefreshTokenError("Refresh token was already used")
+    if stored.expires_at <= datetime.utcnow():
+        raise RefreshTokenError("Refresh token expired")
+
+    user = db.get(User, stored.user_id)
+    if user is None or not user.is_active:
+        raise RefreshTokenError("User is inactive")
+    # Issued before the user's tokens were revoked, e.g. a password change
+    if stored.token_version != (user.token_version or 0):
+        raise RefreshTokenError("Refresh token was revoked")
+
+    stored.revoked_at = datetime.utcnow()
+    successor = issue_refresh_token(db, user, stored.family_id)
+    db.commit()
+    return user, successor
+
+
+def revoke_refresh_token(db: Session, token: str) -> None:
+    """Revoke a refresh token and its family, e.g. on logout; the caller commits"""
+    stored = (
+        db.query(RefreshToken)
+        .filter(RefreshToken.token_hash == hash_refresh_token(token))
+        .first()
+    )
+    if stored is not None:
+        _revoke_family(db, stored.family_id)
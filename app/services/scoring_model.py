@@ -0,0 +1,406 @@
+"""
+Declarative scoring models for match ranking.
+
+Models are read from the JSON file at SCORING_MODELS_PATH:
+
+    {
+        "default": "baseline",
+        "experiment": "scoring",
+        "traffic": {"baseline": 90, "nearby": 10},
+        "models": {
+            "baseline": {
+                "weights": {"cuisine": 30, "location": 25,
+                            "dietary": 25, "success_rate": 20}
+            },
+            "nearby": {
+                "weights": {"cuisine": 20, "location": 45,
+                            "dietary": 20, "success_rate": 15},
+                "enabled": ["cuisine", "location", "dietary"],
+                "normalization": "unit"
+            }
+        }
+    }
+
+Every component scores a fraction in [0, 1] multiplied by its weight;
+components missing from `enabled` (default: every weighted component)
+are skipped entirely. "points" normalization sums the weighted
+components, "unit" divides the sum by the total enabled weight.
+Users are assigned to models by a stable hash of their id, split by the
+`traffic` shares (default: everyone gets the default model). The file is
+validated and compiled on load and reloaded when it changes.
+"""
+
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.models.profile import Profile, normalize_tags
+from app.services.geo import proximity_score
+from app.services.preference_bits import (
+    cuisine_bits,
+    cuisine_mask_score,
+    is_fully_encoded,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCORING_MODELS_PATH = os.getenv(
+    "SCORING_MODELS_PATH",
+    os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "data", "scoring_models.json"
+    ),
+)
+# How often to check the models file for changes
+SCORING_MODELS_RELOAD_SECONDS = float(os.getenv("SCORING_MODELS_RELOAD_SECONDS", "10"))
+
+# Score components, in the order they are summed by every engine
+COMPONENTS = ("cuisine", "location", "dietary", "success_rate")
+DEFAULT_WEIGHTS = {"cuisine": 30, "location": 25, "dietary": 25, "success_rate": 20}
+
+NORMALIZATION_POINTS = "points"
+NORMALIZATION_UNIT = "unit"
+NORMALIZATIONS = (NORMALIZATION_POINTS, NORMALIZATION_UNIT)
+
+DEFAULT_MODEL_NAME = "baseline"
+
+# Scores one candidate: (profile, accepted matches, total matches) -> points
+ComponentScorer = Callable[[Profile, Optional[int], Optional[int]], float]
+
+
+class ScoringConfigError(ValueError):
+    """The scoring models configuration is invalid"""
+
+
+def _bind_cuisine(user_profile: Profile, weight: float) -> ComponentScorer:
+    """Cuisine overlap |a & b| / max(|a|, |b|), on bitmasks when possible"""
+    if not user_profile.cuisine_preferences:
+        return lambda profile, accepted, total: 0
+
+    user_tags = normalize_tags(user_profile.cuisine_preferences)
+    user_mask, user_count = cuisine_bits(user_tags)
+    if is_fully_encoded(user_mask, user_count):
+
+        def cuisine(profile, accepted, total):
+            return cuisine_mask_score(
+                user_mask,
+                user_count,
+                profile.cuisine_mask,
+                profile.cuisine_count,
+                weight,
+            )
+
+        return cuisine
+
+    def cuisine(profile, accepted, total):
+        if not profile.cuisine_preferences:
+            return 0
+        tags = normalize_tags(profile.cuisine_preferences)
+        return (len(user_tags & tags) / max(len(user_tags), len(tags))) * weight
+
+    return cuisine
+
+
+def _bind_location(user_profile: Profile, weight: float) -> ComponentScorer:
+    """Distance decay when both sides are geocoded, else the same location"""
+    user_point = user_profile.point
+    user_location = (user_profile.location or "").lower()
+
+    def location(profile, accepted, total):
+        point = profile.point
+        if user_point and point:
+            return proximity_score(user_point, point, weight)
+        if not user_location or not profile.location:
+            return 0
+        return weight if profile.location.lower() == user_location else 0
+
+    return location
+
+
+def _bind_dietary(user_profile: Profile, weight: float) -> ComponentScorer:
+    """Same dietary restrictions"""
+    user_dietary = (user_profile.dietary_restrictions or "").lower()
+
+    def dietary(profile, accepted, total):
+        if not user_dietary or not profile.dietary_restrictions:
+            return 0
+        return weight if profile.dietary_restrictions.lower() == user_dietary else 0
+
+    return dietary
+
+
+def _bind_success_rate(user_profile: Profile, weight: float) -> ComponentScorer:
+    """Share of the candidate's matches that were accepted"""
+
+    def success_rate(profile, accepted, total):
+        if not total:
+            return 0
+        return (accepted / total) * weight
+
+    return success_rate
+
+
+COMPONENT_BINDERS = {
+    "cuisine": _bind_cuisine,
+    "location": _bind_location,
+    "dietary": _bind_dietary,
+    "success_rate": _bind_success_rate,
+}
+
+
+class ScoringModel:
+    """
+    A validated scoring configuration. `weights` holds the enabled
+    components only, in COMPONENTS order; `key` identifies the exact
+    configuration, so rankings stored under another key are stale.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        weights: Dict[str, float],
+        normalization: str = NORMALIZATION_POINTS,
+    ):
+        self.name = name
+        self.weights = {c: weights[c] for c in COMPONENTS if c in weights}
+        self.normalization = normalization
+        self.total_weight = sum(self.weights.values())
+        # Divisor applied to the summed points, None when unnormalized
+        self.divisor = (
+            float(self.total_weight) if normalization == NORMALIZATION_UNIT else None
+        )
+        definition = json.dumps(
+            {"weights": self.weights, "normalization": normalization}, sort_keys=True
+        )
+        self.key = f"{name}:{hashlib.sha1(definition.encode()).hexdigest()[:8]}"
+
+    def __repr__(self) -> str:
+        return f"ScoringModel({self.key!r})"
+
+    def normalize(self, points: float) -> float:
+        """Final score of a candidate from its summed component points"""
+        return points if self.divisor is None else points / self.divisor
+
+    @property
+    def non_overlap_max_score(self) -> float:
+        """
+        Highest score possible without sharing a cuisine, the location or a
+        nearby grid cell (dietary restrictions + match history success rate)
+        """
+        return self.normalize(
+            sum(self.weights.get(c, 0) for c in ("dietary", "success_rate"))
+        )
+
+    def bind_components(
+        self, user_profile: Profile
+    ) -> List[Tuple[str, ComponentScorer]]:
+        """Per-component scorers for one requester, in summing order"""
+        return [
+            (component, COMPONENT_BINDERS[component](user_profile, weight))
+            for component, weight in self.weights.items()
+        ]
+
+    def bind(self, user_profile: Profile) -> ComponentScorer:
+        """
+        Compile the model for one requester into a single scoring function.
+        The requester's tags, masks and lowercased strings are prepared
+        once instead of for every candidate.
+        """
+        scorers = tuple(scorer for _, scorer in self.bind_components(user_profile))
+        divisor = self.divisor
+
+        if divisor is None:
+
+            def score(profile, accepted, total):
+                return sum([scorer(profile, accepted, total) for scorer in scorers])
+
+        else:
+
+            def score(profile, accepted, total):
+                points = sum([scorer(profile, accepted, total) for scorer in scorers])
+                return points / divisor
+
+        return score
+
+
+DEFAULT_MODEL = ScoringModel(DEFAULT_MODEL_NAME, DEFAULT_WEIGHTS)
+
+
+def compile_model(name: str, spec: Dict) -> ScoringModel:
+    """Validate one model definition and build it"""
+    if not isinstance(spec, dict):
+        raise ScoringConfigError(f"Model '{name}' must be an object")
+    unknown = set(spec) - {"weights", "enabled", "normalization"}
+    if unknown:
+        raise ScoringConfigError(f"Model '{name}' has unknown keys: {sorted(unknown)}")
+
+    weights = spec.get("weights", DEFAULT_WEIGHTS)
+    if not isinstance(weights, dict):
+        raise ScoringConfigError(f"Model '{name}' weights must be an object")
+    for component, weight in weights.items():
+        if component not in COMPONENTS:
+            raise ScoringConfigError(
+                f"Model '{name}' has unknown component '{component}'"
+            )
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+            raise ScoringConfigError(
+                f"Model '{name}' weight of {component} is not a number"
+            )
+        if weight < 0:
+            raise ScoringConfigError(
+                f"Model '{name}' weight of {component} is negative"
+            )
+
+    enabled = spec.get("enabled", list(weights))
+    if not isinstance(enabled, list) or not all(c in weights for c in enabled):
+        raise ScoringConfigError(
+            f"Model '{name}' enabled components must be weighted components"
+        )
+    enabled_weights = {c: weights[c] for c in enabled}
+    if not sum(enabled_weights.values()):
+        raise ScoringConfigError(f"Model '{name}' has no positively weighted component")
+
+    normalization = spec.get("normalization", NORMALIZATION_POINTS)
+    if normalization not in NORMALIZATIONS:
+        raise ScoringConfigError(
+            f"Model '{name}' normalization must be one of {list(NORMALIZATIONS)}"
+        )
+    return ScoringModel(name, enabled_weights, normalization)
+
+
+class ScoringModelRegistry:
+    """
+    Compiled scoring models and the per-user A/B assignment, reloaded
+    from the models file when it changes. A file that fails validation on
+    reload is logged and the previous models stay in use.
+    """
+
+    def __init__(
+        self,
+        path: str = SCORING_MODELS_PATH,
+        reload_seconds: float = SCORING_MODELS_RELOAD_SECONDS,
+    ):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._models: Dict[str, ScoringModel] = {DEFAULT_MODEL_NAME: DEFAULT_MODEL}
+        self._default = DEFAULT_MODEL
+        self._experiment = "scoring"
+        self._traffic: List[Tuple[str, int]] = []
+        self._mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+
+    def load(self) -> None:
+        """Load and compile the models file; raises ScoringConfigError"""
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            logger.warning(f"No scoring models at {self.path}, using the baseline")
+            self._models = {DEFAULT_MODEL_NAME: DEFAULT_MODEL}
+            self._default, self._traffic, self._mtime = DEFAULT_MODEL, [], None
+            return
+
+        try:
+            with open(self.path) as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ScoringConfigError(f"Cannot read {self.path}: {str(e)}")
+        if not isinstance(config, dict) or not isinstance(config.get("models"), dict):
+            raise ScoringConfigError("Scoring config needs a 'models' object")
+
+        models = {
+            name: compile_model(name, spec) for name, spec in config["models"].items()
+        }
+        default_name = config.get("default", DEFAULT_MODEL_NAME)
+        if default_name not in models:
+            raise ScoringConfigError(f"Default model '{default_name}' is not defined")
+
+        traffic = config.get("traffic", {})
+        if not isinstance(traffic, dict):
+            raise ScoringConfigError("Scoring traffic must be an object")
+        for name, share in traffic.items():
+            if name not in models:
+                raise ScoringConfigError(f"Traffic model '{name}' is not defined")
+            if isinstance(share, bool) or not isinstance(share, int) or share < 0:
+                raise ScoringConfigError(
+                    f"Traffic share of '{name}' must be an integer >= 0"
+                )
+
+        self._models = models
+        self._default = models[default_name]
+        self._experiment = str(config.get("experiment", "scoring"))
+        self._traffic = [(name, share) for name, share in traffic.items() if share]
+        self._mtime = mtime
+        logger.info(
+            f"Loaded scoring models {sorted(models)} (default '{default_name}')"
+        )
+
+    def _refresh(self) -> None:
+        """Reload the models file if it changed since the last check"""
+        checked_at = self._checked_at
+        if (
+            checked_at is not None
+            and time.monotonic() - checked_at < self.reload_seconds
+        ):
+            return
+        with self._lock:
+            if self._checked_at != checked_at:
+                # Another thread checked meanwhile
+                return
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if checked_at is not None and mtime == self._mtime:
+                return
+            try:
+                self._load()
+            except ScoringConfigError as e:
+                logger.error(f"Invalid scoring models, keeping previous: {str(e)}")
+
+    @property
+    def names(self) -> List[str]:
+        self._refresh()
+        return sorted(self._models)
+
+    @property
+    def keys(self) -> List[str]:
+        """Keys of every configured model"""
+        self._refresh()
+        return [model.key for model in self._models.values()]
+
+    def get(self, name: Optional[str] = None) -> ScoringModel:
+        """A model by name (default: the default model); KeyError if unknown"""
+        self._refresh()
+        if name is None:
+            return self._default
+        return self._models[name]
+
+    def select(self, user_id: int) -> ScoringModel:
+        """The model a user is assigned to by the traffic split"""
+        self._refresh()
+        traffic = self._traffic
+        if not traffic:
+            return self._default
+        bucket = zlib.crc32(f"{self._experiment}:{user_id}".encode()) % sum(
+            share for _, share in traffic
+        )
+        for name, share in traffic:
+            if bucket < share:
+                return self._models[name]
+            bucket -= share
+        return self._default
+
+
+scoring_models = ScoringModelRegistry()
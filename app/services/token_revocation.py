@@ -0,0 +1,255 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.models.token import RevokedToken
+from app.models.user import User
+from app.services.bloom_filter import BloomFilter
+from app.services.metrics import MetricsRegistry, metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How often the revoked versions are reloaded from the database. Revocations
+# made by this process apply at once; other processes see them after this.
+TOKEN_REVOCATION_REFRESH_SECONDS = float(
+    os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "30")
+)
+
+# Revoked access token ids the filter is sized for before it is rebuilt
+# larger, and its target false positive rate
+REVOKED_TOKEN_FILTER_CAPACITY = int(
+    os.getenv("REVOKED_TOKEN_FILTER_CAPACITY", "100000")
+)
+REVOKED_TOKEN_FILTER_ERROR_RATE = float(
+    os.getenv("REVOKED_TOKEN_FILTER_ERROR_RATE", "0.001")
+)
+# revoked_at is stamped by the revoking worker's clock at flush, so a row
+# can commit after newer ones or arrive from a host whose clock lags.
+# Refreshes re-read this far behind the newest row loaded to catch them.
+REVOKED_TOKEN_FILTER_OVERLAP_SECONDS = float(
+    os.getenv("REVOKED_TOKEN_FILTER_OVERLAP_SECONDS", "300")
+)
+
+# Session.info key of version bumps in the current transaction
+_REVOKED_VERSIONS_KEY = "token_revocation_versions"
+
+
+class TokenRevocations:
+    """
+    Current token version of every user who ever revoked their tokens
+    (users.token_version > 0). A token is revoked when its "ver" claim is
+    below the user's current version, so the check needs no query.
+    """
+
+    def __init__(self, refresh_seconds: float = TOKEN_REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        self._loaded_at = None
+        self.refreshes = 0
+
+    def is_revoked(self, db: Session, user_id: int, version: int) -> bool:
+        """Whether a token version of a user has been revoked"""
+        if self._is_stale():
+            self.refresh(db)
+        return version < self._versions.get(user_id, 0)
+
+    def _is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.refresh_seconds
+        )
+
+    def refresh(self, db: Session) -> None:
+        """Reload the current versions from the database"""
+        rows = db.query(User.id, User.token_version).filter(User.token_version > 0)
+        loaded = dict(rows.all())
+        with self._lock:
+            # Versions only grow: keep newer local revocations
+            for user_id, version in self._versions.items():
+                if version > loaded.get(user_id, 0):
+                    loaded[user_id] = version
+            self._versions = loaded
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+
+    def record(self, user_id: int, version: int) -> None:
+        """Apply a revocation made by this process"""
+        with self._lock:
+            if version > self._versions.get(user_id, 0):
+                self._versions[user_id] = version
+
+    def clear(self) -> None:
+        """Forget every version and reload on the next check"""
+        with self._lock:
+            self._versions = {}
+            self._loaded_at = None
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+
+token_revocations = TokenRevocations()
+
+
+class RevokedTokenFilter:
+    """
+    Bloom filter of revoked access token ids (jti), rebuilt from the
+    revoked_tokens table on startup and topped up every refresh interval
+    with rows revoked since the last load, minus an overlap window for
+    late commits and clock skew. A miss proves the token is not revoked without a
+    query; a hit is confirmed with a primary key lookup, so false
+    positives only cost that lookup.
+    """
+
+    def __init__(
+        self,
+        capacity: int = REVOKED_TOKEN_FILTER_CAPACITY,
+        error_rate: float = REVOKED_TOKEN_FILTER_ERROR_RATE,
+        refresh_seconds: float = TOKEN_REVOCATION_REFRESH_SECONDS,
+        overlap_seconds: float = REVOKED_TOKEN_FILTER_OVERLAP_SECONDS,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.overlap_seconds = overlap_seconds
+        self._lock = threading.Lock()
+        self._filter: Optional[BloomFilter] = None
+        self._loaded_at = None
+        # revoked_at of the newest row loaded
+        self._watermark: Optional[datetime] = None
+        self.exact_checks = 0
+        self.false_positives = 0
+
+    def rebuild(self, db: Session) -> None:
+        """Load every unexpired revoked token id into a new filter"""
+        rows = (
+            db.query(RevokedToken.jti, RevokedToken.revoked_at)
+            .filter(RevokedToken.expires_at > datetime.utcnow())
+            .all()
+        )
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        for jti, _ in rows:
+            bloom.add(jti)
+        with self._lock:
+            self._filter = bloom
+            self._watermark = max((revoked_at for _, revoked_at in rows), default=None)
+            self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(rows)} revoked token ids")
+
+    def refresh(self, db: Session) -> None:
+        """Add the rows revoked by any process since the last load"""
+        query = db.query(RevokedToken.jti, RevokedToken.revoked_at)
+        if self._watermark is not None:
+            # Rows stamped before the watermark may have committed since
+            # the last load; ids already in the filter are skipped
+            since = self._watermark - timedelta(seconds=self.overlap_seconds)
+            query = query.filter(RevokedToken.revoked_at >= since)
+        rows = query.all()
+        with self._lock:
+            for jti, revoked_at in rows:
+                if jti not in self._filter:
+                    self._filter.add(jti)
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            self._loaded_at = time.monotonic()
+        if len(self._filter) > self._filter.capacity:
+            self.rebuild(db)
+
+    def is_revoked(self, db: Session, jti: str) -> bool:
+        """Whether an access token id has been revoked"""
+        if self._filter is None:
+            self.rebuild(db)
+        elif time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self.refresh(db)
+        if jti not in self._filter:
+            return False
+        self.exact_checks += 1
+        if db.get(RevokedToken, jti) is not None:
+            return True
+        self.false_positives += 1
+        return False
+
+    def add(self, jti: str) -> None:
+        """Apply a committed revocation made by this process"""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def clear(self) -> None:
+        """Drop the filter and rebuild it on the next check"""
+        with self._lock:
+            self._filter = None
+            self._loaded_at = self._watermark = None
+            self.exact_checks = self.false_positives = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Filter size and lookup counters for monitoring"""
+        bloom = self._filter
+        return {
+            "items": len(bloom) if bloom else 0,
+            "capacity": bloom.capacity if bloom else 0,
+            "bytes": bloom.nbytes if bloom else 0,
+            "expected_false_positive_rate": bloom.false_positive_rate if bloom else 0.0,
+            "exact_checks": self.exact_checks,
+            "false_positives": self.false_positives,
+        }
+
+
+revoked_tokens = RevokedTokenFilter()
+
+
+def revoke_access_token(db: Session, jti: str, expires_at: datetime) -> None:
+    """Record a revoked access token id; the caller commits"""
+    if db.get(RevokedToken, jti) is None:
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+
+
+def revoke_user_tokens(user: User) -> None:
+    """Revoke every token issued to a user so far; the caller commits"""
+    user.token_version = (user.token_version or 0) + 1
+
+
+def _collect_token_revocation_metrics(registry: MetricsRegistry) -> None:
+    registry.set_gauge("token_revocations_users", len(token_revocations))
+    for name, value in revoked_tokens.stats().items():
+        registry.set_gauge(f"revoked_token_filter_{name}", value)
+
+
+metrics.add_collector(_collect_token_revocation_metrics)
+
+
+@event.listens_for(User, "before_update")
+def _revoke_tokens_on_deactivation(mapper, connection, target):
+    """Tokens claim the user is active, so deactivating must revoke them"""
+    history = inspect(target).attrs.is_active.history
+    if history.has_changes() and history.deleted and not target.is_active:
+        revoke_user_tokens(target)
+
+
+@event.listens_for(User, "after_update")
+def _record_revoked_version(mapper, connection, target):
+    """Remember a version bump until the transaction commits"""
+    if inspect(target).attrs.token_version.history.has_changes():
+        session = object_session(target)
+        if session is not None:
+            revoked = session.info.setdefault(_REVOKED_VERSIONS_KEY, {})
+            revoked[target.id] = target.token_version
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_revocations(session):
+    for user_id, version in session.info.pop(_REVOKED_VERSIONS_KEY, {}).items():
+        token_revocations.record(user_id, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_revocations(session):
+    session.info.pop(_REVOKED_VERSIONS_KEY, None)
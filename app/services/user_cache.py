@@ -0,0 +1,194 @@
+import os
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import JSON, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.user import User
+from app.services.metrics import MetricsRegistry, metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How long a resolved user is reused; 0 disables the cache. Other worker
+# processes only see a change once their copy expires.
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+# Session.info key of users changed in the current transaction
+_CHANGED_USERS_KEY = "user_cache_changed_users"
+
+
+class UserCache:
+    """
+    Per-process cache of the user row behind a token subject (the user id,
+    or the email of tokens without identity claims), with TTL and LRU
+    bounds, so authenticated requests skip the users lookup. Entries are
+    snapshots of the column values: every hit builds a fresh instance and
+    merges it into the request's session without a query. Any ORM update
+    or delete of a user drops its entries.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = USER_CACHE_TTL_SECONDS,
+        max_entries: int = USER_CACHE_MAX_ENTRIES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # subject -> (expires at, user id, column values)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._subjects: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, db: Session, subject: str) -> Optional[User]:
+        """Return the cached user for a subject, attached to `db`, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user_id, values = entry
+            if time.monotonic() >= expires_at:
+                self._remove(subject)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+        return db.merge(_from_snapshot(values), load=False)
+
+    def set(self, subject: str, user: User) -> None:
+        """Store a snapshot of a user loaded from the database"""
+        if not self.enabled:
+            return
+        values = _snapshot(user)
+        with self._lock:
+            self._remove(subject)
+            self._entries[subject] = (
+                time.monotonic() + self.ttl_seconds,
+                user.id,
+                values,
+            )
+            self._subjects.setdefault(user.id, set()).add(subject)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every entry of a user"""
+        with self._lock:
+            for subject in list(self._subjects.get(user_id, ())):
+                self._remove(subject)
+                self.invalidations += 1
+
+    def _remove(self, subject: str) -> None:
+        entry = self._entries.pop(subject, None)
+        if entry is None:
+            return
+        subjects = self._subjects.get(entry[1])
+        if subjects is not None:
+            subjects.discard(subject)
+            if not subjects:
+                del self._subjects[entry[1]]
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._subjects.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Cache size, bounds and counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+_JSON_COLUMNS = {
+    attr.key
+    for attr in inspect(User).column_attrs
+    if isinstance(attr.columns[0].type, JSON)
+}
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    """Column values of a loaded user"""
+    values = {key: getattr(user, key) for key in _COLUMNS}
+    for key in _JSON_COLUMNS:
+        values[key] = copy.deepcopy(values[key])
+    return values
+
+
+def _from_snapshot(values: Dict[str, Any]) -> User:
+    """A detached user carrying the snapshot values as if loaded"""
+    user = inspect(User).class_manager.new_instance()
+    for key, value in values.items():
+        # JSON values are mutable: never share them between requests
+        if key in _JSON_COLUMNS:
+            value = copy.deepcopy(value)
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    return user
+
+
+user_cache = UserCache()
+
+
+def _collect_user_cache_metrics(registry: MetricsRegistry) -> None:
+    for name, value in user_cache.stats().items():
+        registry.set_gauge(f"user_cache_{name}", value)
+
+
+metrics.add_collector(_collect_user_cache_metrics)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    """
+    Drop a user's entries when the row changes (profile edits, deactivation,
+    password changes). They are dropped again after commit, in case another
+    request cached the old row before the change was visible.
+    """
+    user_cache.invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        user_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop(_CHANGED_USERS_KEY, None)
@@ -0,0 +1,260 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.geo import Point, proximity_scores
+from app.services.preference_bits import cuisine_bits, is_fully_encoded
+from app.services.scoring_model import DEFAULT_MODEL, ScoringModel
+
+# Set bits of every byte value, for popcount without np.bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+def _tokenize(value: str) -> set:
+    """Split a comma separated preference string the way the scorers do"""
+    return set(c.strip().lower() for c in value.split(","))
+
+
+def factorize(values: Sequence) -> Tuple[np.ndarray, list]:
+    """
+    Map every value to the index of its distinct value.
+    Preference strings repeat a lot, so the expensive parsing only has to
+    run once per distinct string.
+    """
+    index: Dict = {}
+    codes = np.fromiter(
+        (index.setdefault(value, len(index)) for value in values),
+        dtype=np.int64,
+        count=len(values),
+    )
+    return codes, list(index)
+
+
+def encode_cuisines(
+    values: Sequence[Optional[str]], vocabulary: Dict[str, int]
+) -> np.ndarray:
+    """
+    Encode cuisine strings as a multi-hot matrix (one row per value).
+    Unknown tokens are added to `vocabulary`, so encoding the requester
+    and the candidates with the same dict keeps the columns aligned.
+    """
+    rows, cols = [], []
+    for row, value in enumerate(values):
+        if not value:
+            continue
+        for token in _tokenize(value):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    matrix = np.zeros((len(values), len(vocabulary)), dtype=np.uint8)
+    matrix[rows, cols] = 1
+    return matrix
+
+
+def popcount64(values) -> np.ndarray:
+    """Number of set bits of every 64-bit integer"""
+    values = np.ascontiguousarray(values, dtype=np.int64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    return _BYTE_POPCOUNT[values.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def cuisine_mask_scores(
+    user_mask: int,
+    user_count: int,
+    masks: Sequence[int],
+    counts: Sequence[int],
+    weight: float = 30,
+) -> np.ndarray:
+    """Vectorized cuisine_mask_score: popcount(a & b) / max(|a|, |b|) * weight"""
+    counts = np.asarray(counts, dtype=np.int64)
+    scores = np.zeros(len(counts))
+    if not user_count:
+        return scores
+    common = popcount64(np.asarray(masks, dtype=np.int64) & user_mask)
+    denominator = np.maximum(counts, user_count)
+    has_cuisines = counts > 0
+    scores[has_cuisines] = (common[has_cuisines] / denominator[has_cuisines]) * weight
+    return scores
+
+
+def encode_categories(
+    values: Sequence[Optional[str]], vocabulary: Dict[str, int]
+) -> np.ndarray:
+    """Encode case-insensitive strings as integer codes, -1 for empty values"""
+    codes, distinct = factorize(values)
+    lookup = np.array(
+        [
+            vocabulary.setdefault(value.lower(), len(vocabulary)) if value else -1
+            for value in distinct
+        ],
+        dtype=np.int64,
+    )
+    return lookup[codes] if len(codes) else codes
+
+
+def _category_score(user_value: Optional[str], codes: np.ndarray, vocabulary, points):
+    """Award `points` to candidates whose code equals the requester's"""
+    if not user_value or user_value.lower() not in vocabulary:
+        return np.zeros(len(codes))
+    return np.where(codes == vocabulary[user_value.lower()], points, 0)
+
+
+def score_candidates(
+    user_cuisines: Optional[str],
+    user_location: Optional[str],
+    user_dietary: Optional[str],
+    cuisines: Sequence[Optional[str]],
+    locations: Sequence[Optional[str]],
+    dietary: Sequence[Optional[str]],
+    accepted_matches: Sequence[Optional[int]],
+    total_matches: Sequence[Optional[int]],
+    user_point: Optional[Point] = None,
+    latitudes: Optional[Sequence[Optional[float]]] = None,
+    longitudes: Optional[Sequence[Optional[float]]] = None,
+    cuisine_masks: Optional[Sequence[int]] = None,
+    cuisine_counts: Optional[Sequence[int]] = None,
+    model: ScoringModel = DEFAULT_MODEL,
+) -> np.ndarray:
+    """
+    Score a batch of candidates at once with the enabled components of
+    `model`. With the default model this produces exactly the values of
+    calculate_cuisine_score + calculate_location_score +
+    calculate_dietary_score + calculate_success_rate_score for every
+    candidate. Candidate coordinates are only used when `user_point` is
+    given, candidate cuisine bitmasks when the requester's cuisines all
+    have a bit.
+    """
+    n = len(cuisines)
+    weights = model.weights
+    components = []
+
+    # Cuisine overlap: |user & candidate| / max(|user|, |candidate|) * weight
+    if "cuisine" in weights:
+        weight = weights["cuisine"]
+        cuisine_score = np.zeros(n)
+        user_mask, user_count = cuisine_bits(_tokenize(user_cuisines or ""))
+        use_bits = cuisine_masks is not None and is_fully_encoded(user_mask, user_count)
+        if user_cuisines and use_bits:
+            cuisine_score = cuisine_mask_scores(
+                user_mask, user_count, cuisine_masks, cuisine_counts, weight
+            )
+        elif user_cuisines and n:
+            codes, distinct = factorize(cuisines)
+            vocabulary: Dict[str, int] = {}
+            user_vector = encode_cuisines([user_cuisines], vocabulary)[0]
+            distinct_matrix = encode_cuisines(distinct, vocabulary).astype(np.int64)
+            user_vector = np.pad(user_vector, (0, len(vocabulary) - len(user_vector)))
+            common = distinct_matrix @ user_vector.astype(np.int64)
+            sizes = distinct_matrix.sum(axis=1)
+            denominator = np.maximum(sizes, int(user_vector.sum()))
+            distinct_score = np.zeros(len(distinct))
+            has_cuisines = sizes > 0
+            distinct_score[has_cuisines] = (
+                common[has_cuisines] / denominator[has_cuisines]
+            ) * weight
+            cuisine_score = distinct_score[codes]
+        components.append(cuisine_score)
+
+    # Location and dietary restrictions: exact case-insensitive match
+    if "location" in weights:
+        weight = weights["location"]
+        location_vocabulary: Dict[str, int] = {}
+        location_codes = encode_categories(locations, location_vocabulary)
+        location_score = _category_score(
+            user_location, location_codes, location_vocabulary, weight
+        )
+        # Distance decay where both sides are geocoded
+        if user_point is not None and latitudes is not None and n:
+            proximity = proximity_scores(user_point, latitudes, longitudes, weight)
+            location_score = np.where(np.isnan(proximity), location_score, proximity)
+        components.append(location_score)
+    if "dietary" in weights:
+        dietary_vocabulary: Dict[str, int] = {}
+        dietary_codes = encode_categories(dietary, dietary_vocabulary)
+        components.append(
+            _category_score(
+                user_dietary, dietary_codes, dietary_vocabulary, weights["dietary"]
+            )
+        )
+
+    # Match history success rate
+    if "success_rate" in weights:
+        accepted = np.nan_to_num(np.array(accepted_matches, dtype=np.float64))
+        total = np.nan_to_num(np.array(total_matches, dtype=np.float64))
+        success_score = np.zeros(n)
+        has_history = total > 0
+        success_score[has_history] = (
+            accepted[has_history] / total[has_history]
+        ) * weights["success_rate"]
+        components.append(success_score)
+
+    # Sum in the same order as the other engines so scores are identical
+    scores = components[0]
+    for component in components[1:]:
+        scores = scores + component
+    if model.divisor is not None:
+        scores = scores / model.divisor
+    return scores
+
+
+def top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return the indices of the k best scores, highest first, ties by id.
+    argpartition finds the k-th best score in O(n); only candidates at or
+    above it are fully sorted.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        selected = np.flatnonzero(scores >= threshold)
+    else:
+        selected = np.arange(n)
+    order = np.lexsort((ids[selected], -scores[selected]))
+    return selected[order][:k]
+
+
+def rank_batch(
+    user_profile,
+    rows: Sequence[Tuple],
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[float, int]] = None,
+    model: ScoringModel = DEFAULT_MODEL,
+) -> list:
+    """
+    Rank (user, profile, accepted, total) rows for `user_profile` with
+    `model` and return (user, score) pairs for the requested page,
+    optionally resuming after a (score, user id) cursor.
+    """
+    if not rows:
+        return []
+    users, profiles, accepted, total = zip(*rows)
+    scores = score_candidates(
+        user_profile.cuisine_preferences,
+        user_profile.location,
+        user_profile.dietary_restrictions,
+        [p.cuisine_preferences for p in profiles],
+        [p.location for p in profiles],
+        [p.dietary_restrictions for p in profiles],
+        accepted,
+        total,
+        user_point=user_profile.point,
+        latitudes=[p.latitude for p in profiles],
+        longitudes=[p.longitude for p in profiles],
+        cuisine_masks=[p.cuisine_mask for p in profiles],
+        cuisine_counts=[p.cuisine_count for p in profiles],
+        model=model,
+    )
+    ids = np.fromiter((u.id for u in users), dtype=np.int64, count=len(users))
+
+    positions = np.arange(len(users))
+    if after is not None:
+        last_score, last_id = after
+        positions = np.flatnonzero(
+            (scores < last_score) | ((scores == last_score) & (ids > last_id))
+        )
+    selected = positions[top_k(scores[positions], ids[positions], skip + limit)]
+    return [(users[i], float(scores[i])) for i in selected[skip:]]
@@ -0,0 +1,166 @@
+"""
+Compare concurrent throughput of the sync and async database paths.
+
+A scratch database is filled with app.db.init_db.generate_population, then
+the same hot routes are served by two in-process apps: one with the sync
+routers (each request holds a threadpool thread while waiting on the
+database) and one with the async routers on the async engine. Requests are
+fired through httpx's ASGI transport at each concurrency level. Reports
+requests per second, p50/p99 latency and non-2xx responses per route,
+path and concurrency.
+
+The target database is wiped: point --database-url at a scratch database.
+
+Run from the project root:
+    python -m benchmarks.bench_async_db [--users 2000] [--requests 400]
+        [--concurrency 10 50 200] [--pool-size 20]
+        [--database-url postgresql://postgres@localhost/dinner_bench]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.routers import matches, users
+from app.core.database import (
+    AsyncSessionLocal,
+    Base,
+    get_async_db,
+    get_db,
+    to_async_url,
+)
+from app.core.security import create_user_access_token
+from app.db.init_db import generate_population
+from app.models.user import User
+from app.services.candidate_index import candidate_index
+from app.services.recommendation_cache import recommendation_cache
+
+ROUTES = {
+    "me": "/users/me",
+    "sent": "/matches/sent",
+    "potential-matches": "/users/potential-matches",
+}
+
+
+def build_apps(database_url: str, pool_size: int):
+    """A sync-router app and an async-router app with equal pool sizes"""
+    options = {}
+    if not database_url.startswith("sqlite"):
+        options = dict(pool_size=pool_size, max_overflow=0)
+    sync_engine = create_engine(database_url, **options)
+    async_engine = create_async_engine(to_async_url(database_url), **options)
+    SyncSession = sessionmaker(autoflush=False, bind=sync_engine)
+
+    def override_get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal(bind=async_engine) as db:
+            yield db
+
+    sync_app, async_app = FastAPI(), FastAPI()
+    sync_app.include_router(users.router)
+    sync_app.include_router(matches.router)
+    async_app.include_router(users.async_router)
+    async_app.include_router(matches.async_router)
+    for app in (sync_app, async_app):
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
+    return sync_engine, async_engine, {"sync": sync_app, "async": async_app}
+
+
+async def run_load(app, path: str, tokens: list, concurrency: int) -> dict:
+    """Send one request per token, `concurrency` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    # Count failures rather than abort, so one bad response skews nothing
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def request(token: str) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(
+                    path, headers={"Authorization": f"Bearer {token}"}
+                )
+                latencies.append(time.perf_counter() - start)
+                errors += not response.is_success
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request(token) for token in tokens))
+        elapsed = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {"rps": len(tokens) / elapsed, "p50": p50, "p99": p99, "errors": errors}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--database-url", default="postgresql://postgres@localhost/dinner_bench"
+    )
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--routes", nargs="+", default=list(ROUTES), choices=ROUTES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sync_engine, async_engine, apps = build_apps(args.database_url, args.pool_size)
+    Base.metadata.drop_all(bind=sync_engine)
+    Base.metadata.create_all(bind=sync_engine)
+    with sessionmaker(bind=sync_engine)() as db:
+        generate_population(db, args.users, seed=args.seed)
+        active = db.query(User).filter(User.is_active.is_(True)).all()
+        rnd = random.Random(args.seed)
+        tokens = [
+            create_user_access_token(rnd.choice(active)) for _ in range(args.requests)
+        ]
+    candidate_index.reset()
+    recommendation_cache.clear()
+
+    async def run_all() -> None:
+        print(
+            f"{'route':>18} {'path':>6} {'concurrency':>11} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>6}"
+        )
+        for route in args.routes:
+            for concurrency in args.concurrency:
+                for name, app in apps.items():
+                    # Warm up pools and the candidate index outside the stats
+                    await run_load(
+                        app, ROUTES[route], tokens[:concurrency], concurrency
+                    )
+                    result = await run_load(app, ROUTES[route], tokens, concurrency)
+                    print(
+                        f"{route:>18} {name:>6} {concurrency:>11} "
+                        f"{result['rps']:>8.1f} {result['p50']:>8.1f} "
+                        f"{result['p99']:>8.1f} {result['errors']:>6}"
+                    )
+        await async_engine.dispose()
+
+    try:
+        asyncio.run(run_all())
+    finally:
+        sync_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
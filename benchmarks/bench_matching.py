@@ -0,0 +1,217 @@
+"""
+Benchmark the discover feed against synthetic populations.
+
+For every size the database is dropped, recreated and filled with
+app.db.init_db.generate_population, then randomly sampled active users
+request their first feed page. Reports p50/p95/p99 latency, SQL
+statements per request and the peak memory a feed request allocates, and
+writes the results as JSON. Memory is traced with tracemalloc in a separate
+untimed pass over the same users, so tracing does not skew the latencies.
+
+The target database is wiped for every size: point --database-url at a
+scratch database.
+
+Run from the project root:
+    python -m benchmarks.bench_matching [--sizes 1000 10000] [--requests 100]
+        [--database-url postgresql://postgres@localhost/dinner_bench]
+        [--engine numpy] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.routers.users import get_potential_matches
+from app.core.database import Base
+from app.db.init_db import generate_population
+from app.models.user import User
+from app.services import matching
+from app.services.candidate_index import candidate_index
+from app.services.recommendation_cache import recommendation_cache
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def feed_peak_mb(db, user_ids, args) -> float:
+    """Largest peak of memory allocated during one feed request"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for user_id in user_ids:
+            if not args.cache:
+                recommendation_cache.clear()
+            db.expire_all()
+            user = db.get(User, user_id)
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            get_potential_matches(db=db, current_user=user, limit=args.limit)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return max(peaks) / 1e6
+
+
+def git_commit() -> str:
+    """Current commit of the working tree, if available"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_size(database_url: str, size: int, args) -> dict:
+    """Populate a fresh database with `size` users and time feed requests"""
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    try:
+        start = time.perf_counter()
+        counts = generate_population(db, size, seed=args.seed)
+        generate_seconds = time.perf_counter() - start
+
+        candidate_index.reset()
+        recommendation_cache.clear()
+        rnd = random.Random(args.seed)
+        active_ids = [
+            user_id for (user_id,) in db.query(User.id).filter(User.is_active.is_(True))
+        ]
+        sample = rnd.sample(active_ids, min(args.requests, len(active_ids)))
+
+        # The first request builds the candidate index; keep it out of the stats
+        get_potential_matches(
+            db=db, current_user=db.get(User, sample[0]), limit=args.limit
+        )
+
+        event.listen(engine, "before_cursor_execute", count_statement)
+        latencies, queries = [], []
+        for user_id in sample:
+            if not args.cache:
+                recommendation_cache.clear()
+            db.expire_all()
+            user = db.get(User, user_id)
+            statements[0] = 0
+            start = time.perf_counter()
+            get_potential_matches(db=db, current_user=user, limit=args.limit)
+            latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(statements[0])
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+        peak_mb = feed_peak_mb(db, sample, args)
+    finally:
+        db.close()
+        engine.dispose()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "users": counts["users"],
+        "matches": counts["matches"],
+        "generate_seconds": round(generate_seconds, 2),
+        "requests": len(latencies),
+        "latency_ms": {
+            "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2),
+            "p99": round(float(p99), 2),
+            "mean": round(float(np.mean(latencies)), 2),
+            "max": round(float(np.max(latencies)), 2),
+        },
+        "queries_per_request": {
+            "mean": round(float(np.mean(queries)), 2),
+            "max": int(np.max(queries)),
+        },
+        "feed_peak_mb": round(peak_mb, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database-url",
+        help="Scratch database (wiped per size); defaults to a temporary SQLite file",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(matching.ENGINE_RANKERS),
+        default=matching.MATCHING_ENGINE,
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Keep the per-user ranking cache between requests",
+    )
+    parser.add_argument("--output", help="JSON results file")
+    args = parser.parse_args()
+
+    matching.MATCHING_ENGINE = args.engine
+    started_at = datetime.utcnow()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{tmp}/bench_matching.db"
+        print(
+            f"{'users':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'queries':>8} {'peak MB':>8}"
+        )
+        for size in args.sizes:
+            result = run_size(database_url, size, args)
+            results.append(result)
+            latency = result["latency_ms"]
+            print(
+                f"{result['users']:>9} {latency['p50']:>9.1f} {latency['p95']:>9.1f} "
+                f"{latency['p99']:>9.1f} {result['queries_per_request']['mean']:>8.1f} "
+                f"{result['feed_peak_mb']:>8.2f}"
+            )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"matching-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "started_at": started_at.isoformat(),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "database": database_url.split(":", 1)[0],
+                "engine": args.engine,
+                "cache": args.cache,
+                "limit": args.limit,
+                "seed": args.seed,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
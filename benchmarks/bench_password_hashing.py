@@ -0,0 +1,89 @@
+"""
+Measure login throughput at several bcrypt costs.
+
+For every cost a burst of concurrent logins verifies a password either
+inline on the event loop (the old behaviour) or through the bounded
+PasswordHasher pool. Reports logins per second, p50/p99 login latency and
+the worst event-loop stall seen by a 1 ms ticker while the burst runs.
+
+Run from the project root:
+    python -m benchmarks.bench_password_hashing [--rounds 4 8 10 12]
+        [--logins 64] [--workers 4] [--max-pending 64]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from passlib.context import CryptContext
+
+from app.services.password_hashing import PasswordHasher
+
+PASSWORD = "correct horse battery staple"
+
+
+async def watch_loop_lag(stop: asyncio.Event, lags: list) -> None:
+    """Record how late a 1 ms sleep wakes up while the burst runs"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def login_burst(context: CryptContext, hashed: str, args, pooled: bool):
+    """Run `args.logins` concurrent logins, returning latencies and timings"""
+    hasher = PasswordHasher(context, args.workers, args.max_pending) if pooled else None
+
+    async def login() -> float:
+        start = time.perf_counter()
+        if hasher:
+            valid, _ = await hasher.verify_and_update(PASSWORD, hashed)
+        else:
+            valid, _ = context.verify_and_update(PASSWORD, hashed)
+            # Yield once, as the handler would after a database call
+            await asyncio.sleep(0)
+        assert valid
+        return time.perf_counter() - start
+
+    stop, lags = asyncio.Event(), []
+    watcher = asyncio.create_task(watch_loop_lag(stop, lags))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(login() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    if hasher:
+        hasher.shutdown()
+    return np.array(latencies), elapsed, max(lags, default=0.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[4, 8, 10, 12])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+
+    print(
+        f"{'rounds':>6} {'mode':>6} {'logins/s':>9} {'p50 ms':>9} "
+        f"{'p99 ms':>9} {'max loop stall ms':>18}"
+    )
+    for rounds in args.rounds:
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        hashed = context.hash(PASSWORD)
+        for mode, pooled in (("inline", False), ("pool", True)):
+            latencies, elapsed, stall = asyncio.run(
+                login_burst(context, hashed, args, pooled)
+            )
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            print(
+                f"{rounds:>6} {mode:>6} {args.logins / elapsed:>9.1f} {p50:>9.1f} "
+                f"{p99:>9.1f} {stall * 1000:>18.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
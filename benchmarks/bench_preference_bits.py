@@ -0,0 +1,90 @@
+"""
+Compare set-based cuisine overlap against bitmask popcount scoring.
+
+Reports the memory held by the per-candidate representation and the
+scoring throughput of the set path, the scalar bitmask path and the
+vectorized bitmask path.
+
+Run from the project root:
+    python -m benchmarks.bench_preference_bits [--sizes 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import tracemalloc
+
+from app.models.profile import normalize_tags
+from app.services.matching import calculate_cuisine_score
+from app.services.preference_bits import cuisine_bits, cuisine_mask_score
+from app.services.vector_scoring import cuisine_mask_scores
+
+from benchmarks.bench_scoring import best_of, generate_candidates
+
+
+def allocated_bytes(build) -> int:
+    """Bytes still allocated by the object `build` returns"""
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    user = "Italian, Thai, Korean"
+    user_mask, user_count = cuisine_bits(normalize_tags(user))
+    print(
+        f"{'candidates':>10} {'sets MB':>8} {'masks MB':>9} "
+        f"{'strings ms':>11} {'sets ms':>8} {'masks ms':>9} {'numpy ms':>9}"
+    )
+    for size in args.sizes:
+        cuisines = generate_candidates(size)["cuisines"]
+        sets = [normalize_tags(c) for c in cuisines]
+        bits = [cuisine_bits(tags) for tags in sets]
+        masks = [mask for mask, _ in bits]
+        counts = [count for _, count in bits]
+        user_set = normalize_tags(user)
+
+        sets_memory = allocated_bytes(lambda: [normalize_tags(c) for c in cuisines])
+        masks_memory = allocated_bytes(
+            lambda: [cuisine_bits(normalize_tags(c)) for c in cuisines]
+        )
+
+        def score_sets():
+            return [
+                len(user_set & tags) / max(len(user_set), len(tags)) * 30
+                for tags in sets
+            ]
+
+        def score_masks():
+            return [
+                cuisine_mask_score(user_mask, user_count, mask, count)
+                for mask, count in bits
+            ]
+
+        expected = [calculate_cuisine_score(user, c) for c in cuisines]
+        assert score_sets() == expected and score_masks() == expected
+
+        strings_time = best_of(
+            lambda: [calculate_cuisine_score(user, c) for c in cuisines], args.repeat
+        )
+        sets_time = best_of(score_sets, args.repeat)
+        masks_time = best_of(score_masks, args.repeat)
+        numpy_time = best_of(
+            lambda: cuisine_mask_scores(user_mask, user_count, masks, counts),
+            args.repeat,
+        )
+        print(
+            f"{size:>10} {sets_memory / 1e6:>8.1f} {masks_memory / 1e6:>9.1f} "
+            f"{strings_time * 1000:>11.1f} {sets_time * 1000:>8.1f} "
+            f"{masks_time * 1000:>9.1f} {numpy_time * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compare per-pair Python scoring against the vectorized NumPy scorer.
+
+Run from the project root:
+    python -m benchmarks.bench_scoring [--sizes 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.matching import (
+    calculate_cuisine_score,
+    calculate_dietary_score,
+    calculate_location_score,
+    calculate_success_rate_score,
+)
+from app.services.vector_scoring import score_candidates, top_k
+
+CUISINES = [
+    "Italian", "Japanese", "Thai", "Mexican", "Indian", "French", "Korean",
+    "Chinese", "Greek", "Spanish", "Vietnamese", "Lebanese", "Ethiopian",
+    "Turkish", "Peruvian", "Mediterranean", "American", "Brazilian",
+]  # fmt: skip
+LOCATIONS = ["New York", "Boston", "Chicago", "Austin", "Seattle", "Denver", None]
+DIETARY = ["None", "Vegetarian", "Vegan", "Halal", "Kosher", "Gluten-free", None]
+
+
+def generate_candidates(size: int, seed: int = 0) -> dict:
+    """Generate a synthetic candidate batch"""
+    rnd = random.Random(seed)
+    total = [rnd.choice([0, 0, 1, 2, 5, 10]) for _ in range(size)]
+    return {
+        "cuisines": [
+            ", ".join(rnd.sample(CUISINES, rnd.randint(1, 5))) for _ in range(size)
+        ],
+        "locations": [rnd.choice(LOCATIONS) for _ in range(size)],
+        "dietary": [rnd.choice(DIETARY) for _ in range(size)],
+        "accepted": [rnd.randint(0, t) for t in total],
+        "total": total,
+        "ids": np.arange(1, size + 1),
+    }
+
+
+def rank_python(user: tuple, batch: dict, k: int) -> list:
+    """Per-pair scoring followed by a full sort, as the python engine does"""
+    scored = []
+    for i in range(len(batch["ids"])):
+        score = sum(
+            [
+                calculate_cuisine_score(user[0], batch["cuisines"][i]),
+                calculate_location_score(user[1], batch["locations"][i]),
+                calculate_dietary_score(user[2], batch["dietary"][i]),
+                calculate_success_rate_score(batch["accepted"][i], batch["total"][i]),
+            ]
+        )
+        scored.append((batch["ids"][i], score))
+    scored.sort(key=lambda x: (-x[1], x[0]))
+    return [candidate_id for candidate_id, _ in scored[:k]]
+
+
+def rank_numpy(user: tuple, batch: dict, k: int) -> list:
+    """Vectorized scoring followed by argpartition top-k"""
+    scores = score_candidates(
+        *user,
+        batch["cuisines"],
+        batch["locations"],
+        batch["dietary"],
+        batch["accepted"],
+        batch["total"],
+    )
+    return batch["ids"][top_k(scores, batch["ids"], k)].tolist()
+
+
+def best_of(func, repeat: int) -> float:
+    """Best wall time of `repeat` calls, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    user = ("Italian, Thai, Korean", "New York", "Vegetarian")
+    print(f"{'candidates':>10} {'python ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        batch = generate_candidates(size)
+        assert rank_python(user, batch, args.k) == rank_numpy(user, batch, args.k)
+        python_time = best_of(lambda: rank_python(user, batch, args.k), args.repeat)
+        numpy_time = best_of(lambda: rank_numpy(user, batch, args.k), args.repeat)
+        print(
+            f"{size:>10} {python_time * 1000:>10.1f} {numpy_time * 1000:>10.1f} "
+            f"{python_time / numpy_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
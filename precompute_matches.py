@@ -0,0 +1,59 @@
+import argparse
+import logging
+import os
+
+from app.core.database import SessionLocal, create_tables
+from app.services.matching import MATCH_RECOMMENDATIONS_TOP_N
+from app.services.recommendation_job import run_precompute
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute discover feed rankings into match_recommendations"
+    )
+    parser.add_argument(
+        "--top-n",
+        type=int,
+        default=MATCH_RECOMMENDATIONS_TOP_N,
+        help="Candidates stored per user",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (0 ranks everything in this process)",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=200, help="Users per worker task"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Recompute every user instead of only those changed since the last run",
+    )
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        run = run_precompute(
+            db,
+            top_n=args.top_n,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            incremental=not args.full,
+        )
+        logger.info(
+            f"Run {run.id} finished: {run.users_computed} users "
+            f"in {(run.finished_at - run.started_at).total_seconds():.1f}s"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import logging
+
+from app.core.database import SessionLocal, create_tables
+from app.services.match_stats import rebuild_match_stats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Rebuild user_match_stats from the matches table"""
+    create_tables()
+    db = SessionLocal()
+    try:
+        users = rebuild_match_stats(db)
+        logger.info(f"Reconciled match stats for {users} users")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
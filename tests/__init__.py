@@ -1,3 +1,12 @@
+import os
+
+# Settings the app reads when it loads. pytest imports this package before
+# conftest, and the imports below load the app, so they are set first.
+# Cheap bcrypt cost for tests
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Tests use their own engine; do not connect the app's pools at startup
+os.environ.setdefault("DB_POOL_WARM_UP", "false")
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -1,16 +1,21 @@
 import pytest
-from typing import Generator, Dict
+from contextlib import contextmanager
+from typing import Callable, Generator, Dict
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy_utils import database_exists, create_database, drop_database
 
 from app.core.database import Base, get_db
-from app.main import app
-from app.core.security import create_access_token, get_password_hash
+from app.main import app, v1_app
+from app.core.security import create_user_access_token, get_password_hash
 from app.models.user import User
 from app.models.profile import Profile
 from app.models.match import Match, MatchStatus
+from app.services.query_stats import instrument_engine, record_queries
+from app.services.rate_limiter import auth_rate_limiter
+from app.services.token_revocation import revoked_tokens, token_revocations
+from app.services.user_cache import user_cache
 
 # Test database URL
 TEST_DATABASE_URL = "postgresql://postgres@localhost/test_dinner_app"
@@ -18,6 +23,9 @@ TEST_DATABASE_URL = "postgresql://postgres@localhost/test_dinner_app"
 # Create test database engine
 engine = create_engine(TEST_DATABASE_URL)
 
+# Per-request statement stats, as on the app's engine
+instrument_engine(engine)
+
 # Create test SessionLocal class
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -46,6 +54,11 @@ def db_session(test_db):
     session.close()
     transaction.rollback()
     connection.close()
+    # Rolled back users must not outlive the test in the user cache
+    user_cache.clear()
+    auth_rate_limiter.reset()
+    token_revocations.clear()
+    revoked_tokens.clear()
 
 
 @pytest.fixture
@@ -58,10 +71,53 @@ def client(db_session) -> Generator:
         finally:
             db_session.close()
 
+    # The routers live on the mounted v1 app, which has its own overrides
     app.dependency_overrides[get_db] = override_get_db
+    v1_app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    v1_app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def count_queries(db_session):
+    """
+    Record the statements run in a block, from any thread, on the engine
+    behind db_session, which `client` serves requests with:
+
+        with count_queries() as stats:
+            client.get("/api/v1/profiles/me", headers=auth_headers)
+        assert stats.count == 1
+    """
+    return lambda: record_queries(db_session.get_bind().engine)
+
+
+@pytest.fixture
+def query_budget(count_queries):
+    """
+    Fail if the requests made in a block run more statements than budgeted,
+    or (with max_repeats) the same statement more often than allowed. Counts
+    the statements on the engine behind db_session, which `client` serves
+    requests with:
+
+        with query_budget(5, max_repeats=1):
+            client.get("/api/v1/matches/sent", headers=auth_headers)
+    """
+
+    @contextmanager
+    def budget(max_statements: int, max_repeats: int = None):
+        with count_queries() as stats:
+            yield stats
+        assert (
+            stats.count <= max_statements
+        ), f"Query budget of {max_statements} exceeded: {stats.summary()}"
+        if max_repeats is not None:
+            assert not stats.repeated(
+                max_repeats
+            ), f"Statement repeated more than {max_repeats} times: {stats.summary()}"
+
+    return budget
 
 
 @pytest.fixture
@@ -77,10 +133,38 @@ def test_user(db_session) -> Dict[str, str]:
     db_session.commit()
     db_session.refresh(user)
 
-    token = create_access_token({"sub": user.email})
+    token = create_user_access_token(user)
     return {"user_id": user.id, "token": token}
 
 
+@pytest.fixture
+def create_user(db_session) -> Callable[..., User]:
+    """
+    Factory of active users, with a profile made from the keyword
+    arguments unless with_profile is False:
+
+        seeker = create_user("seeker", cuisine_preferences="Thai")
+    """
+
+    def create(username: str, with_profile: bool = True, **profile_fields) -> User:
+        user = User(
+            email=f"{username}@example.com",
+            username=username,
+            hashed_password=get_password_hash("testpassword"),
+            is_active=True,
+        )
+        db_session.add(user)
+        db_session.commit()
+        if with_profile:
+            profile = Profile(user_id=user.id, full_name=username, **profile_fields)
+            db_session.add(profile)
+            db_session.commit()
+            db_session.refresh(user)
+        return user
+
+    return create
+
+
 @pytest.fixture
 def test_profile(db_session, test_user) -> Profile:
     """Create a test profile"""
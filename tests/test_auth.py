@@ -1,4 +1,44 @@
-from fastapi import status
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from sqlalchemy import event
+
+from app.api.v1.deps import get_current_user, get_token_claims
+from app.api.v1.routers.auth import authenticate_user
+from app.api.v1.routers.users import update_current_user_profile
+from app.core.security import (
+    BCRYPT_ROUNDS,
+    create_access_token,
+    create_user_access_token,
+    get_password_hash,
+)
+from app.models.user import User
+from app.schemas.auth import UserProfileUpdate
+from app.services.metrics import metrics
+from app.services.password_hashing import PasswordHasher, PasswordHashingBusy
+from app.services.query_stats import record_queries
+from app.services.token_revocation import (
+    revoke_user_tokens,
+    revoked_tokens,
+    token_revocations,
+)
+from app.services.user_cache import user_cache
+
+
+def _resolve(db_session, token):
+    """Run get_current_user and count the statements it issues"""
+    with record_queries(db_session.get_bind().engine) as stats:
+        user = asyncio.run(get_current_user(request=None, db=db_session, token=token))
+    return user, stats.count
+
+
+def _load_revocations(db_session):
+    """Load the revocation state up front so it does not count as queries"""
+    token_revocations.refresh(db_session)
+    revoked_tokens.rebuild(db_session)
 
 
 def test_register_user(client):
@@ -22,8 +62,7 @@ def test_login_user(client, test_user):
     """Test user login"""
     response = client.post(
         "/api/v1/auth/login",
-        data={"username": test_user["email"],
-              "password": test_user["password"]},
+        data={"username": test_user["email"], "password": test_user["password"]},
     )
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
@@ -51,3 +90,176 @@ def test_register_existing_email(client, test_user):
         },
     )
     assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_current_user_is_served_from_cache(db_session, test_user):
+    """Test repeat resolutions skip the users query until the user changes"""
+    _load_revocations(db_session)
+    user, queries = _resolve(db_session, test_user["token"])
+    assert queries == 1
+
+    db_session.expunge_all()
+    cached, queries = _resolve(db_session, test_user["token"])
+    assert queries == 0
+    assert cached.id == test_user["user_id"]
+    assert cached in db_session
+
+    update_current_user_profile(
+        profile_update=UserProfileUpdate(bio="Loves ramen", interests=["ramen"]),
+        db=db_session,
+        current_user=cached,
+    )
+    db_session.expunge_all()
+    updated, queries = _resolve(db_session, test_user["token"])
+    assert queries == 1
+    assert updated.bio == "Loves ramen"
+
+    stats = metrics.snapshot()["gauges"]
+    assert stats["user_cache_hits"][()] == 1
+    assert stats["user_cache_hit_ratio"][()] == 1 / 3
+    assert stats["user_cache_size"][()] == 1
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"is_active": False},
+        {"hashed_password": get_password_hash("new-password")},
+    ],
+)
+def test_user_changes_invalidate_cached_user(db_session, test_user, change):
+    """Test deactivation and password changes drop the cached user"""
+    _load_revocations(db_session)
+    _resolve(db_session, test_user["token"])
+
+    user = db_session.get(User, test_user["user_id"])
+    for field, value in change.items():
+        setattr(user, field, value)
+    db_session.commit()
+    assert user_cache.stats()["size"] == 0
+
+    if change.get("is_active") is False:
+        # Deactivation revokes the tokens already issued
+        with pytest.raises(HTTPException) as exc_info:
+            _resolve(db_session, test_user["token"])
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+        with pytest.raises(HTTPException) as exc_info:
+            _resolve(db_session, create_user_access_token(user))
+        assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+    else:
+        db_session.expunge_all()
+        resolved, queries = _resolve(db_session, test_user["token"])
+        assert queries == 1
+        assert resolved.hashed_password == change["hashed_password"]
+
+
+def test_tests_hash_passwords_at_low_cost():
+    """The test suite hashes with BCRYPT_ROUNDS=4, not the production cost"""
+    assert get_password_hash("testpassword").startswith("$2b$04$")
+
+
+def test_login_rehashes_outdated_password_hash(db_session, test_user):
+    """A hash made with another bcrypt cost is upgraded on successful login"""
+    outdated_rounds = 5 if BCRYPT_ROUNDS != 5 else 6
+    outdated = CryptContext(schemes=["bcrypt"], bcrypt__rounds=outdated_rounds)
+    user = db_session.get(User, test_user["user_id"])
+    user.hashed_password = outdated.hash("testpassword")
+    db_session.commit()
+
+    rejected = authenticate_user(db_session, user.email, "wrong")
+    assert asyncio.run(rejected) is None
+    assert user.hashed_password.startswith(f"$2b${outdated_rounds:02d}$")
+
+    authenticated = asyncio.run(
+        authenticate_user(db_session, user.username, "testpassword")
+    )
+    assert authenticated.id == user.id
+    db_session.refresh(user)
+    assert user.hashed_password.startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+
+    # The upgraded hash still verifies and is not rewritten again
+    rehashed = user.hashed_password
+    asyncio.run(authenticate_user(db_session, user.email, "testpassword"))
+    assert user.hashed_password == rehashed
+
+
+def test_login_database_work_runs_off_the_event_loop(db_session, test_user):
+    """Sync-session queries of the async login flow run in the threadpool"""
+    threads = []
+
+    def before_cursor_execute(*args):
+        threads.append(threading.get_ident())
+
+    async def login():
+        loop_thread = threading.get_ident()
+        user = await authenticate_user(db_session, "test@example.com", "testpassword")
+        return user, loop_thread
+
+    connection = db_session.get_bind()
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        user, loop_thread = asyncio.run(login())
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+    assert user.id == test_user["user_id"]
+    assert threads and loop_thread not in threads
+
+
+def test_password_hasher_rejects_work_beyond_max_pending():
+    """A saturated hashing pool fails fast instead of queueing"""
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+    try:
+        running = hasher.submit("hash", release.wait, 5)
+        with pytest.raises(PasswordHashingBusy):
+            hasher.submit("hash", lambda: None)
+        assert hasher.pending == 1
+    finally:
+        release.set()
+    assert running.result(timeout=5) is True
+    # The slot is free again once the running operation finishes
+    assert hasher.submit("hash", lambda: "ok").result(timeout=5) == "ok"
+    hasher.shutdown()
+    assert hasher.pending == 0
+
+
+def test_token_claims_authorize_without_user_lookup(
+    db_session, test_user, count_queries
+):
+    """Identity claims are enough to authorize; legacy tokens still work"""
+    _load_revocations(db_session)
+    with count_queries() as stats:
+        claims = asyncio.run(get_token_claims(db=db_session, token=test_user["token"]))
+    assert stats.count == 0
+    assert claims.user_id == test_user["user_id"]
+    assert claims.is_active and claims.token_version == 0
+
+    user = db_session.get(User, test_user["user_id"])
+    legacy = create_access_token({"sub": user.email})
+    assert asyncio.run(get_token_claims(db=db_session, token=legacy)).user_id == user.id
+    assert _resolve(db_session, legacy)[0].id == user.id
+
+
+def test_revoked_token_versions_are_rejected(db_session, test_user):
+    """Bumping the token version revokes older tokens once committed"""
+    _load_revocations(db_session)
+    user = db_session.get(User, test_user["user_id"])
+
+    revoke_user_tokens(user)
+    db_session.flush()
+    # Not applied before the transaction commits
+    asyncio.run(get_token_claims(db=db_session, token=test_user["token"]))
+
+    db_session.commit()
+    for resolve in (get_token_claims, get_current_user):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(resolve(db=db_session, token=test_user["token"]))
+        assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+
+    fresh = create_user_access_token(user)
+    assert _resolve(db_session, fresh)[0].id == user.id
+
+    # Other processes pick the revocation up on their next refresh
+    token_revocations.clear()
+    assert token_revocations.is_revoked(db_session, user.id, 0)
+    assert len(token_revocations) == 1
@@ -0,0 +1,52 @@
+from app.db.init_db import generate_population
+from app.models.match import Match
+from app.models.profile import Profile, normalize_tags
+from app.models.user import User
+from app.services.geo import grid_cell
+from app.services.preference_bits import cuisine_bits
+
+
+def test_generate_population_bulk_inserts_consistent_rows(db_session):
+    """Test synthetic profiles carry the columns the ORM events would derive"""
+    counts = generate_population(db_session, 120, seed=3, batch_size=50)
+
+    assert counts["users"] == 120
+    assert db_session.query(Profile).count() == 120
+    assert db_session.query(Match).count() == counts["matches"] > 0
+
+    for profile in db_session.query(Profile):
+        tags = normalize_tags(profile.cuisine_preferences)
+        assert {tag.cuisine for tag in profile.cuisine_tags} == tags
+        assert (profile.cuisine_mask, profile.cuisine_count) == cuisine_bits(tags)
+        if profile.point:
+            assert profile.geo_cell == grid_cell(*profile.point)
+
+    pairs = {
+        frozenset((match.sender_id, match.receiver_id))
+        for match in db_session.query(Match)
+    }
+    assert len(pairs) == counts["matches"]
+    assert all(len(pair) == 2 for pair in pairs)
+
+
+def test_generate_population_appends_to_existing_users(db_session):
+    """Test repeated runs add users without colliding on unique columns"""
+    generate_population(db_session, 10, seed=1)
+    generate_population(db_session, 10, seed=1)
+
+    assert db_session.query(User).count() == 20
+
+
+def test_generate_population_after_users_were_deleted(db_session):
+    """Test the email suffixes do not depend on how many users remain"""
+    removed = User(email="removed@example.com", username="removed", hashed_password="x")
+    db_session.add(removed)
+    db_session.commit()
+    generate_population(db_session, 10, seed=1)
+    db_session.delete(removed)
+    db_session.commit()
+
+    generate_population(db_session, 10, seed=1)
+
+    emails = [email for (email,) in db_session.query(User.email)]
+    assert len(emails) == len(set(emails)) == 20
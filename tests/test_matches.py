@@ -1,6 +1,11 @@
 from fastapi import status
 from datetime import datetime
 
+from app.api.v1.routers.matches import create_match, update_match
+from app.models.match import Match, MatchStatus, UserMatchStats
+from app.schemas.match import MatchCreate, MatchUpdate
+from app.services.match_stats import rebuild_match_stats
+
 
 def test_create_match(client, test_user, auth_headers):
     """Test creating a new match"""
@@ -56,3 +61,61 @@ def test_update_invalid_match(client, test_user, test_match, auth_headers):
         f"/api/v1/matches/{test_match.id}", json=data, headers=auth_headers
     )
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def _stats(db_session, user_id):
+    """(sent, received, pending, accepted, rejected) counters of a user"""
+    stats = db_session.get(UserMatchStats, user_id)
+    db_session.refresh(stats)
+    return (stats.sent, stats.received, stats.pending, stats.accepted, stats.rejected)
+
+
+def test_match_writes_update_stats_counters(db_session, create_user):
+    """Test creating and answering a match moves the per-user counters"""
+    sender = create_user("sender", with_profile=False)
+    receiver = create_user("receiver", with_profile=False)
+
+    match = create_match(
+        match_in=MatchCreate(recipient_id=receiver.id),
+        db=db_session,
+        current_user=sender,
+    )
+    assert _stats(db_session, sender.id) == (1, 0, 1, 0, 0)
+    assert _stats(db_session, receiver.id) == (0, 1, 1, 0, 0)
+
+    update_match(
+        match_id=match.id,
+        match_in=MatchUpdate(status=MatchStatus.ACCEPTED),
+        db=db_session,
+        current_user=receiver,
+    )
+    assert _stats(db_session, sender.id) == (1, 0, 0, 1, 0)
+    assert _stats(db_session, receiver.id) == (0, 1, 0, 1, 0)
+
+
+def test_rebuild_match_stats_reconciles_counters(db_session, create_user):
+    """Test the reconciliation rebuild reproduces the maintained counters"""
+    users = [create_user(f"user{i}", with_profile=False) for i in range(4)]
+    for sender, receiver, match_status in [
+        (0, 1, MatchStatus.ACCEPTED),
+        (0, 2, MatchStatus.REJECTED),
+        (1, 2, MatchStatus.PENDING),
+        (3, 0, MatchStatus.ACCEPTED),
+    ]:
+        db_session.add(
+            Match(
+                sender_id=users[sender].id,
+                receiver_id=users[receiver].id,
+                status=match_status,
+            )
+        )
+    db_session.commit()
+    maintained = [_stats(db_session, user.id) for user in users]
+    assert maintained[0] == (2, 1, 0, 2, 1)
+
+    # Simulate drift from a write that bypassed the ORM
+    db_session.query(UserMatchStats).update({"accepted": 0})
+    db_session.commit()
+
+    assert rebuild_match_stats(db_session) == 4
+    assert [_stats(db_session, user.id) for user in users] == maintained
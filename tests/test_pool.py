@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.core.database import DB_POOL_WARM_UP
+from app.core.pool import InstrumentedQueuePool, count_new_connections, warm_up_pool
+from app.services.metrics import metrics
+
+
+@pytest.fixture
+def small_pool(tmp_path):
+    """A one-connection pool that gives up waiting after 50ms"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        pool_logging_name="pooltest",
+    )
+    count_new_connections(engine)
+    metrics.reset()
+    yield engine
+    engine.dispose()
+    metrics.reset()
+
+
+def test_checkout_wait_and_timeouts_are_measured(small_pool):
+    held = small_pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        small_pool.connect()
+    held.close()
+
+    snapshot = metrics.snapshot()
+    labels = (("database", "pooltest"),)
+    assert snapshot["counters"]["db_pool_timeouts_total"][labels] == 1
+    assert snapshot["counters"]["db_pool_connections_opened_total"][labels] == 1
+    waits = snapshot["histograms"]["db_pool_checkout_wait_seconds"][labels]
+    assert waits["count"] == 2 and waits["sum"] >= 0.05
+    assert 'db_pool_checkout_wait_seconds_bucket{database="pooltest",le="0.1"} 2' in (
+        metrics.render()
+    )
+
+
+def test_warm_up_opens_pool_size_connections(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'warm.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=3,
+        max_overflow=0,
+    )
+
+    assert warm_up_pool(engine, 3) == 3
+    assert engine.pool.checkedin() == 3
+    assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+
+def test_tests_do_not_warm_up_the_app_pools():
+    """The app's pools point at the configured database, not the test one"""
+    assert not DB_POOL_WARM_UP
+
+
+def test_pool_settings_come_from_the_environment():
+    env = dict(os.environ, DB_POOL_SIZE="7", DB_MAX_OVERFLOW="2", DB_POOL_TIMEOUT="4")
+    script = (
+        "from app.core.database import engine; "
+        "print(engine.pool.size(), engine.pool._max_overflow, engine.pool._timeout)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.split() == ["7", "2", "4.0"]
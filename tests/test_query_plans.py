@@ -0,0 +1,85 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, or_, text
+
+from app.api.v1.deps import TokenClaims
+from app.api.v1.routers.matches import (
+    _create_match,
+    get_received_matches,
+    get_sent_matches,
+)
+from app.db.init_db import generate_population
+from app.db.query_plan import find_sequential_scans
+from app.models.match import Match, MatchStatus
+from app.models.user import User
+from app.schemas.match import MatchCreate
+from app.services.matching import matched_with
+
+
+@pytest.fixture
+def seeded_match(db_session):
+    """A pending match in a seeded population, with planner statistics"""
+    generate_population(db_session, 400, seed=5)
+    match = db_session.query(Match).first()
+    match.status = MatchStatus.PENDING
+    db_session.commit()
+    db_session.execute(text("ANALYZE"))
+    return match
+
+
+def _claims(db_session, user_id):
+    user = db_session.get(User, user_id)
+    return TokenClaims(user.id, user.email, user.is_active, user.token_version)
+
+
+def _duplicate_check(db_session, match):
+    with pytest.raises(HTTPException):
+        _create_match(
+            db_session,
+            match.sender_id,
+            MatchCreate(recipient_id=match.receiver_id),
+        )
+
+
+def _matched_users(db_session, user_id):
+    return db_session.query(User.id).filter(matched_with(user_id)).all()
+
+
+def _last_match_change(db_session, user_id):
+    return (
+        db_session.query(func.max(Match.updated_at))
+        .filter(or_(Match.sender_id == user_id, Match.receiver_id == user_id))
+        .scalar()
+    )
+
+
+HOT_QUERIES = {
+    "sent": lambda db, m: get_sent_matches(db=db, claims=_claims(db, m.sender_id)),
+    "received": lambda db, m: get_received_matches(
+        db=db, claims=_claims(db, m.receiver_id)
+    ),
+    "duplicate check": _duplicate_check,
+    "matched with": lambda db, m: _matched_users(db, m.sender_id),
+    "last match change": lambda db, m: _last_match_change(db, m.sender_id),
+}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_match_queries_use_indexes(db_session, seeded_match, name):
+    """Test the hot match queries never fall back to a sequential scan"""
+    query = HOT_QUERIES[name]
+    scans = find_sequential_scans(
+        db_session, lambda: query(db_session, seeded_match), tables={"matches"}
+    )
+    assert scans == []
+
+
+def test_unindexed_match_query_is_reported(db_session, seeded_match):
+    """Test a filter without an index is caught"""
+    scans = find_sequential_scans(
+        db_session,
+        lambda: db_session.query(Match)
+        .filter(Match.restaurant_preference == "Thai")
+        .all(),
+    )
+    assert [table for table, _ in scans] == ["matches"]
@@ -0,0 +1,65 @@
+import logging
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.middleware import log_requests_middleware
+from app.models.user import User
+from app.services import query_stats
+from app.services.metrics import metrics
+
+SERVER_TIMING = re.compile(
+    r'^db;desc="(\d+) queries";dur=[\d.]+, db-slowest;dur=[\d.]+, app;dur=[\d.]+$'
+)
+
+
+def _warm_up(client, auth_headers):
+    """First request loads the revocation lists; later ones only the profile"""
+    response = client.get("/api/v1/profiles/me", headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_server_timing_reports_request_queries(client, auth_headers, test_profile):
+    _warm_up(client, auth_headers)
+    response = client.get("/api/v1/profiles/me", headers=auth_headers)
+
+    assert response.status_code == 200
+    match = SERVER_TIMING.match(response.headers["Server-Timing"])
+    assert match and int(match.group(1)) == 1
+
+
+def test_profile_query_budget(client, auth_headers, test_profile, query_budget):
+    _warm_up(client, auth_headers)
+    with query_budget(1, max_repeats=1) as stats:
+        response = client.get("/api/v1/profiles/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert stats.count == 1
+    assert "FROM profiles" in next(iter(stats.statements))
+
+    with pytest.raises(AssertionError, match="Query budget of 0 exceeded"):
+        with query_budget(0):
+            client.get("/api/v1/profiles/me", headers=auth_headers)
+
+
+def test_repeated_statements_are_flagged(db_session, caplog, monkeypatch):
+    monkeypatch.setattr(query_stats, "REPEATED_STATEMENT_LIMIT", 2)
+    app = FastAPI()
+    app.middleware("http")(log_requests_middleware)
+
+    @app.get("/users")
+    def list_users():
+        # One lookup per id: the N+1 pattern
+        return [db_session.get(User, user_id) is not None for user_id in (1, 2, 3)]
+
+    before = metrics.snapshot()["counters"].get("sql_repeated_statements_total", {})
+    with caplog.at_level(logging.WARNING, logger=query_stats.__name__):
+        with TestClient(app) as client:
+            response = client.get("/users")
+
+    match = SERVER_TIMING.match(response.headers["Server-Timing"])
+    assert int(match.group(1)) == 3
+    assert "ran the same statement 3 times" in caplog.text
+    after = metrics.snapshot()["counters"]["sql_repeated_statements_total"]
+    assert after[()] == before.get((), 0) + 1
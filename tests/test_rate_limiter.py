@@ -0,0 +1,127 @@
+import pytest
+from fastapi import status
+
+from app.services.rate_limiter import (
+    CounterStore,
+    CounterStoreRateLimitBackend,
+    InMemoryRateLimitBackend,
+    RateLimiter,
+    RateLimitExceeded,
+    parse_rate,
+)
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LocalCounterStore(CounterStore):
+    """Dict stand-in for a shared counter store such as Redis"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.counters = {}
+
+    def incr(self, key, ttl_seconds):
+        value, expires_at = self.counters.get(key, (0, None))
+        if expires_at is None or expires_at <= self.clock():
+            value, expires_at = 0, self.clock() + ttl_seconds
+        self.counters[key] = (value + 1, expires_at)
+        return value + 1
+
+    def get(self, key):
+        value, expires_at = self.counters.get(key, (0, None))
+        return value if expires_at and expires_at > self.clock() else 0
+
+    def clear(self):
+        self.counters.clear()
+
+
+def _backends(clock):
+    return [
+        InMemoryRateLimitBackend(clock=clock),
+        CounterStoreRateLimitBackend(LocalCounterStore(clock), clock=clock),
+    ]
+
+
+@pytest.mark.parametrize("backend_index", [0, 1])
+def test_backends_reject_over_limit_until_window_slides(backend_index):
+    clock = FakeClock()
+    backend = _backends(clock)[backend_index]
+    limiter = RateLimiter({"login": (3, 60)}, backend)
+
+    for _ in range(3):
+        limiter.check("login", "alice")
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        limiter.check("login", "alice")
+    assert 0 < exc_info.value.retry_after <= 60
+    assert 1 <= int(exc_info.value.retry_after_header) <= 60
+    # Keys are limited independently
+    limiter.check("login", "bob")
+
+    clock.now += exc_info.value.retry_after
+    limiter.check("login", "alice")
+
+    limiter.reset()
+    clock.now += 1
+    for _ in range(3):
+        limiter.check("login", "alice")
+
+
+def test_in_memory_backend_evicts_least_recent_keys():
+    backend = InMemoryRateLimitBackend(max_keys=2, clock=FakeClock())
+    for key in ["a", "b"]:
+        backend.hit(key, 1, 60)
+    assert backend.hit("a", 1, 60) > 0
+    # "b" is now the least recently used key and is dropped for "c"
+    backend.hit("c", 1, 60)
+    assert backend.hit("b", 1, 60) == 0.0
+    assert backend.hit("c", 1, 60) > 0
+
+
+def test_incomplete_counter_store_cannot_be_created():
+    class IncrOnlyStore(CounterStore):
+        def incr(self, key, ttl_seconds):
+            return 1
+
+    with pytest.raises(TypeError):
+        IncrOnlyStore()
+
+
+@pytest.mark.parametrize("rate", ["10", "a/60", "0/60", "5/0"])
+def test_parse_rate_rejects_invalid_rates(rate):
+    with pytest.raises(ValueError):
+        parse_rate(rate)
+
+
+def test_parse_rate_empty_disables_rule():
+    assert parse_rate("") is None
+    assert parse_rate("5/60") == (5, 60.0)
+    RateLimiter({"login": parse_rate("")}).check("login", "alice")
+
+
+def test_login_is_limited_before_database_work(client, count_queries, monkeypatch):
+    limiter = RateLimiter({"auth_ip": (100, 60), "auth_login": (2, 60)})
+    monkeypatch.setattr(
+        "app.api.v1.routers.auth.auth_rate_limiter", limiter, raising=True
+    )
+    credentials = {"username": "Victim@example.com", "password": "guess"}
+    with count_queries() as allowed:
+        for _ in range(2):
+            response = client.post("/api/v1/auth/login", data=credentials)
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert allowed.count > 0
+
+    with count_queries() as limited:
+        # The identifier is normalised, so case changes do not reset the limit
+        response = client.post(
+            "/api/v1/auth/login",
+            data={"username": " victim@example.com", "password": "guess"},
+        )
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    assert limited.count == 0, limited.summary()
@@ -0,0 +1,186 @@
+import pytest
+from fastapi import FastAPI, Request, status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.routers import profiles
+from app.core.database import Base, get_db
+from app.core.replicas import (
+    STALENESS_COOKIE,
+    ReplicaRouter,
+    RoutingSession,
+    bind_user,
+    route_request,
+)
+from app.core.security import create_user_access_token, get_password_hash
+from app.middleware.middleware import log_requests_middleware
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.metrics import MetricsRegistry
+from app.services.user_cache import user_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    """A primary and a "replica" SQLite file holding different names"""
+    clock = FakeClock()
+    engines = {}
+    for name in ("primary", "replica"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engines[name])
+        with sessionmaker(bind=engines[name])() as db:
+            for user_id in (1, 2):
+                db.add(
+                    User(
+                        id=user_id,
+                        email=f"user{user_id}@example.com",
+                        username=f"user{user_id}",
+                        hashed_password=get_password_hash("testpassword"),
+                        is_active=True,
+                    )
+                )
+                db.add(Profile(user_id=user_id, full_name=name))
+            db.commit()
+
+    router = ReplicaRouter(
+        engines["primary"], [engines["replica"]], staleness_seconds=5, clock=clock
+    )
+    session_factory = sessionmaker(
+        class_=RoutingSession, router=router, autoflush=False, bind=engines["primary"]
+    )
+    yield session_factory, router, clock
+
+    user_cache.clear()
+    for engine in engines.values():
+        engine.dispose()
+
+
+def _full_name(db, user_id=1):
+    return db.execute(
+        select(Profile.full_name).where(Profile.user_id == user_id)
+    ).scalar()
+
+
+def test_read_only_session_reads_from_replica_until_it_writes(replicated):
+    session_factory, router, clock = replicated
+
+    with session_factory() as db:
+        route_request(db, "GET")
+        assert _full_name(db) == "replica"
+        # Locking reads go to the primary
+        locked = select(Profile.full_name).where(Profile.user_id == 1)
+        assert db.execute(locked.with_for_update()).scalar() == "primary"
+
+        db.get(Profile, 2).bio = "Written on the primary"
+        db.commit()
+        assert _full_name(db, 2) == "primary"
+
+    with session_factory() as db:
+        route_request(db, "POST")
+        assert _full_name(db) == "primary"
+
+
+def test_users_own_write_pins_their_reads_for_the_staleness_window(replicated):
+    session_factory, router, clock = replicated
+
+    with session_factory() as db:
+        route_request(db, "PUT")
+        bind_user(db, 1)
+        db.get(Profile, 1).bio = "Updated"
+        db.commit()
+    assert router.wrote_recently(1)
+
+    def read_as(user_id):
+        with session_factory() as db:
+            route_request(db, "GET")
+            bind_user(db, user_id)
+            return _full_name(db)
+
+    assert read_as(1) == "primary"
+    assert read_as(2) == "replica"
+    clock.now += 6
+    assert read_as(1) == "replica"
+    assert not router.wrote_recently(1)
+
+
+def test_profile_endpoints_read_own_writes(replicated):
+    session_factory, router, clock = replicated
+
+    def override_get_db(request: Request):
+        db = session_factory()
+        route_request(db, request.method)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(profiles.router, prefix="/profiles")
+    app.dependency_overrides[get_db] = override_get_db
+    with session_factory() as db:
+        token = create_user_access_token(db.get(User, 1))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        response = client.get("/profiles/me", headers=headers)
+        assert response.json()["full_name"] == "replica"
+
+        response = client.put("/profiles/me", json={"bio": "Hi"}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        response = client.get("/profiles/me", headers=headers)
+        assert response.json()["full_name"] == "primary"
+        assert response.json()["bio"] == "Hi"
+
+    registry = MetricsRegistry()
+    router.collect_metrics(registry)
+    gauges = registry.snapshot()["gauges"]
+    assert {dict(labels)["database"] for labels in gauges["db_pool_checkedout"]} == {
+        "primary",
+        "replica0",
+    }
+    assert gauges["db_replica_recent_writers"][()] == 1
+
+
+def test_staleness_cookie_pins_reads_on_other_workers(replicated):
+    session_factory, router, clock = replicated
+    # Another worker process: its own router over the same databases
+    other_worker = ReplicaRouter(router.primary, router.replicas, staleness_seconds=5)
+    workers = iter([router, other_worker, other_worker])
+
+    def override_get_db(request: Request):
+        db = session_factory(router=next(workers))
+        route_request(db, request.method, request.cookies.get(STALENESS_COOKIE))
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.middleware("http")(log_requests_middleware)
+    app.include_router(profiles.router, prefix="/profiles")
+    app.dependency_overrides[get_db] = override_get_db
+    with session_factory() as db:
+        token = create_user_access_token(db.get(User, 1))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        response = client.put("/profiles/me", json={"bio": "Hi"}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert STALENESS_COOKIE in response.cookies
+
+        assert not other_worker.wrote_recently(1)
+        response = client.get("/profiles/me", headers=headers)
+        assert response.json()["full_name"] == "primary"
+
+        client.cookies.clear()
+        response = client.get("/profiles/me", headers=headers)
+        assert response.json()["full_name"] == "replica"
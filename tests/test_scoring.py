@@ -0,0 +1,165 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from app.models.profile import normalize_tags
+from app.services.matching import (
+    calculate_cuisine_score,
+    calculate_dietary_score,
+    calculate_location_score,
+    calculate_success_rate_score,
+)
+from app.services.preference_bits import cuisine_bits, cuisine_mask_score
+from app.services.scoring_model import (
+    DEFAULT_MODEL,
+    ScoringConfigError,
+    ScoringModelRegistry,
+    compile_model,
+)
+from app.services.vector_scoring import cuisine_mask_scores, score_candidates, top_k
+
+CUISINES = ["Italian", "thai", " Korean", "Mexican ", "French", "", "Indian"]
+# Tags without a bit in the cuisine vocabulary
+UNKNOWN_CUISINES = ["Szechuan", "Basque"]
+LOCATIONS = ["New York", "new york", "Boston", "", None]
+DIETARY = ["None", "vegan", "Vegan", "Vegetarian", "", None]
+
+
+def _random_cuisines(rnd: random.Random):
+    if rnd.random() < 0.1:
+        return None
+    return ",".join(rnd.sample(CUISINES, rnd.randint(1, 4)))
+
+
+def test_score_candidates_matches_scalar_scores():
+    """Test the vectorized scorer reproduces the per-pair helpers exactly"""
+    rnd = random.Random(42)
+    for _ in range(20):
+        user = (_random_cuisines(rnd), rnd.choice(LOCATIONS), rnd.choice(DIETARY))
+        cuisines = [_random_cuisines(rnd) for _ in range(200)]
+        locations = [rnd.choice(LOCATIONS) for _ in range(200)]
+        dietary = [rnd.choice(DIETARY) for _ in range(200)]
+        total = [rnd.choice([None, 0, 1, 3, 7]) for _ in range(200)]
+        accepted = [rnd.randint(0, t) if t else t for t in total]
+
+        scores = score_candidates(*user, cuisines, locations, dietary, accepted, total)
+
+        expected = [
+            sum(
+                [
+                    calculate_cuisine_score(user[0], cuisines[i]),
+                    calculate_location_score(user[1], locations[i]),
+                    calculate_dietary_score(user[2], dietary[i]),
+                    calculate_success_rate_score(accepted[i], total[i]),
+                ]
+            )
+            for i in range(200)
+        ]
+        assert scores.tolist() == expected
+
+
+def test_cuisine_masks_match_set_scores():
+    """Test bitmask overlap scores equal the set-based cuisine score"""
+    rnd = random.Random(7)
+    candidates = [
+        ", ".join(rnd.sample(CUISINES[:5] + UNKNOWN_CUISINES, rnd.randint(0, 4)))
+        for _ in range(200)
+    ]
+    bits = [cuisine_bits(normalize_tags(c)) for c in candidates]
+    masks = [mask for mask, _ in bits]
+    counts = [count for _, count in bits]
+
+    for user in ["Italian, Thai", "korean", "French,Mexican,Indian,Italian", None]:
+        user_mask, user_count = cuisine_bits(normalize_tags(user))
+        expected = [calculate_cuisine_score(user, c) for c in candidates]
+
+        scalar = [
+            cuisine_mask_score(user_mask, user_count, mask, count)
+            for mask, count in bits
+        ]
+        vectorized = cuisine_mask_scores(user_mask, user_count, masks, counts)
+
+        assert scalar == expected
+        assert vectorized.tolist() == expected
+
+
+def test_top_k_orders_by_score_then_id():
+    """Test top-k selection keeps every tie at the cut-off in id order"""
+    scores = np.array([10.0, 50.0, 30.0, 50.0, 30.0, 30.0, 0.0])
+    ids = np.array([7, 6, 5, 4, 3, 2, 1])
+
+    assert ids[top_k(scores, ids, 4)].tolist() == [4, 6, 2, 3]
+    assert ids[top_k(scores, ids, 10)].tolist() == [4, 6, 2, 3, 5, 7, 1]
+    assert top_k(scores, ids, 0).tolist() == []
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"weights": {"cuisine": 30, "distance": 10}},
+        {"weights": {"cuisine": -1, "location": 25}},
+        {"weights": {"cuisine": "30"}},
+        {"weights": {"cuisine": 30}, "enabled": ["location"]},
+        {"weights": {"cuisine": 0, "location": 0}},
+        {"weights": {"cuisine": 30}, "normalization": "softmax"},
+        {"weights": {"cuisine": 30}, "boost": 2},
+    ],
+)
+def test_compile_model_rejects_invalid_specs(spec):
+    """Test invalid scoring model definitions are rejected"""
+    with pytest.raises(ScoringConfigError):
+        compile_model("broken", spec)
+
+
+def test_compile_model_keeps_enabled_components_in_order():
+    """Test disabled components are dropped and unit scores are normalized"""
+    model = compile_model(
+        "nearby",
+        {
+            "weights": {"success_rate": 10, "location": 50, "cuisine": 40},
+            "enabled": ["location", "cuisine"],
+            "normalization": "unit",
+        },
+    )
+
+    assert list(model.weights) == ["cuisine", "location"]
+    assert model.normalize(45) == 0.5
+    assert model.non_overlap_max_score == 0
+    assert DEFAULT_MODEL.non_overlap_max_score == 25 + 20
+    assert model.key != compile_model("nearby", {"weights": {"cuisine": 40}}).key
+
+
+def test_registry_splits_traffic_and_reloads_changes(tmp_path):
+    """Test users are split by traffic share and edits apply without restart"""
+    path = tmp_path / "scoring_models.json"
+    config = {
+        "default": "baseline",
+        "traffic": {"baseline": 50, "nearby": 50},
+        "models": {
+            "baseline": {},
+            "nearby": {"weights": {"cuisine": 20, "location": 80}},
+        },
+    }
+    path.write_text(json.dumps(config))
+    registry = ScoringModelRegistry(str(path), reload_seconds=0)
+    registry.load()
+
+    assignments = [registry.select(user_id).name for user_id in range(1000)]
+    assert 400 < assignments.count("nearby") < 600
+    assert assignments == [registry.select(user_id).name for user_id in range(1000)]
+
+    config["traffic"] = {"nearby": 1}
+    path.write_text(json.dumps(config))
+    registry._mtime = None  # the rewrite may land within the mtime resolution
+    assert {registry.select(user_id).name for user_id in range(100)} == {"nearby"}
+
+    # An invalid edit is logged and the previous models stay in use
+    path.write_text(json.dumps({"models": {"baseline": {"weights": {"x": 1}}}}))
+    registry._mtime = None
+    assert registry.select(1).name == "nearby"
+    assert registry.get("baseline").weights == DEFAULT_MODEL.weights
+
+    with pytest.raises(ScoringConfigError):
+        registry.load()
@@ -0,0 +1,164 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, status
+
+from app.api.v1.deps import get_token_claims
+from app.models.token import RefreshToken, RevokedToken
+from app.models.user import User
+from app.services.bloom_filter import BloomFilter
+from app.services.refresh_tokens import (
+    RefreshTokenError,
+    hash_refresh_token,
+    issue_refresh_token,
+    rotate_refresh_token,
+)
+from app.services.token_revocation import RevokedTokenFilter, revoke_user_tokens
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    added = [uuid.uuid4().hex for _ in range(2000)]
+    for item in added:
+        bloom.add(item)
+
+    assert all(item in bloom for item in added)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(20000))
+    assert false_positives / 20000 < 3 * 0.01
+    assert bloom.false_positive_rate == pytest.approx(0.01, rel=0.2)
+    assert bloom.nbytes < 2000 * 2
+
+
+def test_filter_false_positive_falls_back_to_exact_check(db_session, count_queries):
+    revoked_jti = uuid.uuid4().hex
+    db_session.add(
+        RevokedToken(jti=revoked_jti, expires_at=datetime.utcnow() + timedelta(hours=1))
+    )
+    db_session.commit()
+
+    # A tiny filter so that unrelated ids collide
+    revoked = RevokedTokenFilter(capacity=1, error_rate=0.5)
+    revoked.rebuild(db_session)
+    candidates = (uuid.uuid4().hex for _ in range(100000))
+    colliding = next(jti for jti in candidates if jti in revoked._filter)
+    missing = next(jti for jti in candidates if jti not in revoked._filter)
+
+    assert revoked.is_revoked(db_session, revoked_jti)
+    assert not revoked.is_revoked(db_session, colliding)
+    assert revoked.exact_checks == 2
+    assert revoked.false_positives == 1
+
+    # A filter miss is answered without a query
+    with count_queries() as stats:
+        result = revoked.is_revoked(db_session, missing)
+    assert result is False and stats.count == 0
+    assert revoked.exact_checks == 2
+
+
+def test_filter_picks_up_revocations_from_other_processes(db_session):
+    revoked = RevokedTokenFilter(refresh_seconds=0)
+    revoked.rebuild(db_session)
+    jti = uuid.uuid4().hex
+    assert not revoked.is_revoked(db_session, jti)
+
+    # Committed by another worker: seen on the next refresh
+    db_session.add(
+        RevokedToken(jti=jti, expires_at=datetime.utcnow() + timedelta(hours=1))
+    )
+    db_session.commit()
+    assert revoked.is_revoked(db_session, jti)
+    assert revoked.stats()["items"] == 1
+
+
+def test_filter_picks_up_late_commits_within_the_overlap(db_session):
+    revoked = RevokedTokenFilter(refresh_seconds=0, overlap_seconds=60)
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    db_session.add(RevokedToken(jti=uuid.uuid4().hex, expires_at=expires_at))
+    db_session.commit()
+    revoked.rebuild(db_session)
+
+    # Stamped by a worker whose clock lags, or committed after newer rows
+    jti = uuid.uuid4().hex
+    db_session.add(
+        RevokedToken(
+            jti=jti,
+            expires_at=expires_at,
+            revoked_at=datetime.utcnow() - timedelta(seconds=30),
+        )
+    )
+    db_session.commit()
+    assert revoked.is_revoked(db_session, jti)
+    assert revoked.stats()["items"] == 2
+
+
+def test_refresh_tokens_rotate_and_detect_reuse(db_session, test_user):
+    user = db_session.get(User, test_user["user_id"])
+    first = issue_refresh_token(db_session, user)
+    db_session.commit()
+    stored = db_session.query(RefreshToken).filter_by(user_id=user.id).one()
+    assert stored.token_hash == hash_refresh_token(first) != first
+
+    refreshed_user, second = rotate_refresh_token(db_session, first)
+    assert refreshed_user.id == user.id and second != first
+
+    # Replaying the rotated token revokes the whole family
+    with pytest.raises(RefreshTokenError):
+        rotate_refresh_token(db_session, first)
+    with pytest.raises(RefreshTokenError):
+        rotate_refresh_token(db_session, second)
+    with pytest.raises(RefreshTokenError):
+        rotate_refresh_token(db_session, "unknown")
+
+
+def test_revoking_user_tokens_retires_refresh_tokens(db_session, test_user):
+    user = db_session.get(User, test_user["user_id"])
+    stolen = issue_refresh_token(db_session, user)
+    db_session.commit()
+
+    # E.g. a password change or an admin revoking every session
+    revoke_user_tokens(user)
+    db_session.commit()
+    with pytest.raises(RefreshTokenError, match="revoked"):
+        rotate_refresh_token(db_session, stolen)
+
+    # Tokens issued after the revocation keep working
+    fresh = issue_refresh_token(db_session, user)
+    db_session.commit()
+    assert rotate_refresh_token(db_session, fresh)[0].id == user.id
+
+
+def test_refresh_and_logout_endpoints(client, db_session, test_user):
+    user = db_session.get(User, test_user["user_id"])
+    refresh_token = issue_refresh_token(db_session, user)
+    db_session.commit()
+
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": refresh_token}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    tokens = response.json()
+    assert tokens["refresh_token"] != refresh_token
+    # The endpoint rotated the token in the test database
+    rotated = (
+        db_session.query(RefreshToken)
+        .filter(RefreshToken.token_hash == hash_refresh_token(tokens["refresh_token"]))
+        .one()
+    )
+    assert rotated.user_id == user.id
+
+    response = client.post(
+        "/api/v1/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(get_token_claims(db=db_session, token=tokens["access_token"]))
+    assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,792 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy.orm import Session
+
+from app.api.v1 import deps
+from app.api.v1.deps import get_current_admin_user
+from app.api.v1.routers.matches import create_match
+from app.api.v1.routers.profiles import update_my_profile
+from app.api.v1.routers.users import explain_matches, get_potential_matches
+from app.models.match import Match, MatchStatus
+from app.models.profile import ProfileCuisine, ProfileDietary
+from app.models.recommendation import MatchRecommendation
+from app.models.user import User
+from app.schemas.match import MatchCreate
+from app.schemas.profile import ProfileUpdate
+from app.services.candidate_index import candidate_index
+from app.services.metrics import metrics
+from app.services.recommendation_job import run_precompute, users_to_refresh
+from app.services.scoring_model import compile_model
+from app.services.recommendation_cache import (
+    RecommendationCache,
+    recommendation_cache,
+)
+from app.services import matching
+from app.services.matching import (
+    ENGINE_NUMPY,
+    ENGINE_PYTHON,
+    ENGINE_SQL,
+    MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS,
+    MATCHING_STAGE_METRIC,
+    rank_potential_matches,
+    rank_scored_matches,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_matching_state():
+    """Start each test with an empty candidate index and ranking cache"""
+    candidate_index.reset()
+    recommendation_cache.clear()
+    yield
+    candidate_index.reset()
+    recommendation_cache.clear()
+
+
+def test_potential_matches_ranked_by_success_rate(db_session, create_user):
+    """Test candidates with accepted matches rank above identical candidates"""
+    profile = {
+        "cuisine_preferences": "Italian, Thai",
+        "dietary_restrictions": "None",
+        "location": "New York",
+    }
+    current_user = create_user("seeker", **profile)
+    newcomer = create_user("newcomer", **profile)
+    popular = create_user("popular", **profile)
+    partner = create_user("partner", location="Boston")
+    db_session.add(
+        Match(
+            sender_id=popular.id,
+            receiver_id=partner.id,
+            status=MatchStatus.ACCEPTED,
+        )
+    )
+    db_session.commit()
+
+    results = get_potential_matches(db=db_session, current_user=current_user)
+
+    assert [user.id for user in results] == [popular.id, newcomer.id, partner.id]
+
+
+def test_potential_matches_query_count_is_constant(
+    db_session, create_user, count_queries
+):
+    """Test ranking issues the same number of queries for any pool size"""
+    current_user = create_user(
+        "seeker", cuisine_preferences="Italian", location="New York"
+    )
+
+    def count_for_pool(size: int, offset: int) -> int:
+        for i in range(size):
+            candidate = create_user(
+                f"candidate{offset + i}",
+                cuisine_preferences="Italian",
+                location="New York",
+            )
+            db_session.add(
+                Match(
+                    sender_id=candidate.id,
+                    receiver_id=candidate.id - 1,
+                    status=MatchStatus.ACCEPTED,
+                )
+            )
+        db_session.commit()
+        db_session.expire_all()
+        candidate_index.reset()
+        recommendation_cache.clear()
+
+        with count_queries() as stats:
+            get_potential_matches(db=db_session, current_user=current_user, limit=50)
+        return stats.count
+
+    assert count_for_pool(2, 0) == count_for_pool(20, 2)
+
+
+def test_explain_reports_component_scores_and_timings(db_session, create_user):
+    """Test explain breaks down the live ranking into components and stages"""
+    current_user = create_user(
+        "seeker", cuisine_preferences="Italian, Thai", location="Boston"
+    )
+    close = create_user("close", cuisine_preferences="Thai", location="Boston")
+    create_user("far", cuisine_preferences="Korean", location="Denver")
+    matched = create_user("matched", cuisine_preferences="Thai")
+    db_session.add(Match(sender_id=current_user.id, receiver_id=matched.id))
+    db_session.commit()
+
+    explained = explain_matches(db=db_session, admin_user=current_user)
+
+    ranked = rank_scored_matches(
+        db_session, current_user, use_cache=False, use_precomputed=False
+    )
+    assert [(c["user_id"], c["score"]) for c in explained["candidates"]] == [
+        (user.id, score) for user, score in ranked
+    ]
+    top = explained["candidates"][0]
+    assert top["user_id"] == close.id
+    assert top["components"] == {
+        "cuisine": 15.0,
+        "location": 25,
+        "dietary": 0,
+        "success_rate": 0,
+    }
+    assert explained["excluded_users"] == 1
+    assert explained["candidates_considered"] == 2
+    assert set(explained["timings_ms"]) == {
+        "exclusion",
+        "candidate_fetch",
+        "scoring",
+        "sort",
+        "serialization",
+        "total",
+    }
+    # The exclusion count and the candidate fetch
+    assert explained["sql_statements"] == 2
+
+
+def test_explain_requires_admin(db_session, monkeypatch, create_user):
+    """Test only users listed in ADMIN_EMAILS pass the admin dependency"""
+    user = create_user("seeker")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(get_current_admin_user(current_user=user))
+    assert exc_info.value.status_code == 403
+
+    monkeypatch.setattr(deps, "ADMIN_EMAILS", {"seeker@example.com"})
+    assert asyncio.run(get_current_admin_user(current_user=user)) is user
+
+
+def test_live_ranking_records_stage_timings(db_session, create_user):
+    """Test each live ranking stage is observed in the stage histogram"""
+    current_user = create_user("seeker", cuisine_preferences="Thai")
+    create_user("candidate", cuisine_preferences="Thai")
+    metrics.reset()
+
+    rank_scored_matches(
+        db_session,
+        current_user,
+        engine=ENGINE_PYTHON,
+        use_cache=False,
+        use_precomputed=False,
+        use_index=False,
+    )
+
+    stages = metrics.snapshot()["histograms"][MATCHING_STAGE_METRIC]
+    assert {dict(labels)["stage"] for labels in stages} == {
+        "candidate_fetch",
+        "scoring",
+        "sort",
+    }
+    assert all(observed["count"] == 1 for observed in stages.values())
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYTHON, ENGINE_SQL, ENGINE_NUMPY])
+def test_matched_user_exclusion_does_not_grow_with_history(
+    db_session, engine, create_user, count_queries
+):
+    """Test the matched-user filter keeps statements constant in size"""
+    current_user = create_user("seeker", cuisine_preferences="Thai")
+    fresh = create_user("fresh", cuisine_preferences="Thai")
+
+    def feed_statement_sizes(history: int):
+        for i in range(history):
+            partner = create_user(f"partner{history}_{i}")
+            sender, receiver = (
+                (current_user, partner) if i % 2 else (partner, current_user)
+            )
+            db_session.add(Match(sender_id=sender.id, receiver_id=receiver.id))
+        db_session.commit()
+        with count_queries() as stats:
+            ranked = rank_potential_matches(
+                db_session,
+                current_user,
+                engine=engine,
+                use_index=False,
+                use_cache=False,
+            )
+        assert [user.id for user in ranked] == [fresh.id]
+        return stats.count, [len(statement) for statement in stats.statements]
+
+    assert feed_statement_sizes(2) == feed_statement_sizes(40)
+
+
+def test_engines_match_python_engine(db_session, create_user):
+    """Test the SQL and NumPy engines rank and page like the Python engine"""
+    current_user = create_user(
+        "seeker",
+        cuisine_preferences="Italian, Thai, Korean",
+        dietary_restrictions="Vegetarian",
+        location="New York",
+    )
+    candidates = [
+        create_user(
+            "exact",
+            cuisine_preferences="korean,thai,italian",
+            dietary_restrictions="vegetarian",
+            location="new york",
+        ),
+        create_user(
+            "partial",
+            cuisine_preferences="Thai, Mexican",
+            location="New York",
+        ),
+        create_user(
+            "wide",
+            cuisine_preferences="Italian, French, " "Greek, Thai, Indian",
+            dietary_restrictions="None",
+        ),
+        create_user("empty", cuisine_preferences="", location="Boston"),
+        create_user("nulls"),
+        create_user("repeats", cuisine_preferences="Thai, thai,Korean"),
+    ]
+    db_session.add_all(
+        [
+            Match(
+                sender_id=candidates[3].id,
+                receiver_id=candidates[4].id,
+                status=MatchStatus.ACCEPTED,
+            ),
+            Match(
+                sender_id=candidates[4].id,
+                receiver_id=candidates[2].id,
+                status=MatchStatus.REJECTED,
+            ),
+        ]
+    )
+    db_session.commit()
+
+    for skip, limit in [(0, 10), (0, 2), (2, 2), (4, 10)]:
+        python_ids = [
+            user.id
+            for user in rank_potential_matches(
+                db_session,
+                current_user,
+                skip=skip,
+                limit=limit,
+                engine=ENGINE_PYTHON,
+                use_cache=False,
+            )
+        ]
+        sql_ids = [
+            user.id
+            for user in rank_potential_matches(
+                db_session,
+                current_user,
+                skip=skip,
+                limit=limit,
+                engine=ENGINE_SQL,
+                use_cache=False,
+            )
+        ]
+        numpy_ids = [
+            user.id
+            for user in rank_potential_matches(
+                db_session,
+                current_user,
+                skip=skip,
+                limit=limit,
+                engine=ENGINE_NUMPY,
+                use_cache=False,
+            )
+        ]
+        assert sql_ids == python_ids
+        assert numpy_ids == python_ids
+
+
+def test_engines_match_for_configured_scoring_model(db_session, create_user):
+    """Test every engine, the index and explain score a custom model alike"""
+    model = compile_model(
+        "nearby",
+        {
+            "weights": {"cuisine": 20, "location": 45, "dietary": 20},
+            "enabled": ["cuisine", "location"],
+            "normalization": "unit",
+        },
+    )
+    current_user = create_user(
+        "seeker",
+        cuisine_preferences="Italian, Thai, Szechuan",
+        dietary_restrictions="Vegan",
+        location="Boston",
+    )
+    create_user("same", cuisine_preferences="Thai", location="Boston")
+    create_user("diet", cuisine_preferences="Szechuan", dietary_restrictions="vegan")
+    create_user("far", cuisine_preferences="Italian", location="Denver")
+    create_user("none", location="Cambridge")
+
+    rankings = [
+        [
+            (user.id, score)
+            for user, score in rank_scored_matches(
+                db_session,
+                current_user,
+                engine=engine,
+                use_index=use_index,
+                use_cache=False,
+                use_precomputed=False,
+                model=model,
+            )
+        ]
+        for engine in (ENGINE_PYTHON, ENGINE_SQL, ENGINE_NUMPY)
+        for use_index in (False, True)
+    ]
+    assert all(ranking == rankings[0] for ranking in rankings)
+    assert all(0 <= score <= 1 for _, score in rankings[0])
+
+    explained = explain_matches(
+        db=db_session, admin_user=current_user, model="baseline"
+    )
+    assert explained["model"] != model.key
+    explained = matching.explain_potential_matches(
+        db_session, current_user, model=model
+    )
+    assert [(c["user_id"], c["score"]) for c in explained["candidates"]] == rankings[0]
+    assert all(
+        set(c["components"]) == {"cuisine", "location"} for c in explained["candidates"]
+    )
+
+
+def test_recommendation_cache_is_keyed_by_scoring_model(db_session, create_user):
+    """Test a ranking cached for one model is not served for another"""
+    current_user = create_user("seeker", cuisine_preferences="Thai", location="Boston")
+    create_user("candidate", cuisine_preferences="Thai", location="Boston")
+    cuisine_only = compile_model("cuisine_only", {"weights": {"cuisine": 10}})
+
+    baseline = rank_scored_matches(db_session, current_user, use_precomputed=False)
+    other = rank_scored_matches(
+        db_session, current_user, use_precomputed=False, model=cuisine_only
+    )
+
+    assert [score for _, score in baseline] == [55.0]
+    assert [score for _, score in other] == [10.0]
+    assert recommendation_cache.stats()["misses"] == 2
+
+
+def test_engines_match_for_cuisines_outside_bit_vocabulary(db_session, create_user):
+    """Test engines agree when the requester has cuisines without a bit"""
+    current_user = create_user("seeker", cuisine_preferences="Thai, Szechuan")
+    for i, cuisines in enumerate(["Szechuan", "Thai, Basque", "thai", "Basque", ""]):
+        create_user(f"candidate{i}", cuisine_preferences=cuisines)
+
+    rankings = [
+        rank_scored_matches(db_session, current_user, engine=engine, use_cache=False)
+        for engine in (ENGINE_PYTHON, ENGINE_SQL, ENGINE_NUMPY)
+    ]
+    expected = [(user.id, score) for user, score in rankings[0]]
+    assert expected[0][1] == 15
+    for ranking in rankings[1:]:
+        assert [(user.id, score) for user, score in ranking] == expected
+
+
+def test_candidate_index_matches_full_scan(db_session, create_user):
+    """Test index-backed ranking returns the same pages as a full scan"""
+    current_user = create_user(
+        "seeker",
+        cuisine_preferences="Italian, Thai",
+        dietary_restrictions="Vegan",
+        location="New York",
+    )
+    for i in range(4):
+        create_user(
+            f"overlap{i}",
+            cuisine_preferences="Italian, Thai" if i % 2 else "Thai, French",
+            location="new york",
+        )
+    stranger = create_user(
+        "stranger",
+        cuisine_preferences="Greek",
+        dietary_restrictions="vegan",
+    )
+
+    for skip, limit in [(0, 2), (0, 4), (2, 3), (0, 10)]:
+        indexed = rank_potential_matches(
+            db_session,
+            current_user,
+            skip=skip,
+            limit=limit,
+            use_index=True,
+            use_cache=False,
+        )
+        full_scan = rank_potential_matches(
+            db_session,
+            current_user,
+            skip=skip,
+            limit=limit,
+            use_index=False,
+            use_cache=False,
+        )
+        assert [user.id for user in indexed] == [user.id for user in full_scan]
+
+    # Non-overlapping candidates still fill the page through the fallback
+    page = rank_potential_matches(
+        db_session, current_user, limit=10, use_index=True, use_cache=False
+    )
+    assert page[-1].id == stranger.id
+
+
+def test_update_my_profile_reindexes_candidate(db_session, create_user):
+    """Test profile edits move the user between index entries"""
+    user = create_user("mover", cuisine_preferences="Thai")
+    candidate_index.rebuild(db_session)
+    assert user.id in candidate_index.candidates("thai", None)
+
+    update_my_profile(
+        profile_in=ProfileUpdate(cuisine_preferences="Korean", location="Boston"),
+        db=db_session,
+        current_user=user,
+    )
+
+    assert user.id not in candidate_index.candidates("Thai", None)
+    assert user.id in candidate_index.candidates("KOREAN", None)
+    assert user.id in candidate_index.candidates(None, "boston")
+
+
+def test_nearby_locations_score_by_distance(db_session, create_user):
+    """Test geocoded locations decay with distance in every engine"""
+    current_user = create_user(
+        "seeker", cuisine_preferences="Thai", location="New York"
+    )
+    same = create_user("same", cuisine_preferences="Thai", location="NYC")
+    near = create_user("near", cuisine_preferences="Thai", location="Brooklyn")
+    pinned = create_user(
+        "pinned",
+        cuisine_preferences="Thai",
+        location="Somewhere upstate",
+        latitude=40.95,
+        longitude=-74.0,
+    )
+    far = create_user("far", cuisine_preferences="Thai", location="Boston")
+    unknown = create_user("unknown", cuisine_preferences="Thai", location="Atlantis")
+
+    assert near.profile.geo_cell is not None
+    assert unknown.profile.point is None
+    candidate_index.rebuild(db_session)
+    assert near.id in candidate_index.candidates(None, None, current_user.profile.point)
+    assert far.id not in candidate_index.candidates(
+        None, None, current_user.profile.point
+    )
+
+    for engine in (ENGINE_PYTHON, ENGINE_SQL, ENGINE_NUMPY):
+        ranked = rank_scored_matches(
+            db_session, current_user, engine=engine, use_cache=False
+        )
+        scores = {user.id: score for user, score in ranked}
+        assert [user.id for user, _ in ranked][:2] == [same.id, near.id]
+        assert scores[same.id] == 30 + 25
+        assert 30 < scores[pinned.id] < scores[near.id] < 30 + 25
+        assert scores[far.id] == scores[unknown.id] == 30
+
+
+def test_profile_location_is_geocoded_on_write(db_session, create_user):
+    """Test location edits refresh coordinates unless they are supplied"""
+    user = create_user("mover", location="Austin")
+    austin_cell = user.profile.geo_cell
+
+    update_my_profile(
+        profile_in=ProfileUpdate(location="Seattle"), db=db_session, current_user=user
+    )
+    assert user.profile.point == (47.6062, -122.3321)
+    assert user.profile.geo_cell != austin_cell
+
+    update_my_profile(
+        profile_in=ProfileUpdate(location="Atlantis"), db=db_session, current_user=user
+    )
+    assert user.profile.point is None
+    assert user.profile.geo_cell is None
+
+    update_my_profile(
+        profile_in=ProfileUpdate(location="Home", latitude=30.27, longitude=-97.74),
+        db=db_session,
+        current_user=user,
+    )
+    assert user.profile.point == (30.27, -97.74)
+    assert user.profile.geo_cell == austin_cell
+    assert user.id in candidate_index.candidates(None, None, (30.2672, -97.7431))
+
+
+def test_profile_tags_follow_preference_strings(db_session, create_user):
+    """Test cuisine and dietary tag rows are kept in sync with profile edits"""
+    user = create_user(
+        "tagged",
+        cuisine_preferences="Italian, THAI ,italian",
+        dietary_restrictions="Vegan, Gluten-free",
+    )
+
+    def tags():
+        cuisines = db_session.query(ProfileCuisine.cuisine).filter(
+            ProfileCuisine.profile_id == user.profile.id
+        )
+        restrictions = db_session.query(ProfileDietary.restriction).filter(
+            ProfileDietary.profile_id == user.profile.id
+        )
+        return (
+            sorted(cuisine for (cuisine,) in cuisines),
+            sorted(restriction for (restriction,) in restrictions),
+        )
+
+    assert tags() == (["italian", "thai"], ["gluten-free", "vegan"])
+
+    update_my_profile(
+        profile_in=ProfileUpdate(cuisine_preferences="Thai, Korean"),
+        db=db_session,
+        current_user=user,
+    )
+    assert tags() == (["korean", "thai"], ["gluten-free", "vegan"])
+
+    update_my_profile(
+        profile_in=ProfileUpdate(dietary_restrictions=""),
+        db=db_session,
+        current_user=user,
+    )
+    assert tags() == (["korean", "thai"], [])
+
+
+def test_recommendation_cache_serves_repeat_requests(
+    db_session, create_user, count_queries
+):
+    """Test repeated feed requests skip scoring until a match invalidates them"""
+    current_user = create_user("seeker", cuisine_preferences="Thai", location="Austin")
+    first = create_user("first", cuisine_preferences="Thai", location="Austin")
+    second = create_user("second", cuisine_preferences="Thai")
+
+    page = get_potential_matches(db=db_session, current_user=current_user)
+    with count_queries() as stats:
+        cached_page = get_potential_matches(db=db_session, current_user=current_user)
+
+    assert [user.id for user in cached_page] == [user.id for user in page]
+    assert stats.count == 1
+    assert recommendation_cache.stats()["hits"] == 1
+    assert recommendation_cache.stats()["misses"] == 1
+
+    create_match(
+        match_in=MatchCreate(recipient_id=first.id),
+        db=db_session,
+        current_user=current_user,
+    )
+    page = get_potential_matches(db=db_session, current_user=current_user)
+
+    assert [user.id for user in page] == [second.id]
+    assert recommendation_cache.stats()["misses"] == 2
+
+
+def test_recommendation_cache_drops_deactivated_candidates(db_session, create_user):
+    """Test deactivating a candidate invalidates rankings that contain it"""
+    current_user = create_user("seeker", cuisine_preferences="Thai")
+    candidate = create_user("candidate", cuisine_preferences="Thai")
+    get_potential_matches(db=db_session, current_user=current_user)
+
+    candidate.is_active = False
+    db_session.commit()
+
+    assert recommendation_cache.get(current_user.id) is None
+    assert get_potential_matches(db=db_session, current_user=current_user) == []
+
+
+def test_recommendation_cache_keeps_rankings_when_deactivation_rolls_back(
+    db_session, create_user
+):
+    """Test a rolled back deactivation leaves cached rankings in place"""
+    current_user = create_user("seeker", cuisine_preferences="Thai")
+    candidate = create_user("candidate", cuisine_preferences="Thai")
+    get_potential_matches(db=db_session, current_user=current_user)
+
+    # A session of its own in a savepoint, so the rollback spares the test's
+    with Session(
+        bind=db_session.connection(), join_transaction_mode="create_savepoint"
+    ) as session:
+        session.get(User, candidate.id).is_active = False
+        session.flush()
+        session.rollback()
+
+    page = get_potential_matches(db=db_session, current_user=current_user)
+    assert [user.id for user in page] == [candidate.id]
+    gauges = metrics.snapshot()["gauges"]
+    assert gauges["recommendation_cache_size"][()] == 1
+    assert gauges["recommendation_cache_hits"][()] == 1
+    assert gauges["recommendation_cache_invalidations"][()] == 0
+
+
+def test_recommendation_cache_evicts_least_recently_used():
+    """Test the cache stays within its size bound"""
+    cache = RecommendationCache(ttl_seconds=60, max_users=2, depth=3)
+    cache.set(1, [(10, 90.0), (11, 80.0), (12, 70.0), (13, 60.0)])
+    cache.set(2, [(20, 50.0)])
+    assert cache.get(1) == [(10, 90.0), (11, 80.0), (12, 70.0)]
+    cache.set(3, [(30, 40.0)])
+
+    assert cache.get(2) is None
+    assert cache.get(1) == [(10, 90.0), (11, 80.0), (12, 70.0)]
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PYTHON, ENGINE_SQL, ENGINE_NUMPY])
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_cursor_pages_walk_the_full_ranking(
+    db_session, monkeypatch, engine, use_cache, create_user
+):
+    """Test following cursors returns the ranking without gaps or repeats"""
+    monkeypatch.setattr(matching, "MATCHING_ENGINE", engine)
+    monkeypatch.setattr(matching, "MATCHING_RECOMMENDATION_CACHE", use_cache)
+    current_user = create_user(
+        "seeker", cuisine_preferences="Italian, Thai", location="Austin"
+    )
+    for i in range(7):
+        create_user(
+            f"candidate{i}",
+            cuisine_preferences="Italian" if i % 3 else "Italian, Thai",
+            location="Austin" if i % 2 else "Denver",
+        )
+    expected = rank_potential_matches(
+        db_session, current_user, limit=100, use_cache=False
+    )
+
+    walked, cursor = [], None
+    while True:
+        response = Response()
+        page = get_potential_matches(
+            db=db_session,
+            current_user=current_user,
+            limit=3,
+            cursor=cursor,
+            response=response,
+        )
+        walked.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert [user.id for user in walked] == [user.id for user in expected]
+
+
+def test_invalid_cursor_is_rejected(db_session, create_user):
+    """Test a tampered cursor returns 400"""
+    current_user = create_user("seeker", cuisine_preferences="Thai")
+
+    with pytest.raises(HTTPException) as exc_info:
+        get_potential_matches(
+            db=db_session, current_user=current_user, cursor="not-a-cursor"
+        )
+    assert exc_info.value.status_code == 400
+
+
+def test_precomputed_rankings_are_served_while_fresh(
+    db_session, monkeypatch, create_user
+):
+    """Test the offline job stores rankings the feed serves until they go stale"""
+    current_user = create_user(
+        "seeker", cuisine_preferences="Thai, Korean", location="Austin"
+    )
+    for i in range(5):
+        create_user(
+            f"candidate{i}",
+            cuisine_preferences="Thai" if i % 2 else "Korean, Thai",
+            location="Austin",
+        )
+    expected = rank_potential_matches(
+        db_session, current_user, limit=10, use_cache=False, use_precomputed=False
+    )
+
+    run = run_precompute(db_session, top_n=10, workers=0, incremental=False)
+
+    assert run.users_computed == 6
+    stored = (
+        db_session.query(MatchRecommendation)
+        .filter(MatchRecommendation.user_id == current_user.id)
+        .order_by(MatchRecommendation.rank)
+        .all()
+    )
+    assert [row.candidate_id for row in stored] == [user.id for user in expected]
+
+    def rank_live(*args, **kwargs):
+        raise AssertionError("fresh rankings should be served from the table")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(matching, "_rank_live", rank_live)
+        served = rank_potential_matches(db_session, current_user, skip=1, limit=3)
+    assert [user.id for user in served] == [user.id for user in expected[1:4]]
+
+    # A profile edit after the run makes the stored ranking stale
+    update_my_profile(
+        profile_in=ProfileUpdate(location="Denver"),
+        db=db_session,
+        current_user=current_user,
+    )
+    served = rank_potential_matches(db_session, current_user, limit=10)
+    live = rank_potential_matches(
+        db_session, current_user, limit=10, use_cache=False, use_precomputed=False
+    )
+    assert [user.id for user in served] == [user.id for user in live]
+
+
+def test_shallow_precomputed_rankings_fall_back_past_their_depth(
+    db_session, create_user
+):
+    """Test pages past a run's --top-n are ranked live, not served empty"""
+    current_user = create_user("seeker", cuisine_preferences="Thai")
+    for i in range(8):
+        create_user(f"candidate{i}", cuisine_preferences="Thai")
+    run_precompute(db_session, top_n=3, workers=0, incremental=False)
+
+    live = rank_potential_matches(
+        db_session,
+        current_user,
+        skip=3,
+        limit=3,
+        use_cache=False,
+        use_precomputed=False,
+    )
+    served = rank_potential_matches(
+        db_session, current_user, skip=3, limit=3, use_cache=False
+    )
+    assert len(live) == 3
+    assert [user.id for user in served] == [user.id for user in live]
+
+
+def test_incremental_precompute_only_refreshes_changed_users(db_session, create_user):
+    """Test incremental runs recompute users whose profile or matches changed"""
+    users = [create_user(f"user{i}", cuisine_preferences="Thai") for i in range(4)]
+    assert run_precompute(db_session, workers=0).users_computed == 4
+
+    update_my_profile(
+        profile_in=ProfileUpdate(cuisine_preferences="Korean"),
+        db=db_session,
+        current_user=users[0],
+    )
+    db_session.add(
+        Match(
+            sender_id=users[1].id,
+            receiver_id=users[2].id,
+            status=MatchStatus.PENDING,
+        )
+    )
+    db_session.commit()
+
+    run = run_precompute(db_session, workers=0)
+    assert run.incremental
+    assert run.users_computed == 3
+
+
+def test_incremental_precompute_refreshes_expired_and_missing_rankings(
+    db_session, create_user
+):
+    """Test incremental runs pick up rankings the feed would no longer serve"""
+    users = [create_user(f"user{i}", cuisine_preferences="Thai") for i in range(3)]
+    run = run_precompute(db_session, workers=0)
+    since = run.started_at
+    assert users_to_refresh(db_session, since) == []
+
+    # Nothing changed, but the stored ranking is gone
+    db_session.query(MatchRecommendation).filter(
+        MatchRecommendation.user_id == users[0].id
+    ).delete()
+    db_session.commit()
+    assert users_to_refresh(db_session, since) == [users[0].id]
+
+    expired = datetime.utcnow() + timedelta(
+        seconds=MATCH_RECOMMENDATIONS_MAX_AGE_SECONDS + 1
+    )
+    assert users_to_refresh(db_session, since, now=expired) == [
+        user.id for user in users
+    ]